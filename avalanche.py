@@ -1,5 +1,6 @@
 #!/usr/bin/env python3
 
+import os
 import argparse
 
 from migen import *
@@ -10,7 +11,7 @@ from litex.build.generic_platform import *
 from litex.soc.interconnect import wishbone
 from litex.soc.integration.soc_core import *
 from litex.soc.integration.builder import *
-from litex.soc.cores.uart import UARTWishboneBridge
+from litex.soc.cores.uart import RS232PHY
 from litex.soc.cores.clock import period_ns
 
 from litex.boards.platforms import avalanche
@@ -20,10 +21,23 @@ from litedram.frontend.wishbone import *
 
 from components.wrappers import *
 
+from gateware.wishbone2axi import Wishbone2AXIBurst
+from gateware.l2cache import L2Cache
+from gateware.axi_interconnect import AXIInterconnect
+from gateware.axi_bist import AXIBIST
+from gateware.axi_monitor import AXIMonitor
+from gateware.axi_dma import AXIDMA
+from gateware.boot_timer import BootTimer
+from gateware.uart_bridge import UARTBridge
+from gateware.spi_engine import SPIEngine
+from gateware.profiler import PCProfiler
+from gateware.spi_flash import SPIFlash
+from gateware.i2c_master import I2CMaster
+
+from tools.build_cache import BuildCache
+
 from litex.soc.interconnect.csr import AutoCSR
 
-from litex.soc.cores.spi import SPIMaster
-from litex.soc.cores.i2c import I2C
 from litex.soc.cores.gpio import GPIOOut
 
 
@@ -33,11 +47,13 @@ _ddram_specific_ios = [
 ]
 
 class _CRG(Module):
-    def __init__(self, platform):
+    def __init__(self, platform, sys_clk_freq):
+        self.clock_domains.cd_osc = ClockDomain(reset_less=True)
         self.clock_domains.cd_ccc = ClockDomain()
         self.clock_domains.cd_sys = ClockDomain()
         self.cd_sys_pll_lock = Signal()
         self.cd_sys_ddram_ready = Signal()
+        self.osc_clk_freq = int(160e6)
 
         # # #
 
@@ -50,11 +66,14 @@ class _CRG(Module):
         osc = Osc()
         osc.add_sources(platform)
         self.submodules += osc
+        self.comb += self.cd_osc.clk.eq(osc.RCOSC_160MHZ_GL)
+        platform.add_period_constraint(self.cd_osc.clk, period_ns(self.osc_clk_freq))
 
-        # Conditioning Circuitry (160MHz --> 100MHz)
-        ccc = CCC()
+        # Conditioning Circuitry (160MHz --> 100MHz ddr3 reference and sys_clk)
+        ccc_parameters = CCC.parameters(ref_clk_freq=self.osc_clk_freq, out1_freq=sys_clk_freq)
+        ccc = CCC(ccc_parameters)
         ccc.add_sources(platform)
-        ccc.add_timing_constraints(platform)
+        ccc.add_timing_constraints(platform, ccc_parameters, self.osc_clk_freq)
         self.submodules += ccc
         monitor_rst = ~(monitor.DEVICE_INIT_DONE &     # Keep reset asserted
                         monitor.BANK_0_CALIB_STATUS &  # until device is fully
@@ -67,9 +86,26 @@ class _CRG(Module):
         rst = ~platform.request("rst_n")
         self.specials += AsyncResetSynchronizer(self.cd_ccc, rst | monitor_rst)
 
-        # System Clock (100MHz)
-        self.specials += AsyncResetSynchronizer(self.cd_sys, ~self.cd_sys_pll_lock | ~self.cd_sys_ddram_ready)
-        platform.add_period_constraint(self.cd_sys.clk, period_ns(100e6))
+        # System Clock (CCC, asynchronous to the ddr3 SYS_CLK, held in reset
+        # until the ddr3 controller is ready)
+        self.comb += self.cd_sys.clk.eq(ccc.OUT1_FABCLK_0)
+        self.specials += AsyncResetSynchronizer(self.cd_sys,
+            ~ccc.PLL_LOCK_0 | ~self.cd_sys_pll_lock | ~self.cd_sys_ddram_ready)
+        # osc and sys both come from the RC oscillator net, only the BootTimer
+        # crosses them (through synchronizers and static timestamps)
+        platform.toolchain.additional_timing_constraints += [
+            "set_clock_groups -asynchronous "
+            "-group [ get_clocks { osc_clk } ] "
+            "-group [ get_clocks { ccc/ccc_0/pll_inst_0/OUT1 } ]",
+        ]
+
+        # Boot events (name, signal), in boot order
+        self.boot_events = [(name.lower(), getattr(monitor, name)) for name in Monitor.outputs]
+        self.boot_events += [
+            ("ccc_pll_lock",  ccc.PLL_LOCK_0),
+            ("ddr3_pll_lock", self.cd_sys_pll_lock),
+            ("ddr3_ready",    self.cd_sys_ddram_ready),
+        ]
 
 
 class ArduinoGPIO(Module, AutoCSR):
@@ -89,46 +125,205 @@ class BaseSoC(SoCCore):
         "spi" : 20,
         "i2c" : 21,
         "gpio" : 22,
+        "l2_cache" : 23,
+        "axi_bist" : 24,
+        "axi_monitor" : 25,
+        "dma" : 26,
+        "l2_bridge" : 27,
+        "boot_timer" : 28,
+        "profiler" : 29,
+        "spiflash" : 30,
     }
     csr_map.update(SoCCore.csr_map)
-    def __init__(self, platform, l2_size=8192, **kwargs):
-        sys_clk_freq = int(100e6)
-        platform.add_extension(_ddram_specific_ios)
+
+    interrupt_map = {
+        "dma" : 2,
+        "spi" : 3,
+        "profiler" : 4,
+        "spiflash" : 5,
+        "i2c" : 6,
+    }
+    interrupt_map.update(SoCCore.interrupt_map)
+
+    mem_map = {
+        "scratchpad" : 0x20000000,
+        "spiflash" : 0x30000000,
+    }
+    mem_map.update(SoCCore.mem_map)
+
+    def __init__(self, platform, sys_clk_freq=int(100e6), preset=None,
+                 l2_size=8192, l2_line_size=32, l2_ways=1, l2_replacement="lru",
+                 l2_write_buffer_depth=0, l2_prefetch_depth=0,
+                 scratchpad_size=0x4000, with_axi_bist=True, with_axi_monitor=False,
+                 with_dma=True, ddr3_queue_depth=3, ddr3_reorder=False, ddr3_partial_bursts=False,
+                 ddr3_address_map="row-bank-col", ddr3_trefi=7800, ddr3_trfc=260,
+                 with_uart_bridge=False, with_spi_dma=True, with_profiler=True,
+                 with_spiflash=True, spiflash_boot_offset=0xc00000, **kwargs):
+        kwargs.setdefault("cpu_type", "vexriscv")
+        kwargs.setdefault("cpu_variant", "jtag")
+        kwargs.setdefault("integrated_rom_size", 0x8000)
+        kwargs.setdefault("integrated_sram_size", 0x8000)
+        if with_uart_bridge:
+            kwargs["with_uart"] = False
         SoCCore.__init__(self, platform, clk_freq=sys_clk_freq,
-            cpu_type="vexriscv",
-            cpu_variant="jtag",
-            integrated_rom_size=0x8000,
-            integrated_sram_size=0x8000,
             ident="Avalanche PolarFire LiteX SoC", ident_version=True,
             **kwargs)
 
+        # configuration (preset: None for the defaults/individual options)
+        self.add_constant("SOC_PRESET", preset or "none")
+        self.add_constant("SOC_CPU_VARIANT", kwargs["cpu_variant"])
+
         # crg
-        self.submodules.crg = _CRG(platform)
+        self.add_crg(platform, sys_clk_freq)
+
+        # boot timestamps (from the FPGA configuration to the CPU start)
+        self.submodules.boot_timer = BootTimer(self.crg.boot_events + [("cpu_start", ~ResetSignal())])
+        self.add_constant("BOOT_TIMER_CLK_FREQ", self.crg.osc_clk_freq)
+
+        # uart wishbone bridge (replaces the CPU console, see tools/uart_bridge.py)
+        if with_uart_bridge:
+            self.add_uart_bridge(platform, kwargs.get("uart_baudrate", 115200))
 
         # peripherals
-        self.submodules.spi = SPIMaster(platform.request("pmodspi"))
-        self.submodules.i2c = I2C(platform.request("i2c"))
+        spi_pads = platform.request("pmodspi")
+        self.submodules.i2c = I2CMaster(sys_clk_freq)
+        self.add_i2c_bus(platform, self.i2c)
+        self.add_constant("I2C_FIFO_DEPTH", self.i2c.fifo_depth)
         self.submodules.gpio = ArduinoGPIO(platform)
 
         # jtag
+        if kwargs["cpu_variant"] == "jtag":
+            jtag_if = platform.request("jtag")
+
+            self.comb += self.cpu.jtag_tdi.eq(jtag_if.tdi)
+            self.comb += self.cpu.jtag_tms.eq(jtag_if.tms)
+            self.comb += self.cpu.jtag_tck.eq(jtag_if.tck)
+
+            self.comb += jtag_if.tdo.eq(self.cpu.jtag_tdo)
+
+        # scratchpad (on-chip LSRAM outside of the L2/DDR3 path, see firmware/linker.ld)
+        if scratchpad_size:
+            self.submodules.scratchpad = wishbone.SRAM(scratchpad_size)
+            self.add_wb_slave(mem_decoder(self.mem_map["scratchpad"]), self.scratchpad.bus)
+            self.add_memory_region("scratchpad", self.mem_map["scratchpad"], scratchpad_size)
+
+        # ddram controller (core parameters validated before the build)
+        ddr3_parameters = DDR3Controller.parameters(
+            queue_depth=ddr3_queue_depth,
+            reorder=ddr3_reorder,
+            partial_bursts=ddr3_partial_bursts,
+            address_map=ddr3_address_map,
+            trefi=ddr3_trefi,
+            trfc=ddr3_trfc)
+        self.add_constant("DDR3_QUEUE_DEPTH", ddr3_queue_depth)
+        self.add_constant("DDR3_ADDRESS_MAP", ddr3_address_map)
+        axi_port = LiteDRAMAXIPort(data_width=64, address_width=32, id_width=4)
+        self.add_ddram(platform, axi_port, ddr3_parameters)
 
-        jtag_if = platform.request("jtag")
+        # axi masters to ddram controller (interconnect built on finalize)
+        self.axi_port = axi_port
+        self._axi_masters = []
+        self._axi_priorities = []
 
-        self.comb += self.cpu.jtag_tdi.eq(jtag_if.tdi)
-        self.comb += self.cpu.jtag_tms.eq(jtag_if.tms)
-        self.comb += self.cpu.jtag_tck.eq(jtag_if.tck)
+        # wishbone to axi (one INCR burst per l2 cache line, optional posted
+        # writes/prefetching)
+        wb_sdram = wishbone.Interface()
+        self.submodules.l2_cache = L2Cache(l2_size, wb_sdram, wishbone.Interface(8*l2_line_size),
+            ways=l2_ways, replacement=l2_replacement)
+        self.add_constant("L2_SIZE", l2_size)
+        self.add_constant("L2_LINE_SIZE", l2_line_size)
+        self.add_constant("L2_WAYS", l2_ways)
+        self.add_constant("L2_WRITE_BUFFER_DEPTH", l2_write_buffer_depth)
+        self.add_constant("L2_PREFETCH_DEPTH", l2_prefetch_depth)
+        l2_axi_port = self.add_axi_master(priority=1)
+        self.submodules.l2_bridge = Wishbone2AXIBurst(self.l2_cache.slave, l2_axi_port,
+            write_buffer_depth=l2_write_buffer_depth, prefetch_depth=l2_prefetch_depth)
+        self.comb += [
+            self.l2_bridge.flush.eq(self.l2_cache.flush),
+            self.l2_cache.slave_pending.eq(self.l2_bridge.pending)
+        ]
+        self.add_wb_slave(mem_decoder(self.mem_map["main_ram"]), wb_sdram)
+        self.add_memory_region("main_ram", self.mem_map["main_ram"], 0x10000000)
 
-        self.comb += jtag_if.tdo.eq(self.cpu.jtag_tdo)
+        # axi bist
+        if with_axi_bist:
+            self.submodules.axi_bist = AXIBIST(self.add_axi_master())
+
+        # spi engine (pmod, optionally streaming from/to main_ram)
+        self.submodules.spi = SPIEngine(spi_pads, self.add_axi_master() if with_spi_dma else None)
+        self.add_constant("SPI_FIFO_DEPTH", self.spi.fifo_depth)
+
+        # spi flash (BIOS flash boot, execute in place, copy engine to main_ram)
+        if with_spiflash:
+            # the boot image is copied in 64-bit AXI beats
+            assert 0 <= spiflash_boot_offset < 0x1000000
+            assert spiflash_boot_offset % 8 == 0
+            self.submodules.spiflash = SPIFlash(self.add_spiflash_pads(platform), self.add_axi_master())
+            self.add_wb_slave(mem_decoder(self.mem_map["spiflash"]), self.spiflash.bus)
+            self.add_memory_region("spiflash", self.mem_map["spiflash"], 0x1000000)
+            self.add_constant("FLASH_BOOT_ADDRESS", self.mem_map["spiflash"] + spiflash_boot_offset)
+
+        # dma engine (memcpy/memset offload)
+        if with_dma:
+            self.submodules.dma = AXIDMA(self.add_axi_master())
+
+        # pc sampling profiler (ring buffer in main_ram)
+        if with_profiler:
+            self.submodules.profiler = PCProfiler(self.add_axi_master())
+
+        # axi performance monitor (ddram controller port)
+        if with_axi_monitor:
+            self.submodules.axi_monitor = AXIMonitor(axi_port)
+            self.add_constant("AXI_MONITOR_BUCKETS", self.axi_monitor.nbuckets)
 
-        # ddram controller
-        ddram_ready = Signal()
-        axi_port = LiteDRAMAXIPort(data_width=64, address_width=32, id_width=4)
+        # led0: led blink
+        counter = Signal(32)
+        self.sync += counter.eq(counter + 1)
+        self.comb += platform.request("user_led", 0).eq(counter[26])
+
+        # led2: ddram_ready
+        self.comb += platform.request("user_led", 2).eq(~self.crg.cd_sys_ddram_ready) # led is active low
+
+    def add_axi_master(self, priority=0):
+        if self.finalized:
+            raise FinalizeError
+        port = LiteDRAMAXIPort(data_width=64, address_width=32, id_width=4)
+        self._axi_masters.append(port)
+        self._axi_priorities.append(priority)
+        return port
+
+    def do_finalize(self):
+        self.submodules.axi_interconnect = AXIInterconnect(self._axi_masters, self.axi_port,
+            priorities=self._axi_priorities)
+        SoCCore.do_finalize(self)
+
+    def add_crg(self, platform, sys_clk_freq):
+        self.submodules.crg = _CRG(platform, sys_clk_freq)
+
+    def add_uart_bridge(self, platform, baudrate):
+        phy = RS232PHY(platform.request("serial"), self.clk_freq, baudrate)
+        self.submodules.uart_bridge = UARTBridge(phy, self.clk_freq)
+        self.add_wb_master(self.uart_bridge.wishbone)
+
+    def add_spiflash_pads(self, platform):
+        pins = SPIFlashPins()
+        self.submodules += pins
+        return pins
+
+    def add_i2c_bus(self, platform, i2c):
+        pads = platform.request("i2c")
+        self.specials += [
+            Tristate(pads.scl, 0, i2c.scl_oe, i2c.scl_i),
+            Tristate(pads.sda, 0, i2c.sda_oe, i2c.sda_i)
+        ]
+
+    def add_ddram(self, platform, axi_port, parameters={}):
+        platform.add_extension(_ddram_specific_ios)
         ddram_pads = platform.request("ddram")
         self.specials += Instance("ddr3",
             # control / status
             i_PLL_REF_CLK=self.crg.cd_ccc.clk,
             i_SYS_RESET_N=~self.crg.cd_ccc.rst,
-            o_SYS_CLK=self.crg.cd_sys.clk,
             o_PLL_LOCK=self.crg.cd_sys_pll_lock,
             o_SHIELD0=platform.request("ddram_shield", 0),
             o_SHIELD1=platform.request("ddram_shield", 1),
@@ -151,6 +346,10 @@ class BaseSoC(SoCCore):
             o_ODT=ddram_pads.odt,
             o_RESET_N=ddram_pads.reset_n,
 
+            # axi port in the sys domain (clock crossing in the controller)
+            i_axi0_aclk=ClockSignal("sys"),
+            i_axi0_aresetn=~ResetSignal("sys"),
+
             # axi aw
             i_axi0_awvalid=axi_port.aw.valid,
             o_axi0_awready=axi_port.aw.ready,
@@ -195,41 +394,182 @@ class BaseSoC(SoCCore):
             o_axi0_rresp=axi_port.r.resp,
             o_axi0_rdata=axi_port.r.data,
             o_axi0_rid=axi_port.r.id,
+
+            # controller/init parameters
+            **{"p_" + k: v for k, v in parameters.items()}
         )
         DDR3Controller.add_sources(platform)
         DDR3Controller.add_floorplanning_constraints(platform)
         DDR3Controller.add_timing_constraints(platform)
+        platform.toolchain.additional_timing_constraints += [
+            "set_clock_groups -asynchronous "
+            "-group [ get_clocks { ccc/ccc_0/pll_inst_0/OUT1 } ] "
+            "-group [ get_clocks { ddr3/CCC_0/pll_inst_0/OUT1 } ]",
+        ]
         self.add_constant("MAIN_RAM_TEST", None)
 
 
-        # wishbone to axi
-        wb_sdram = wishbone.Interface()
-        l2_cache = wishbone.Cache(l2_size//4, wb_sdram, wishbone.Interface(axi_port.data_width))
-        self.add_constant("L2_SIZE", l2_size)
-        wishbone2axi = LiteDRAMWishbone2AXI(l2_cache.slave, axi_port)
-        self.submodules += l2_cache, wishbone2axi
-        self.add_wb_slave(mem_decoder(self.mem_map["main_ram"]), wb_sdram)
-        self.add_memory_region("main_ram", self.mem_map["main_ram"], 0x10000000)
-
-        # led0: led blink
-        counter = Signal(32)
-        self.sync += counter.eq(counter + 1)
-        self.comb += platform.request("user_led", 0).eq(counter[26])
-
-        # led2: ddram_ready
-        self.comb += platform.request("user_led", 2).eq(~self.crg.cd_sys_ddram_ready) # led is active low
+# Named configurations (BaseSoC arguments), options given explicitly override them
+presets = {
+    "minimal": {
+        "cpu_variant":           "min",
+        "integrated_sram_size":  0x4000,
+        "scratchpad_size":       0,
+        "l2_size":               2048,
+        "l2_line_size":          32,
+        "l2_ways":               1,
+        "l2_write_buffer_depth": 0,
+        "l2_prefetch_depth":     0,
+        "with_axi_bist":         False,
+        "with_axi_monitor":      False,
+        "with_dma":              False,
+        "with_spi_dma":          False,
+        "with_profiler":         False,
+        "with_spiflash":         False,
+    },
+    "balanced-debug": {
+        "cpu_variant":           "jtag",
+        "integrated_sram_size":  0x8000,
+        "scratchpad_size":       0x4000,
+        "l2_size":               8192,
+        "l2_line_size":          32,
+        "l2_ways":               2,
+        "l2_replacement":        "lru",
+        "l2_write_buffer_depth": 4,
+        "l2_prefetch_depth":     2,
+        "with_axi_bist":         True,
+        "with_axi_monitor":      True,
+        "with_dma":              True,
+        "with_spi_dma":          True,
+        "with_profiler":         True,
+        "with_spiflash":         True,
+    },
+    "max-throughput": {
+        "cpu_variant":           "full", # largest VexRiscv caches
+        "integrated_sram_size":  0x10000,
+        "scratchpad_size":       0x10000,
+        "l2_size":               65536,
+        "l2_line_size":          64,
+        "l2_ways":               4,
+        "l2_replacement":        "plru",
+        "l2_write_buffer_depth": 8,
+        "l2_prefetch_depth":     4,
+        "with_axi_bist":         False,
+        "with_axi_monitor":      False,
+        "with_dma":              True,
+        "with_spi_dma":          True,
+        "with_profiler":         True,
+        "with_spiflash":         True,
+    },
+}
+
+
+def preset_argdict(preset, **overrides):
+    r = dict(presets[preset]) if preset is not None else dict()
+    r.update({k: v for k, v in overrides.items() if v is not None})
+    if preset is not None:
+        r["preset"] = preset
+    return r
+
+
+def base_soc_args(parser):
+    soc_core_args(parser)
+    parser.add_argument("--preset", default=None, choices=sorted(presets.keys()),
+                        help="named SoC configuration, other options override it")
+    parser.add_argument("--sys-clk-freq", default=None, type=lambda x: int(float(x)),
+                        help="system clock frequency, generated by the CCC (default=100e6)")
+    parser.add_argument("--integrated-sram-size", default=None, type=lambda x: int(x, 0),
+                        help="integrated SRAM size in bytes (default=0x8000)")
+    parser.add_argument("--scratchpad-size", default=None, type=lambda x: int(x, 0),
+                        help="scratchpad size in bytes, 0 to disable (default=0x4000)")
+    parser.add_argument("--l2-size", default=None, type=int,
+                        help="L2 cache size in bytes (default=8192)")
+    parser.add_argument("--l2-line-size", default=None, type=int,
+                        help="L2 cache line size in bytes, one AXI burst per line (default=32)")
+    parser.add_argument("--l2-ways", default=None, type=int,
+                        help="L2 cache associativity (default=1)")
+    parser.add_argument("--l2-replacement", default=None, choices=["lru", "plru"],
+                        help="L2 cache replacement policy (default=lru)")
+    parser.add_argument("--l2-write-buffer-depth", default=None, type=int,
+                        help="L2 posted write buffer depth in lines, 0 to disable (default=0)")
+    parser.add_argument("--l2-prefetch-depth", default=None, type=int,
+                        help="L2 prefetch stream buffer depth in lines, 0 to disable (default=0)")
+    parser.add_argument("--with-axi-bist", default=None, action="store_true",
+                        help="enable the AXI traffic generator/checker (default)")
+    parser.add_argument("--no-axi-bist", dest="with_axi_bist", action="store_false",
+                        help="disable the AXI traffic generator/checker")
+    parser.add_argument("--with-axi-monitor", default=None, action="store_true",
+                        help="enable the AXI bus performance monitor")
+    parser.add_argument("--no-axi-monitor", dest="with_axi_monitor", action="store_false",
+                        help="disable the AXI bus performance monitor (default)")
+    parser.add_argument("--with-dma", default=None, action="store_true",
+                        help="enable the AXI DMA engine (default)")
+    parser.add_argument("--no-dma", dest="with_dma", action="store_false",
+                        help="disable the AXI DMA engine")
+    parser.add_argument("--with-spi-dma", default=None, action="store_true",
+                        help="let the SPI engine stream from/to main_ram (default)")
+    parser.add_argument("--no-spi-dma", dest="with_spi_dma", action="store_false",
+                        help="SPI engine with CPU FIFOs only")
+    parser.add_argument("--with-profiler", default=None, action="store_true",
+                        help="enable the PC sampling profiler (default)")
+    parser.add_argument("--no-profiler", dest="with_profiler", action="store_false",
+                        help="disable the PC sampling profiler")
+    parser.add_argument("--with-spiflash", default=None, action="store_true",
+                        help="enable the SPI flash controller and flash boot (default)")
+    parser.add_argument("--no-spiflash", dest="with_spiflash", action="store_false",
+                        help="disable the SPI flash controller")
+    parser.add_argument("--spiflash-boot-offset", default=None, type=lambda x: int(x, 0),
+                        help="offset of the BIOS flash boot image in the SPI flash, 8-byte aligned (default=0xc00000)")
+    parser.add_argument("--with-uart-bridge", default=None, action="store_true",
+                        help="replace the CPU UART with a Wishbone bridge (tools/uart_bridge.py)")
+    parser.add_argument("--ddr3-queue-depth", default=None, type=int,
+                        help="DDR3 controller command queue depth, 1 to 4 (default=3)")
+    parser.add_argument("--ddr3-reorder", default=None, action="store_true",
+                        help="let the DDR3 controller reorder the commands of the AXI port")
+    parser.add_argument("--ddr3-partial-bursts", default=None, action="store_true",
+                        help="let the DDR3 controller accept bursts of less than a full DDR3 burst")
+    parser.add_argument("--ddr3-address-map", default=None, choices=sorted(DDR3Controller.address_maps.keys()),
+                        help="DDR3 controller address map (default=row-bank-col)")
+    parser.add_argument("--ddr3-trefi", default=None, type=float,
+                        help="DDR3 refresh interval in ns, at most 7800 (default=7800)")
+    parser.add_argument("--ddr3-trfc", default=None, type=float,
+                        help="DDR3 refresh cycle time in ns (default=260)")
+
+
+def base_soc_argdict(args):
+    overrides = soc_core_argdict(args)
+    for a in ["sys_clk_freq", "integrated_sram_size", "scratchpad_size", "l2_size", "l2_line_size", "l2_ways", "l2_replacement",
+              "l2_write_buffer_depth", "l2_prefetch_depth",
+              "with_axi_bist", "with_axi_monitor", "with_dma", "with_spi_dma", "with_profiler", "with_uart_bridge",
+              "with_spiflash", "spiflash_boot_offset",
+              "ddr3_queue_depth", "ddr3_reorder", "ddr3_partial_bursts", "ddr3_address_map",
+              "ddr3_trefi", "ddr3_trfc"]:
+        overrides[a] = getattr(args, a)
+    return preset_argdict(args.preset, **overrides)
 
 
 def main():
     parser = argparse.ArgumentParser(description="LiteX SoC port to Avalanche")
     builder_args(parser)
-    soc_core_args(parser)
+    base_soc_args(parser)
+    parser.add_argument("--build-cache", default="build/cache",
+                        help="bitstream cache directory (default=build/cache)")
+    parser.add_argument("--no-build-cache", action="store_true",
+                        help="always run the toolchain")
     args = parser.parse_args()
 
     platform = avalanche.Platform()
-    soc = BaseSoC(platform)
-    builder = Builder(soc, output_dir="build")
+    soc = BaseSoC(platform, **base_soc_argdict(args))
+    builder_kwargs = builder_argdict(args)
+    builder_kwargs["output_dir"] = args.output_dir or "build"
+    compile_gateware = builder_kwargs["compile_gateware"]
+    builder_kwargs["compile_gateware"] = compile_gateware and args.no_build_cache
+    builder = Builder(soc, **builder_kwargs)
     builder.build()
+    if compile_gateware and not args.no_build_cache:
+        build_cache = BuildCache(args.build_cache)
+        build_cache.build(platform, os.path.join(builder.output_dir, "gateware"),
+            toolchain_path=builder_kwargs.get("gateware_toolchain_path"))
 
 if __name__ == "__main__":
     main()
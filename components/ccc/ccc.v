@@ -6,11 +6,19 @@
 `timescale 1ns / 100ps
 
 // ccc
-module ccc(
+// (divider parameters overridden by CCC.parameters() in components/wrappers.py)
+module ccc #(
+    parameter        VCOFREQUENCY = 4800,
+    parameter [5:0]  RFDIV        = 1,
+    parameter [11:0] FB_INT_VAL   = 30,
+    parameter [6:0]  DIV0_VAL     = 12,
+    parameter [6:0]  DIV1_VAL     = 12
+    )(
     // Inputs
     REF_CLK_0,
     // Outputs
     OUT0_FABCLK_0,
+    OUT1_FABCLK_0,
     PLL_LOCK_0
 );
 
@@ -22,14 +30,17 @@ input  REF_CLK_0;
 // Output
 //--------------------------------------------------------------------
 output OUT0_FABCLK_0;
+output OUT1_FABCLK_0;
 output PLL_LOCK_0;
 //--------------------------------------------------------------------
 // Nets
 //--------------------------------------------------------------------
 wire   OUT0_FABCLK_0_net_0;
+wire   OUT1_FABCLK_0_net_0;
 wire   PLL_LOCK_0_net_0;
 wire   REF_CLK_0;
 wire   OUT0_FABCLK_0_net_1;
+wire   OUT1_FABCLK_0_net_1;
 wire   PLL_LOCK_0_net_1;
 //--------------------------------------------------------------------
 // TiedOff Nets
@@ -56,17 +67,27 @@ assign DLL_DRI_WDATA_const_net_0 = 33'h000000000;
 //--------------------------------------------------------------------
 assign OUT0_FABCLK_0_net_1 = OUT0_FABCLK_0_net_0;
 assign OUT0_FABCLK_0       = OUT0_FABCLK_0_net_1;
+assign OUT1_FABCLK_0_net_1 = OUT1_FABCLK_0_net_0;
+assign OUT1_FABCLK_0       = OUT1_FABCLK_0_net_1;
 assign PLL_LOCK_0_net_1    = PLL_LOCK_0_net_0;
 assign PLL_LOCK_0          = PLL_LOCK_0_net_1;
 //--------------------------------------------------------------------
 // Component instances
 //--------------------------------------------------------------------
 //--------ccc_ccc_0_PF_CCC   -   Actel:SgCore:PF_CCC:1.0.115
-ccc_ccc_0_PF_CCC ccc_0(
+ccc_ccc_0_PF_CCC #(
+        .VCOFREQUENCY  ( VCOFREQUENCY ),
+        .RFDIV         ( RFDIV ),
+        .FB_INT_VAL    ( FB_INT_VAL ),
+        .DIV0_VAL      ( DIV0_VAL ),
+        .DIV1_VAL      ( DIV1_VAL )
+        )
+ccc_0(
         // Inputs
         .REF_CLK_0     ( REF_CLK_0 ),
         // Outputs
         .OUT0_FABCLK_0 ( OUT0_FABCLK_0_net_0 ),
+        .OUT1_FABCLK_0 ( OUT1_FABCLK_0_net_0 ),
         .PLL_LOCK_0    ( PLL_LOCK_0_net_0 ) 
         );
 
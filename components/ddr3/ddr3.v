@@ -6,10 +6,32 @@
 `timescale 1ns / 100ps
 
 // ddr3
-module ddr3(
+// (controller/init parameters overridden by DDR3Controller.parameters() in
+// components/wrappers.py, AXI port clocked by axi0_aclk/axi0_aresetn, crossed
+// to SYS_CLK by the controller: AXI_SINGLE_CLOCK_MODE=0)
+module ddr3 #(
+    parameter QUEUE_DEPTH                  = 3,
+    parameter AXI_ENABLE_INTRAPORT_REORDER = 0,
+    parameter ALLOW_PARTIAL_BURSTS         = 0,
+    parameter DEF_CFG_BANKADDR_MAP         = 49866,
+    parameter DEF_CFG_CHIPADDR_MAP         = 28,
+    parameter DEF_CFG_COLADDR_MAP_0        = 67903552,
+    parameter DEF_CFG_COLADDR_MAP_1        = 75613716,
+    parameter DEF_CFG_COLADDR_MAP_2        = 2,
+    parameter DEF_CFG_COLADDR_MAP_3        = 0,
+    parameter DEF_CFG_ROWADDR_MAP_0        = 21033869,
+    parameter DEF_CFG_ROWADDR_MAP_1        = 156570441,
+    parameter DEF_CFG_ROWADDR_MAP_2        = 110715253,
+    parameter DEF_CFG_ROWADDR_MAP_3        = 27,
+    parameter DEF_CFG_AUTO_REF_EN          = 1,
+    parameter DEF_CFG_REF_PER              = 3120,
+    parameter DEF_CFG_RFC                  = 104
+    )(
     // Inputs
     PLL_REF_CLK,
     SYS_RESET_N,
+    axi0_aclk,
+    axi0_aresetn,
     axi0_araddr,
     axi0_arburst,
     axi0_arcache,
@@ -74,6 +96,8 @@ module ddr3(
 //--------------------------------------------------------------------
 input         PLL_REF_CLK;
 input         SYS_RESET_N;
+input         axi0_aclk;
+input         axi0_aresetn;
 input  [31:0] axi0_araddr;
 input  [1:0]  axi0_arburst;
 input  [3:0]  axi0_arcache;
@@ -536,6 +560,8 @@ wire           SHIELD0_net_0;
 wire           SHIELD1_net_0;
 wire           SYS_CLK_net_0;
 wire           SYS_RESET_N;
+wire           axi0_aclk;
+wire           axi0_aresetn;
 wire           WE_N_net_0;
 wire   [1:0]   DM_net_1;
 wire           CKE_net_1;
@@ -1257,7 +1283,7 @@ ddr3_DDRCTRL_0_CoreDDRMemCtrlr #(
         .ADDR_MAP_SIG_BITS            ( 10 ),
         .ADDR_WIDTH                   ( 34 ),
         .ADDR_WIDTH_TS                ( 37 ),
-        .ALLOW_PARTIAL_BURSTS         ( 0 ),
+        .ALLOW_PARTIAL_BURSTS         ( ALLOW_PARTIAL_BURSTS ),
         .AXI0_ENABLE_PAR              ( 1 ),
         .AXI1_ENABLE_PAR              ( 0 ),
         .AXI2_ENABLE_PAR              ( 0 ),
@@ -1271,7 +1297,7 @@ ddr3_DDRCTRL_0_CoreDDRMemCtrlr #(
         .AXI_AWUSERTAG_WIDTH          ( 4 ),
         .AXI_DATA_WIDTH               ( 64 ),
         .AXI_ECC_SUPPORT              ( 0 ),
-        .AXI_ENABLE_INTRAPORT_REORDER ( 0 ),
+        .AXI_ENABLE_INTRAPORT_REORDER ( AXI_ENABLE_INTRAPORT_REORDER ),
         .AXI_LEN_WIDTH                ( 8 ),
         .AXI_SINGLE_CLOCK_MODE        ( 0 ),
         .AXI_SLAVE_ID_WIDTH           ( 4 ),
@@ -1342,7 +1368,7 @@ ddr3_DDRCTRL_0_CoreDDRMemCtrlr #(
         .PD_SR_SUPPORTED              ( 0 ),
         .PIPELINE_CFG_REGS            ( 1 ),
         .QM_COMMAND_PIPE_STAGES       ( 2 ),
-        .QUEUE_DEPTH                  ( 3 ),
+        .QUEUE_DEPTH                  ( QUEUE_DEPTH ),
         .SDRAM_BANKSTATMODULES        ( 4 ),
         .SYNDROME_REG_PIPELINE        ( 0 ),
         .TAG_WIDTH                    ( 50 ),
@@ -1359,8 +1385,8 @@ DDRCTRL_0(
         .l_auto_pch                           ( GND_net ), // tied to 1'b0 from definition
         .l_datain                             ( l_datain_const_net_0 ), // tied to 128'h00000000000000000000000000000000 from definition
         .l_dm_in                              ( l_dm_in_const_net_0 ), // tied to 16'h0000 from definition
-        .axi0_aclk                            ( SYS_CLK_net_0 ),
-        .axi0_aresetn                         ( DDRPHY_BLK_0_SYNC_SYS_RST_N ),
+        .axi0_aclk                            ( axi0_aclk ),
+        .axi0_aresetn                         ( axi0_aresetn ),
         .axi0_awid                            ( axi0_awid ),
         .axi0_awaddr                          ( axi0_awaddr ),
         .axi0_awlen                           ( axi0_awlen ),
@@ -2486,10 +2512,10 @@ PF_DDR_CFG_INIT #(
         .DEF_CFG_ADDR_MIRROR                      ( 0 ),
         .DEF_CFG_AL_MODE                          ( 0 ),
         .DEF_CFG_ASYNC_ODT                        ( 0 ),
-        .DEF_CFG_AUTO_REF_EN                      ( 1 ),
+        .DEF_CFG_AUTO_REF_EN                      ( DEF_CFG_AUTO_REF_EN ),
         .DEF_CFG_AUTO_SR                          ( 0 ),
         .DEF_CFG_AUTO_ZQ_CAL_EN                   ( 0 ),
-        .DEF_CFG_BANKADDR_MAP                     ( 49866 ),
+        .DEF_CFG_BANKADDR_MAP                     ( DEF_CFG_BANKADDR_MAP ),
         .DEF_CFG_BG_INTERLEAVE                    ( 0 ),
         .DEF_CFG_BIT_MAP_INDEX_CS0                ( 0 ),
         .DEF_CFG_BIT_MAP_INDEX_CS1                ( 0 ),
@@ -2517,15 +2543,15 @@ PF_DDR_CFG_INIT #(
         .DEF_CFG_CAL_READ_PERIOD                  ( 0 ),
         .DEF_CFG_CCD_L                            ( 0 ),
         .DEF_CFG_CCD_S                            ( 0 ),
-        .DEF_CFG_CHIPADDR_MAP                     ( 28 ),
+        .DEF_CFG_CHIPADDR_MAP                     ( DEF_CFG_CHIPADDR_MAP ),
         .DEF_CFG_CIDADDR_MAP                      ( 0 ),
         .DEF_CFG_CKSRE                            ( 0 ),
         .DEF_CFG_CKSRX                            ( 0 ),
         .DEF_CFG_CL                               ( 6 ),
-        .DEF_CFG_COLADDR_MAP_0                    ( 67903552 ),
-        .DEF_CFG_COLADDR_MAP_1                    ( 75613716 ),
-        .DEF_CFG_COLADDR_MAP_2                    ( 2 ),
-        .DEF_CFG_COLADDR_MAP_3                    ( 0 ),
+        .DEF_CFG_COLADDR_MAP_0                    ( DEF_CFG_COLADDR_MAP_0 ),
+        .DEF_CFG_COLADDR_MAP_1                    ( DEF_CFG_COLADDR_MAP_1 ),
+        .DEF_CFG_COLADDR_MAP_2                    ( DEF_CFG_COLADDR_MAP_2 ),
+        .DEF_CFG_COLADDR_MAP_3                    ( DEF_CFG_COLADDR_MAP_3 ),
         .DEF_CFG_CRC_ERROR_CLEAR                  ( 0 ),
         .DEF_CFG_CS_TO_CMDADDR_LATENCY            ( 0 ),
         .DEF_CFG_CTRLR_BUSY_ENABLE                ( 0 ),
@@ -2641,9 +2667,9 @@ PF_DDR_CFG_INIT #(
         .DEF_CFG_READ_TO_READ_ODT                 ( 1 ),
         .DEF_CFG_READ_TO_WRITE                    ( 1 ),
         .DEF_CFG_READ_TO_WRITE_ODT                ( 1 ),
-        .DEF_CFG_REF_PER                          ( 3120 ),
+        .DEF_CFG_REF_PER                          ( DEF_CFG_REF_PER ),
         .DEF_CFG_REGDIMM                          ( 0 ),
-        .DEF_CFG_RFC                              ( 104 ),
+        .DEF_CFG_RFC                              ( DEF_CFG_RFC ),
         .DEF_CFG_RFC1                             ( 0 ),
         .DEF_CFG_RFC2                             ( 0 ),
         .DEF_CFG_RFC4                             ( 0 ),
@@ -2652,10 +2678,10 @@ PF_DDR_CFG_INIT #(
         .DEF_CFG_RFC_DLR4                         ( 0 ),
         .DEF_CFG_RL                               ( 0 ),
         .DEF_CFG_RMW_EN                           ( 0 ),
-        .DEF_CFG_ROWADDR_MAP_0                    ( 21033869 ),
-        .DEF_CFG_ROWADDR_MAP_1                    ( 156570441 ),
-        .DEF_CFG_ROWADDR_MAP_2                    ( 110715253 ),
-        .DEF_CFG_ROWADDR_MAP_3                    ( 27 ),
+        .DEF_CFG_ROWADDR_MAP_0                    ( DEF_CFG_ROWADDR_MAP_0 ),
+        .DEF_CFG_ROWADDR_MAP_1                    ( DEF_CFG_ROWADDR_MAP_1 ),
+        .DEF_CFG_ROWADDR_MAP_2                    ( DEF_CFG_ROWADDR_MAP_2 ),
+        .DEF_CFG_ROWADDR_MAP_3                    ( DEF_CFG_ROWADDR_MAP_3 ),
         .DEF_CFG_RP                               ( 6 ),
         .DEF_CFG_RRD                              ( 4 ),
         .DEF_CFG_RRD_DLR                          ( 0 ),
@@ -0,0 +1,115 @@
+"""HDL sources of the Libero components
+
+Libero writes a <component>_manifest.txt next to each component it generates
+with the HDL files used by the synthesis (absolute paths in the project they
+were generated in, component/work/... and component/Actel/<library>/...).
+The platform only gets these files, mapped to this directory, instead of
+the HDL files of the component directories: this leaves out the COREDDR_TIP
+and PF_DDR_CFG_INIT coreparameters.v, OE_GLUE_LOGIC.v and ddr_no_training.v
+which the synthesis does not use. Files of a manifest which are not in the
+repository (the encrypted DDRCTRL_0/CoreDDRMemCtrlr_0.v) are left out as
+before. Components without a manifest (jtag) use the Verilog files of their
+directory.
+
+HashCache keeps the SHA-256 of the sources in a JSON file with the size and
+modification time they were computed at, so the build cache key does not read
+unchanged files again.
+"""
+
+import os
+import json
+import time
+import hashlib
+
+
+_path = os.path.abspath(os.path.dirname(__file__))
+
+# Libero project directories of the manifests, mapped to this directory
+_manifest_prefixes = [
+    "component/work/",
+    "component/Actel/DirectCore/",
+    "component/Actel/SgCore/",
+]
+
+
+def parse_manifest(filename, root=_path):
+    """Synthesis HDL files of a Libero manifest (paths under root)"""
+    files = []
+    synthesis = False
+    with open(filename) as f:
+        for line in f:
+            if not line.startswith(" "):
+                # section header ("HDL source files for ... Synthesis ...:") or blank line
+                synthesis = line.startswith("HDL source files") and "Synthesis" in line
+                continue
+            if not synthesis:
+                continue
+            path = line.strip().replace("\\", "/")
+            for prefix in _manifest_prefixes:
+                i = path.find(prefix)
+                if i >= 0:
+                    files.append(os.path.join(root, *path[i + len(prefix):].split("/")))
+                    break
+            else:
+                raise ValueError("{}: unknown source location {}".format(filename, path))
+    return files
+
+
+def component_sources(component, root=_path):
+    directory = os.path.join(root, component)
+    manifest = os.path.join(directory, component + "_manifest.txt")
+    if not os.path.exists(manifest):
+        return sorted(os.path.join(directory, f) for f in os.listdir(directory) if f.endswith(".v"))
+    return [f for f in parse_manifest(manifest, root) if os.path.exists(f)]
+
+
+def add_component_sources(platform, *components):
+    for component in components:
+        for filename in component_sources(component):
+            platform.add_source(filename)
+
+
+class HashCache:
+    # files modified less than this before being hashed are hashed again next
+    # time (a change in the same mtime tick would not be seen otherwise)
+    racy_time = 2
+
+    def __init__(self, filename=None):
+        self.filename = filename
+        self.hashes = {}
+        self.dirty = False
+        if filename is not None and os.path.exists(filename):
+            try:
+                with open(filename) as f:
+                    self.hashes = json.load(f)
+            except ValueError:
+                pass
+
+    def hash(self, filename):
+        """SHA-256 of a file, read again only when its size/mtime changed"""
+        filename = os.path.abspath(filename)
+        st = os.stat(filename)
+        stat = [st.st_size, st.st_mtime_ns]
+        entry = self.hashes.get(filename)
+        if entry is not None and entry[:2] == stat:
+            return entry[2]
+        h = hashlib.sha256()
+        with open(filename, "rb") as f:
+            for chunk in iter(lambda: f.read(1 << 20), b""):
+                h.update(chunk)
+        digest = h.hexdigest()
+        if time.time() - st.st_mtime >= self.racy_time:
+            self.hashes[filename] = stat + [digest]
+            self.dirty = True
+        return digest
+
+    def save(self):
+        if self.filename is None or not self.dirty:
+            return
+        os.makedirs(os.path.dirname(os.path.abspath(self.filename)), exist_ok=True)
+        # concurrent builds (sweep.py) each replace the whole file
+        tmp = "{}.{}".format(self.filename, os.getpid())
+        with open(tmp, "w") as f:
+            json.dump(self.hashes, f, indent=1, sort_keys=True)
+        os.replace(tmp, self.filename)
+        self.dirty = False
@@ -1,7 +1,9 @@
-import os
+from fractions import Fraction
 
 from migen import *
 
+from components.sources import add_component_sources
+
 
 class JTAG(Module):
     def __init__(self):
@@ -35,11 +37,29 @@ class JTAG(Module):
 
     @staticmethod
     def add_sources(platform):
-        path = os.path.abspath(os.path.dirname(__file__))
-        platform.add_source_dir(os.path.join(path, "jtag"))
+        add_component_sources(platform, "jtag")
 
 
 class Monitor(Module):
+    # in boot order (timestamped by the boot timer)
+    outputs = [
+        "FABRIC_POR_N",
+        "DEVICE_INIT_DONE",
+        "XCVR_INIT_DONE",
+        "USRAM_INIT_DONE",
+        "USRAM_INIT_FROM_SNVM_DONE",
+        "USRAM_INIT_FROM_UPROM_DONE",
+        "USRAM_INIT_FROM_SPI_DONE",
+        "SRAM_INIT_DONE",
+        "SRAM_INIT_FROM_SNVM_DONE",
+        "SRAM_INIT_FROM_UPROM_DONE",
+        "SRAM_INIT_FROM_SPI_DONE",
+        "AUTOCALIB_DONE",
+        "PCIE_INIT_DONE",
+        "BANK_0_CALIB_STATUS",
+        "BANK_1_CALIB_STATUS",
+    ]
+
     def __init__(self):
         self.USRAM_INIT_DONE = Signal()
         self.DEVICE_INIT_DONE = Signal()
@@ -79,9 +99,7 @@ class Monitor(Module):
 
     @staticmethod
     def add_sources(platform):
-        path = os.path.abspath(os.path.dirname(__file__))
-        platform.add_source_dir(os.path.join(path, "monitor"))
-        platform.add_source_dir(os.path.join(path, "monitor", "monitor_0"))
+        add_component_sources(platform, "monitor")
 
 
 class Osc(Module):
@@ -96,16 +114,53 @@ class Osc(Module):
 
     @staticmethod
     def add_sources(platform):
-        path = os.path.abspath(os.path.dirname(__file__))
-        platform.add_source_dir(os.path.join(path, "osc"))
-        platform.add_source_dir(os.path.join(path, "osc", "osc_0"))
+        add_component_sources(platform, "osc")
 
 
-class CCC(Module):
+class SPIFlashPins(Module):
+    """Fabric access to the dedicated SPI pins of the configuration flash
+
+    Same signals as the pads of gateware.spi_flash.SPIFlash, the fabric owns
+    the pins once the device is initialized (the SoC is held in reset until
+    then).
+    """
     def __init__(self):
+        self.cs_n = Signal(reset=1)
+        self.clk = Signal()
+        self.mosi = Signal()
+        self.miso = Signal()
+
+        # # #
+
+        self.specials += Instance("SPI",
+            i_FAB_SPI_OWNER=1,
+            i_SS_O=self.cs_n,
+            i_SS_OE=1,
+            i_CLK_O=self.clk,
+            i_CLK_OE=1,
+            i_D_O=self.mosi,
+            i_D_OE=1,
+            o_D_I=self.miso,
+        )
+
+
+class CCC(Module):
+    """Fabric PLL: OUT0 (reference of the ddr3 core) and OUT1 (sys_clk)
+
+    Output frequencies are VCO/(4*DIVx) with VCO = REF_CLK*FB_INT_VAL/RFDIV.
+    """
+    # PolarFire PLL limits
+    rfdiv_range = (1, 63)
+    fbdiv_range = (1, 4095)
+    outdiv_range = (1, 127)
+    pfd_freq_range = (1e6, 312e6)
+    vco_freq_range = (800e6, 5000e6)
+
+    def __init__(self, parameters={}):
         self.REF_CLK_0 = Signal()
         self.PLL_LOCK_0 = Signal()
         self.OUT0_FABCLK_0 = Signal()
+        self.OUT1_FABCLK_0 = Signal()
 
         # # #
 
@@ -113,25 +168,91 @@ class CCC(Module):
             i_REF_CLK_0=self.REF_CLK_0,
             o_PLL_LOCK_0=self.PLL_LOCK_0,
             o_OUT0_FABCLK_0=self.OUT0_FABCLK_0,
+            o_OUT1_FABCLK_0=self.OUT1_FABCLK_0,
+            **{"p_" + k: v for k, v in parameters.items()}
         )
 
+    @staticmethod
+    def parameters(ref_clk_freq=160e6, out0_freq=100e6, out1_freq=100e6):
+        """Verilog parameters of the ccc component for exact output frequencies
+
+        The highest possible VCO frequency is used. Raises ValueError when no
+        divider settings give both frequencies.
+        """
+        ref = Fraction(int(ref_clk_freq))
+        out0 = Fraction(int(out0_freq))
+        out1 = Fraction(int(out1_freq))
+        candidates = []
+        for div0 in range(CCC.outdiv_range[0], CCC.outdiv_range[1] + 1):
+            vco = 4*div0*out0
+            if not CCC.vco_freq_range[0] <= vco <= CCC.vco_freq_range[1]:
+                continue
+            div1 = vco/(4*out1)
+            if div1.denominator != 1 or not CCC.outdiv_range[0] <= div1 <= CCC.outdiv_range[1]:
+                continue
+            for rfdiv in range(CCC.rfdiv_range[0], CCC.rfdiv_range[1] + 1):
+                fbdiv = vco*rfdiv/ref
+                if (fbdiv.denominator == 1 and
+                    CCC.fbdiv_range[0] <= fbdiv <= CCC.fbdiv_range[1] and
+                    CCC.pfd_freq_range[0] <= ref/rfdiv <= CCC.pfd_freq_range[1]):
+                    candidates.append((-vco, rfdiv, int(fbdiv), div0, int(div1)))
+                    break
+        if not candidates:
+            raise ValueError("No CCC setting gives {:g}MHz (OUT0) and {:g}MHz (OUT1) from {:g}MHz".format(
+                float(out0/1e6), float(out1/1e6), float(ref/1e6)))
+        vco, rfdiv, fbdiv, div0, div1 = min(candidates)
+        return {
+            "VCOFREQUENCY": int(-vco/1e6),
+            "RFDIV":        rfdiv,
+            "FB_INT_VAL":   fbdiv,
+            "DIV0_VAL":     div0,
+            "DIV1_VAL":     div1,
+        }
+
     @staticmethod
     def add_sources(platform):
-        path = os.path.abspath(os.path.dirname(__file__))
-        platform.add_source_dir(os.path.join(path, "ccc"))
-        platform.add_source_dir(os.path.join(path, "ccc", "ccc_0"))
+        add_component_sources(platform, "ccc")
 
     @staticmethod
-    def add_timing_constraints(platform):
-        platform.toolchain.additional_timing_constraints += [
+    def add_timing_constraints(platform, parameters=None, ref_clk_freq=160e6):
+        if parameters is None:
+            parameters = CCC.parameters(ref_clk_freq)
+        constraints = [
             # ccc
-            "create_clock -period 6.25 [ get_pins { ccc/ccc_0/pll_inst_0/REF_CLK_0 } ]",
-            "create_generated_clock -multiply_by 5 -divide_by 8 -source [ get_pins { ccc/ccc_0/pll_inst_0/REF_CLK_0 } ] -phase 0 [ get_pins { ccc/ccc_0/pll_inst_0/OUT0 } ]",
+            "create_clock -period {} [ get_pins {{ ccc/ccc_0/pll_inst_0/REF_CLK_0 }} ]".format(
+                1e9/ref_clk_freq),
         ]
+        for n in range(2):
+            ratio = Fraction(parameters["FB_INT_VAL"], 4*parameters["RFDIV"]*parameters["DIV{}_VAL".format(n)])
+            constraints.append("create_generated_clock -multiply_by {} -divide_by {} -source "
+                "[ get_pins {{ ccc/ccc_0/pll_inst_0/REF_CLK_0 }} ] -phase 0 [ get_pins {{ ccc/ccc_0/pll_inst_0/OUT{} }} ]".format(
+                ratio.numerator, ratio.denominator, n))
+        platform.toolchain.additional_timing_constraints += constraints
 
 
 class DDR3Controller(Module):
-    def __init__(self):
+    # Address maps (controller address bits, x16 so AXI address >> 1), fields
+    # from the LSB. The low 3 column bits always stay at the bottom (BL8).
+    address_maps = {
+        # default of the core: sequential accesses open one row per 2KB
+        "row-bank-col": [("col", 10), ("bank", 3), ("row", 15), ("chip", 1)],
+        # one bank per 64MB region (masters on separate regions do not
+        # close each other's rows)
+        "bank-row-col": [("col", 10), ("row", 15), ("bank", 3), ("chip", 1)],
+        # consecutive 16-byte bursts on the 8 banks (row hits of strided
+        # or interleaved streams)
+        "row-col-bank": [("col", 3), ("bank", 3), ("col", 7), ("row", 15), ("chip", 1)],
+    }
+
+    # Width of the PF_DDR_CFG_INIT map parameters (6-bit fields, 28-bit words)
+    _map_words = {
+        "row":  [28, 28, 28, 24],
+        "col":  [28, 28, 28, 12],
+        "bank": [36],
+        "chip": [24],
+    }
+
+    def __init__(self, parameters={}):
         self.axi0_awsize = Signal(3)
         self.DQS = Signal(2)
         self.axi0_arsize = Signal(3)
@@ -189,6 +310,8 @@ class DDR3Controller(Module):
         self.axi0_rlast = Signal()
         self.axi0_arcache = Signal(4)
         self.axi0_awprot = Signal(3)
+        self.axi0_aclk = Signal()
+        self.axi0_aresetn = Signal()
 
         # # #
 
@@ -210,6 +333,8 @@ class DDR3Controller(Module):
             i_axi0_awcache=self.axi0_awcache,
             i_axi0_araddr=self.axi0_araddr,
             i_SYS_RESET_N=self.SYS_RESET_N,
+            i_axi0_aclk=self.axi0_aclk,
+            i_axi0_aresetn=self.axi0_aresetn,
             i_axi0_awaddr=self.axi0_awaddr,
             o_CTRLR_READY=self.CTRLR_READY,
             o_RESET_N=self.RESET_N,
@@ -250,54 +375,66 @@ class DDR3Controller(Module):
             o_axi0_rlast=self.axi0_rlast,
             i_axi0_arcache=self.axi0_arcache,
             i_axi0_awprot=self.axi0_awprot,
+            **{"p_" + k: v for k, v in parameters.items()}
         )
 
+    @staticmethod
+    def _encode_address_map(address_map):
+        fields = {k: [] for k in DDR3Controller._map_words.keys()}
+        n = 0
+        for name, width in address_map:
+            fields[name] += range(n, n + width)
+            n += width
+        r = dict()
+        for name, words in DDR3Controller._map_words.items():
+            value = 0
+            for i, bit in enumerate(fields[name]):
+                value |= bit << 6*i
+            for i, word_width in enumerate(words):
+                key = "DEF_CFG_{}ADDR_MAP".format(name.upper())
+                if len(words) > 1:
+                    key += "_{}".format(i)
+                r[key] = value & (2**word_width - 1)
+                value >>= word_width
+        return r
+
+    @staticmethod
+    def parameters(queue_depth=3, reorder=False, partial_bursts=False,
+                   address_map="row-bank-col", trefi=7800, trfc=260, ddr_clk_freq=400e6):
+        """Verilog parameters of the ddr3 core (controller and init tables)
+
+        trefi/trfc are in ns. Raises ValueError for values outside of what the
+        core supports.
+        """
+        if queue_depth not in range(1, 5):
+            raise ValueError("Unsupported queue_depth {}, must be 1 to 4".format(queue_depth))
+        if address_map not in DDR3Controller.address_maps.keys():
+            raise ValueError("Unsupported address_map {}, must be one of {}".format(
+                address_map, ", ".join(sorted(DDR3Controller.address_maps.keys()))))
+        ref_per = int(trefi*ddr_clk_freq/1e9)
+        rfc = int(trfc*ddr_clk_freq/1e9 + 0.999)
+        if trefi > 7800 or ref_per >= 2**16:
+            raise ValueError("Unsupported trefi {}ns, must be at most 7800ns".format(trefi))
+        if rfc < 1 or rfc >= 2**10:
+            raise ValueError("Unsupported trfc {}ns, must be 1 to {}ns".format(
+                trfc, int((2**10 - 1)*1e9/ddr_clk_freq)))
+        if rfc >= ref_per:
+            raise ValueError("trfc ({}ns) must be lower than trefi ({}ns)".format(trfc, trefi))
+        r = {
+            "QUEUE_DEPTH":                  queue_depth,
+            "AXI_ENABLE_INTRAPORT_REORDER": int(reorder),
+            "ALLOW_PARTIAL_BURSTS":         int(partial_bursts),
+            "DEF_CFG_AUTO_REF_EN":          1,
+            "DEF_CFG_REF_PER":              ref_per,
+            "DEF_CFG_RFC":                  rfc,
+        }
+        r.update(DDR3Controller._encode_address_map(DDR3Controller.address_maps[address_map]))
+        return r
+
     @staticmethod
     def add_sources(platform):
-        path = os.path.abspath(os.path.dirname(__file__))
-
-        # ddr3
-        platform.add_source_dir(os.path.join(path, "ddr3"))
-        platform.add_source_dir(os.path.join(path, "ddr3", "CCC_0"))
-        platform.add_source_dir(os.path.join(path, "ddr3", "DDRCTRL_0"))
-        platform.add_source_dir(os.path.join(path, "ddr3", "DLL_0"))
-        
-        # ddr3_ddrphy_blk
-        platform.add_source_dir(os.path.join(path, "ddr3_DDRPHY_BLK"))
-        platform.add_source_dir(os.path.join(path, "ddr3_DDRPHY_BLK", "IOD_A_11_0"))
-        platform.add_source_dir(os.path.join(path, "ddr3_DDRPHY_BLK", "IOD_A_12"))
-        platform.add_source_dir(os.path.join(path, "ddr3_DDRPHY_BLK", "IOD_A_13"))
-        platform.add_source_dir(os.path.join(path, "ddr3_DDRPHY_BLK", "IOD_A_14"))
-        platform.add_source_dir(os.path.join(path, "ddr3_DDRPHY_BLK", "IOD_BA"))
-        platform.add_source_dir(os.path.join(path, "ddr3_DDRPHY_BLK", "IOD_BCLK_TRAINING"))
-        platform.add_source_dir(os.path.join(path, "ddr3_DDRPHY_BLK", "IOD_CAS_N"))
-        platform.add_source_dir(os.path.join(path, "ddr3_DDRPHY_BLK", "IOD_CKE"))
-        platform.add_source_dir(os.path.join(path, "ddr3_DDRPHY_BLK", "IOD_CS_N"))
-        platform.add_source_dir(os.path.join(path, "ddr3_DDRPHY_BLK", "IOD_ODT"))
-        platform.add_source_dir(os.path.join(path, "ddr3_DDRPHY_BLK", "IOD_RAS_N"))
-        platform.add_source_dir(os.path.join(path, "ddr3_DDRPHY_BLK", "IOD_REF_CLK_TRAINING"))
-        platform.add_source_dir(os.path.join(path, "ddr3_DDRPHY_BLK", "IOD_RESET_N"))
-        platform.add_source_dir(os.path.join(path, "ddr3_DDRPHY_BLK", "IOD_WE_N"))
-        platform.add_source_dir(os.path.join(path, "ddr3_DDRPHY_BLK", "LANE_0_CTRL"))
-        platform.add_source_dir(os.path.join(path, "ddr3_DDRPHY_BLK", "LANE_0_IOD_DM"))
-        platform.add_source_dir(os.path.join(path, "ddr3_DDRPHY_BLK", "LANE_0_IOD_DQ"))
-        platform.add_source_dir(os.path.join(path, "ddr3_DDRPHY_BLK", "LANE_0_IOD_DQS"))
-        platform.add_source_dir(os.path.join(path, "ddr3_DDRPHY_BLK", "LANE_0_IOD_DQSW_TRAINING"))
-        platform.add_source_dir(os.path.join(path, "ddr3_DDRPHY_BLK", "LANE_0_IOD_READ_TRAINING"))
-        platform.add_source_dir(os.path.join(path, "ddr3_DDRPHY_BLK", "LANE_1_CTRL"))
-        platform.add_source_dir(os.path.join(path, "ddr3_DDRPHY_BLK", "LANE_1_IOD_DM"))
-        platform.add_source_dir(os.path.join(path, "ddr3_DDRPHY_BLK", "LANE_1_IOD_DQ"))
-        platform.add_source_dir(os.path.join(path, "ddr3_DDRPHY_BLK", "LANE_1_IOD_DQS"))
-        platform.add_source_dir(os.path.join(path, "ddr3_DDRPHY_BLK", "LANE_1_IOD_DQSW_TRAINING"))
-        platform.add_source_dir(os.path.join(path, "ddr3_DDRPHY_BLK", "LANE_1_IOD_READ_TRAINING"))
-        platform.add_source_dir(os.path.join(path, "ddr3_DDRPHY_BLK", "LANECTRL_ADDR_CMD_0"))
-        
-        # coreddr_tip
-        platform.add_source_dir(os.path.join(path, "COREDDR_TIP", "1.6.106"))
-        platform.add_source_dir(os.path.join(path, "COREDDR_TIP", "1.6.106", "rtl", "vlog", "core"))
-        
-        # pf_ddr_cfg_init
-        platform.add_source_dir(os.path.join(path, "PF_DDR_CFG_INIT", "1.0.100"))
+        # controller (with PF_DDR_CFG_INIT) and phy (with COREDDR_TIP)
+        add_component_sources(platform, "ddr3", "ddr3_DDRPHY_BLK")
 
     @staticmethod
     def add_floorplanning_constraints(platform):
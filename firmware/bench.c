@@ -0,0 +1,442 @@
+#include <generated/csr.h>
+
+#include <stdio.h>
+#include <stdlib.h>
+#include <string.h>
+
+#include <generated/mem.h>
+#include <system.h>
+
+#include "sdram.h"
+#include "dma.h"
+#include "spi.h"
+#include "spiflash.h"
+#include "i2c.h"
+#include "bench.h"
+
+/*
+ * Results are printed one per line as:
+ * BENCH test=<test> mem=<sram|dram|flash|i2c> size=<bytes> [stride=<bytes>] <metric>=<value>
+ * with metric mbps (MB/s), kbps (KB/s) or cycles (sys_clk cycles per access).
+ */
+
+#define BENCH_SRAM_SIZE 8192
+#define BENCH_ITERATIONS 4
+#define BENCH_CHASE_LOADS 65536
+#define BENCH_CHASE_STRIDE 64
+
+static unsigned int sram_buffer[BENCH_SRAM_SIZE/4];
+static volatile unsigned int sink;
+
+static void timer_start(void)
+{
+	timer0_en_write(0);
+	timer0_reload_write(0);
+	timer0_load_write(0xffffffff);
+	timer0_en_write(1);
+}
+
+static unsigned int timer_stop(void)
+{
+	timer0_update_value_write(1);
+	timer0_en_write(0);
+	return 0xffffffff - timer0_value_read();
+}
+
+static void caches_flush(void)
+{
+	flush_cpu_dcache();
+	flush_l2_cache();
+	/* drain the posted writes of the L2 bridge */
+	while(l2_cache_flushing_read());
+}
+
+static unsigned int lcg(unsigned int *state)
+{
+	*state = 1664525*(*state) + 1013904223;
+	return *state;
+}
+
+static unsigned int mbps(unsigned int bytes, unsigned int cycles)
+{
+	if(cycles == 0)
+		return 0;
+	return ((unsigned long long) bytes*(SYSTEM_CLOCK_FREQUENCY/1000000))/cycles;
+}
+
+static unsigned int kbps(unsigned int bytes, unsigned int cycles)
+{
+	if(cycles == 0)
+		return 0;
+	return ((unsigned long long) bytes*(SYSTEM_CLOCK_FREQUENCY/1000))/cycles;
+}
+
+static void print_cycles(unsigned int cycles, unsigned int accesses)
+{
+	unsigned int centi;
+
+	centi = ((unsigned long long) cycles*100)/accesses;
+	printf("cycles=%u.%02u\n", centi/100, centi%100);
+}
+
+static const char *mem_name(volatile unsigned int *buffer)
+{
+	return (buffer == sram_buffer) ? "sram" : "dram";
+}
+
+/* Sequential read/write/copy */
+
+static void bench_seq_mem(volatile unsigned int *buffer, unsigned int size)
+{
+	volatile unsigned int *src, *dst;
+	unsigned int i, j, words, cycles, sum;
+
+	words = size/4;
+
+	/* Read */
+	caches_flush();
+	sum = 0;
+	timer_start();
+	for(j = 0; j < BENCH_ITERATIONS; j++)
+		for(i = 0; i < words; i++)
+			sum += buffer[i];
+	cycles = timer_stop();
+	printf("BENCH test=seq_read mem=%s size=%u mbps=%u\n",
+		mem_name(buffer), size, mbps(BENCH_ITERATIONS*size, cycles));
+
+	/* Write */
+	caches_flush();
+	timer_start();
+	for(j = 0; j < BENCH_ITERATIONS; j++)
+		for(i = 0; i < words; i++)
+			buffer[i] = i + sum;
+	cycles = timer_stop();
+	printf("BENCH test=seq_write mem=%s size=%u mbps=%u\n",
+		mem_name(buffer), size, mbps(BENCH_ITERATIONS*size, cycles));
+
+	/* Copy (first half to second half, bytes copied are counted) */
+	src = buffer;
+	dst = buffer + words/2;
+	caches_flush();
+	timer_start();
+	for(j = 0; j < BENCH_ITERATIONS; j++)
+		for(i = 0; i < words/2; i++)
+			dst[i] = src[i];
+	cycles = timer_stop();
+	printf("BENCH test=seq_copy mem=%s size=%u mbps=%u\n",
+		mem_name(buffer), size, mbps(BENCH_ITERATIONS*size/2, cycles));
+}
+
+void bench_seq(unsigned int size)
+{
+	bench_seq_mem(sram_buffer, BENCH_SRAM_SIZE);
+	bench_seq_mem((unsigned int *)SDRAM_TEST_BASE, size);
+}
+
+/* Pointer chase (dependent loads in a random single cycle) */
+
+static void bench_chase_mem(volatile unsigned int *buffer, unsigned int size)
+{
+	unsigned int i, j, n, stride, tmp, state, cycles;
+	volatile unsigned int *p;
+
+	stride = BENCH_CHASE_STRIDE/4;
+	n = size/BENCH_CHASE_STRIDE;
+	if(n < 2)
+		return;
+
+	/* Sattolo's shuffle of the indexes gives a single cycle */
+	for(i = 0; i < n; i++)
+		buffer[i*stride] = i;
+	state = 1;
+	for(i = n - 1; i > 0; i--) {
+		j = lcg(&state) % i;
+		tmp = buffer[i*stride];
+		buffer[i*stride] = buffer[j*stride];
+		buffer[j*stride] = tmp;
+	}
+	for(i = 0; i < n; i++)
+		buffer[i*stride] = (unsigned int)&buffer[buffer[i*stride]*stride];
+
+	/* Warm up the caches with one lap, then time */
+	caches_flush();
+	p = buffer;
+	for(i = 0; i < n; i++)
+		p = (volatile unsigned int *)*p;
+	timer_start();
+	for(i = 0; i < BENCH_CHASE_LOADS; i++)
+		p = (volatile unsigned int *)*p;
+	cycles = timer_stop();
+	sink = (unsigned int)p;
+	printf("BENCH test=latency mem=%s size=%u stride=%u ",
+		mem_name(buffer), size, BENCH_CHASE_STRIDE);
+	print_cycles(cycles, BENCH_CHASE_LOADS);
+}
+
+void bench_latency(unsigned int max_size)
+{
+	unsigned int size;
+
+	for(size = 1024; size <= BENCH_SRAM_SIZE; size <<= 1)
+		bench_chase_mem(sram_buffer, size);
+	for(size = 1024; size <= max_size; size <<= 1)
+		bench_chase_mem((unsigned int *)SDRAM_TEST_BASE, size);
+}
+
+/* Strided reads (one access per stride) */
+
+void bench_stride(unsigned int size)
+{
+	volatile unsigned int *buffer = (unsigned int *)SDRAM_TEST_BASE;
+	unsigned int i, j, stride, accesses, cycles, sum;
+
+	sum = 0;
+	for(stride = 4; stride <= 4096; stride <<= 1) {
+		accesses = 0;
+		caches_flush();
+		timer_start();
+		for(j = 0; j < stride/4 && accesses < size/4; j++)
+			for(i = j; i < size/4; i += stride/4) {
+				sum += buffer[i];
+				accesses++;
+			}
+		cycles = timer_stop();
+		sink = sum;
+		printf("BENCH test=stride_read mem=dram size=%u stride=%u ", size, stride);
+		print_cycles(cycles, accesses);
+	}
+}
+
+/* Random reads (independent accesses, includes the LCG) */
+
+void bench_random(unsigned int max_size)
+{
+	volatile unsigned int *buffer = (unsigned int *)SDRAM_TEST_BASE;
+	unsigned int i, size, state, cycles, sum;
+
+	sum = 0;
+	for(size = 1024; size <= max_size; size <<= 1) {
+		state = 1;
+		caches_flush();
+		timer_start();
+		for(i = 0; i < BENCH_CHASE_LOADS; i++)
+			sum += buffer[(lcg(&state) >> 8) & (size/4 - 1)];
+		cycles = timer_stop();
+		sink = sum;
+		printf("BENCH test=random_read mem=dram size=%u ", size);
+		print_cycles(cycles, BENCH_CHASE_LOADS);
+	}
+}
+
+#ifdef CSR_DMA_BASE
+
+/* DMA engine against the CPU (memcpy/memset), cache write back included */
+
+static int bench_check(volatile unsigned int *buffer, unsigned int words, unsigned int offset, int fill)
+{
+	unsigned int i;
+
+	for(i = 0; i < words; i++)
+		if(buffer[i] != (fill ? offset : i + offset))
+			return 0;
+	return 1;
+}
+
+static void bench_dma_print(const char *test, unsigned int size, unsigned int cycles, int ok)
+{
+	printf("BENCH test=%s mem=dram size=%u mbps=%u ticks=%u%s\n",
+		test, size, mbps(size, cycles), dma_ticks_read(), ok ? "" : " errors=1");
+}
+
+void bench_dma(unsigned int size)
+{
+	unsigned int *src = (unsigned int *)SDRAM_TEST_BASE;
+	unsigned int *dst = src + size/4;
+	struct dma_descriptor *descriptors = (struct dma_descriptor *)(dst + size/4);
+	unsigned int i, words, cycles;
+
+	words = size/4;
+	for(i = 0; i < words; i++)
+		src[i] = i + 0x1000;
+
+	/* Copy */
+	caches_flush();
+	timer_start();
+	memcpy(dst, src, size);
+	cycles = timer_stop();
+	printf("BENCH test=memcpy mem=dram size=%u mbps=%u\n", size, mbps(size, cycles));
+
+	memset(dst, 0, size);
+	caches_flush();
+	timer_start();
+	dma_copy(dst, src, size);
+	dma_wait();
+	cycles = timer_stop();
+	bench_dma_print("dma_copy", size, cycles, bench_check(dst, words, 0x1000, 0));
+
+	/* Fill */
+	caches_flush();
+	timer_start();
+	memset(dst, 0x5a, size);
+	cycles = timer_stop();
+	printf("BENCH test=memset mem=dram size=%u mbps=%u\n", size, mbps(size, cycles));
+
+	caches_flush();
+	timer_start();
+	dma_fill(dst, 0xa5a5a5a5, size);
+	dma_wait();
+	cycles = timer_stop();
+	bench_dma_print("dma_fill", size, cycles, bench_check(dst, words, 0xa5a5a5a5, 1));
+
+	/* Scatter-gather: the four quarters, last to first */
+	for(i = 0; i < 4; i++) {
+		descriptors[i].src = (unsigned int)(src + (3 - i)*words/4);
+		descriptors[i].dst = (unsigned int)(dst + (3 - i)*words/4);
+		descriptors[i].length = size/4;
+		descriptors[i].next = (i < 3) ? (unsigned int)&descriptors[i + 1] : 0;
+	}
+	caches_flush();
+	timer_start();
+	dma_chain(descriptors);
+	dma_wait();
+	cycles = timer_stop();
+	bench_dma_print("dma_chain", size, cycles, bench_check(dst, words, 0x1000, 0));
+}
+
+#endif
+
+#ifdef CSR_SPI_BASE
+
+/* SPI engine at sys_clk/2, CPU FIFOs then main_ram streaming (no slave, MISO read back as is) */
+
+void bench_spi(unsigned int size)
+{
+	unsigned char *tx = (unsigned char *)SDRAM_TEST_BASE;
+	unsigned char *rx = tx + size;
+	unsigned int i, cycles;
+
+	for(i = 0; i < size; i++)
+		tx[i] = i;
+	spi_config(0, 0);
+	spi_reset_write(1);
+
+	timer_start();
+	spi_xfer(tx, rx, size, 0);
+	cycles = timer_stop();
+	printf("BENCH test=spi_fifo mem=dram size=%u mbps=%u\n", size, mbps(size, cycles));
+
+#ifdef CSR_SPI_TX_ADDR_ADDR
+	timer_start();
+	spi_dma(tx, rx, size & ~7, 0);
+	spi_wait();
+	cycles = timer_stop();
+	printf("BENCH test=spi_dma mem=dram size=%u mbps=%u\n", size & ~7, mbps(size & ~7, cycles));
+#endif
+	printf("spi: %u transfers, %u bytes\n", spi_transfers_read(), spi_bytes_read());
+}
+
+#endif
+
+#ifdef CSR_SPIFLASH_BASE
+
+/* SPI flash to main_ram: memcpy through the read cache, then copy engine */
+
+void bench_flash(unsigned int size)
+{
+	unsigned char *dst = (unsigned char *)SDRAM_TEST_BASE;
+	unsigned int cycles;
+
+	if(size > SPIFLASH_SIZE)
+		size = SPIFLASH_SIZE;
+	flush_cpu_dcache();
+
+	timer_start();
+	memcpy(dst, (void *)SPIFLASH_BASE, size);
+	cycles = timer_stop();
+	printf("BENCH test=flash_xip mem=flash size=%u mbps=%u\n", size, mbps(size, cycles));
+
+#ifdef CSR_SPIFLASH_SRC_ADDR
+	timer_start();
+	spiflash_copy(dst, 0, size & ~7);
+	spiflash_wait();
+	cycles = timer_stop();
+	printf("BENCH test=flash_copy mem=flash size=%u mbps=%u\n", size & ~7, mbps(size & ~7, cycles));
+#endif
+	printf("flash: sys_clk/%u, read cache %u hits, %u misses\n",
+		2*(spiflash_divider_read() + 1), spiflash_hits_read(), spiflash_misses_read());
+}
+
+#endif
+
+#ifdef CSR_I2C_BASE
+
+/*
+ * Register reads from the I2C device at I2C_BENCH_ADDRESS (the simulation
+ * model) in standard and fast mode, then the CPU time of a queued read.
+ */
+
+#define I2C_BENCH_ADDRESS 0x50
+#define I2C_BENCH_SIZE 256
+
+static void bench_i2c_read(const char *test, unsigned int freq, unsigned char *buffer, unsigned int size)
+{
+	unsigned int cycles;
+	int ret;
+
+	i2c_config(freq);
+	timer_start();
+	ret = i2c_read(I2C_BENCH_ADDRESS, 0, buffer, size);
+	cycles = timer_stop();
+	printf("BENCH test=%s mem=i2c size=%u kbps=%u%s\n",
+		test, size, kbps(size, cycles), ret < 0 ? " nack" : "");
+}
+
+void bench_i2c(unsigned int size)
+{
+	unsigned char buffer[I2C_BENCH_SIZE];
+	unsigned int queued, cycles;
+
+	if(size > I2C_BENCH_SIZE)
+		size = I2C_BENCH_SIZE;
+	bench_i2c_read("i2c_standard", I2C_STANDARD_MODE, buffer, size);
+	bench_i2c_read("i2c_fast", I2C_FAST_MODE, buffer, size);
+
+	if(size > I2C_READ_MAX)
+		size = I2C_READ_MAX;
+	timer_start();
+	i2c_read_start(I2C_BENCH_ADDRESS, 0, size);
+	timer0_update_value_write(1);
+	queued = 0xffffffff - timer0_value_read();
+	while(!i2c_done());
+	i2c_read_finish(buffer, size);
+	cycles = timer_stop();
+	printf("BENCH test=i2c_queued mem=i2c size=%u kbps=%u\n", size, kbps(size, cycles));
+	printf("i2c: %u cycles of CPU to queue %u cycles of transfer\n", queued, cycles);
+	i2c_config(I2C_STANDARD_MODE);
+}
+
+#endif
+
+void bench(unsigned int size)
+{
+	printf("BENCH test=config preset=%s cpu_variant=%s sys_clk=%u l2_size=%u l2_ways=%u l2_line_size=%u "
+		"l2_write_buffer=%u l2_prefetch=%u ddr3_map=%s ddr3_queue_depth=%u\n",
+		SOC_PRESET, SOC_CPU_VARIANT, SYSTEM_CLOCK_FREQUENCY, L2_SIZE, L2_WAYS, L2_LINE_SIZE,
+		L2_WRITE_BUFFER_DEPTH, L2_PREFETCH_DEPTH, DDR3_ADDRESS_MAP, DDR3_QUEUE_DEPTH);
+	bench_seq(size);
+	bench_latency(size);
+	bench_stride(size);
+	bench_random(size);
+#ifdef CSR_DMA_BASE
+	bench_dma(size);
+#endif
+#ifdef CSR_SPI_BASE
+	bench_spi(size);
+#endif
+#ifdef CSR_SPIFLASH_BASE
+	bench_flash(size);
+#endif
+#ifdef CSR_I2C_BASE
+	bench_i2c(size);
+#endif
+}
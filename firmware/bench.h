@@ -0,0 +1,26 @@
+#ifndef __BENCH_H
+#define __BENCH_H
+
+#include <generated/csr.h>
+
+#define BENCH_DEFAULT_SIZE (1024*1024)
+
+void bench_seq(unsigned int size);
+void bench_latency(unsigned int max_size);
+void bench_stride(unsigned int size);
+void bench_random(unsigned int max_size);
+#ifdef CSR_DMA_BASE
+void bench_dma(unsigned int size);
+#endif
+#ifdef CSR_SPI_BASE
+void bench_spi(unsigned int size);
+#endif
+#ifdef CSR_SPIFLASH_BASE
+void bench_flash(unsigned int size);
+#endif
+#ifdef CSR_I2C_BASE
+void bench_i2c(unsigned int size);
+#endif
+void bench(unsigned int size);
+
+#endif /* __BENCH_H */
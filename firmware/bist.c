@@ -0,0 +1,70 @@
+#include <generated/csr.h>
+
+#include <stdio.h>
+#include <stdlib.h>
+
+#include <generated/mem.h>
+
+#include "bist.h"
+
+#ifdef CSR_AXI_BIST_BASE
+
+static void l2_invalidate(void)
+{
+	l2_cache_flush_write(1);
+	while(l2_cache_flushing_read());
+}
+
+static unsigned int bist_mbps(unsigned int length, unsigned int ticks)
+{
+	if(ticks == 0)
+		return 0;
+	return ((unsigned long long) length*(SYSTEM_CLOCK_FREQUENCY/1000000))/ticks;
+}
+
+int bist(unsigned int base, unsigned int length, int burst_length, int outstanding, int pattern)
+{
+	unsigned int errors, burst_bytes;
+
+	if(burst_length < 1 || burst_length > 256 || outstanding < 1) {
+		printf("bist: burst must be 1 to 256 beats and outstanding at least 1\n");
+		return -1;
+	}
+	/* the last burst would run past the range or never complete */
+	burst_bytes = burst_length*BIST_BEAT_BYTES;
+	if(length == 0 || (length % burst_bytes) || (base % burst_bytes)) {
+		printf("bist: length must be a non-zero multiple of the burst size (%u bytes)\n",
+			burst_bytes);
+		return -1;
+	}
+
+	/* BIST traffic bypasses the L2 cache */
+	l2_invalidate();
+
+	axi_bist_base_write(base);
+	axi_bist_length_write(length);
+	axi_bist_pattern_write(pattern);
+	axi_bist_burst_length_write(burst_length);
+	axi_bist_outstanding_write(outstanding);
+	axi_bist_start_write(0x3);
+	while(!axi_bist_done_read());
+
+	errors = axi_bist_errors_read();
+	printf("bist: 0x%08x-0x%08x, burst %d, outstanding %d, pattern %d\n",
+		base, base + length, burst_length, outstanding, pattern);
+	printf("write: %u cycles, %u MB/s\n",
+		axi_bist_write_ticks_read(), bist_mbps(length, axi_bist_write_ticks_read()));
+	printf("read:  %u cycles, %u MB/s\n",
+		axi_bist_read_ticks_read(), bist_mbps(length, axi_bist_read_ticks_read()));
+	if(errors != 0)
+		printf("errors: %u/%u, first at 0x%08x\n",
+			errors, length/BIST_BEAT_BYTES, axi_bist_error_address_read());
+	else
+		printf("errors: 0\n");
+
+	l2_invalidate();
+
+	return errors;
+}
+
+#endif
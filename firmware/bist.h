@@ -0,0 +1,20 @@
+#ifndef __BIST_H
+#define __BIST_H
+
+#include <generated/csr.h>
+
+#define BIST_PATTERN_PRBS        0
+#define BIST_PATTERN_ADDRESS     1
+#define BIST_PATTERN_WALKING_ONE 2
+
+/* bytes per beat (data width of the AXI port) */
+#define BIST_BEAT_BYTES 8
+
+/*
+ * length (and base) must be a multiple of the burst size (burst_length
+ * beats, 1 to 256), returns the number of errors or -1 when the arguments
+ * are rejected.
+ */
+int bist(unsigned int base, unsigned int length, int burst_length, int outstanding, int pattern);
+
+#endif /* __BIST_H */
@@ -0,0 +1,85 @@
+#include <generated/csr.h>
+
+#include <stdio.h>
+
+#include "boot_timer.h"
+
+#ifdef CSR_BOOT_TIMER_BASE
+
+#define BOOT_TIMER_NOT_REACHED 0xffffffff
+
+struct boot_event {
+	const char *name;
+	unsigned int (*read)(void);
+};
+
+static const struct boot_event boot_events[] = {
+	{"fabric_por_n",               boot_timer_fabric_por_n_read},
+	{"device_init_done",           boot_timer_device_init_done_read},
+	{"xcvr_init_done",             boot_timer_xcvr_init_done_read},
+	{"usram_init_done",            boot_timer_usram_init_done_read},
+	{"usram_init_from_snvm_done",  boot_timer_usram_init_from_snvm_done_read},
+	{"usram_init_from_uprom_done", boot_timer_usram_init_from_uprom_done_read},
+	{"usram_init_from_spi_done",   boot_timer_usram_init_from_spi_done_read},
+	{"sram_init_done",             boot_timer_sram_init_done_read},
+	{"sram_init_from_snvm_done",   boot_timer_sram_init_from_snvm_done_read},
+	{"sram_init_from_uprom_done",  boot_timer_sram_init_from_uprom_done_read},
+	{"sram_init_from_spi_done",    boot_timer_sram_init_from_spi_done_read},
+	{"autocalib_done",             boot_timer_autocalib_done_read},
+	{"pcie_init_done",             boot_timer_pcie_init_done_read},
+	{"bank_0_calib_status",        boot_timer_bank_0_calib_status_read},
+	{"bank_1_calib_status",        boot_timer_bank_1_calib_status_read},
+	{"ccc_pll_lock",               boot_timer_ccc_pll_lock_read},
+	{"ddr3_pll_lock",              boot_timer_ddr3_pll_lock_read},
+	{"ddr3_ready",                 boot_timer_ddr3_ready_read},
+	{"cpu_start",                  boot_timer_cpu_start_read},
+};
+
+#define BOOT_EVENTS (sizeof(boot_events)/sizeof(boot_events[0]))
+
+static unsigned int boot_timer_us(unsigned int ticks)
+{
+	return ((unsigned long long) ticks*1000000)/BOOT_TIMER_CLK_FREQ;
+}
+
+static void boot_timer_print_event(const char *name, unsigned int ticks, unsigned int previous)
+{
+	printf("%-28s %10u us (+%u us)\n", name, boot_timer_us(ticks), boot_timer_us(ticks - previous));
+}
+
+void boot_timer_print(void)
+{
+	unsigned int timestamps[BOOT_EVENTS];
+	unsigned int i, j, first, previous, now;
+	int done[BOOT_EVENTS];
+
+	/* Software boot: sys_clk cycles since the CPU start, in osc ticks */
+	now = boot_timer_cycles_read();
+	now = boot_timer_cpu_start_read() +
+		((unsigned long long) now*BOOT_TIMER_CLK_FREQ)/SYSTEM_CLOCK_FREQUENCY;
+
+	for(i = 0; i < BOOT_EVENTS; i++) {
+		timestamps[i] = boot_events[i].read();
+		done[i] = 0;
+	}
+
+	printf("Boot timestamps (since the FPGA configuration):\n");
+	previous = 0;
+	for(i = 0; i < BOOT_EVENTS; i++) {
+		/* Earliest event not printed yet */
+		first = BOOT_EVENTS;
+		for(j = 0; j < BOOT_EVENTS; j++)
+			if(!done[j] && (first == BOOT_EVENTS || timestamps[j] < timestamps[first]))
+				first = j;
+		done[first] = 1;
+		if(timestamps[first] == BOOT_TIMER_NOT_REACHED)
+			printf("%-28s    not reached\n", boot_events[first].name);
+		else {
+			boot_timer_print_event(boot_events[first].name, timestamps[first], previous);
+			previous = timestamps[first];
+		}
+	}
+	boot_timer_print_event("now", now, previous);
+}
+
+#endif
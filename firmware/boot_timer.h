@@ -0,0 +1,16 @@
+#ifndef __BOOT_TIMER_H
+#define __BOOT_TIMER_H
+
+#include <generated/csr.h>
+
+#ifdef CSR_BOOT_TIMER_BASE
+
+/*
+ * Print the boot timestamps (microseconds since the FPGA configuration, in
+ * order, with the time since the previous event), up to the call.
+ */
+void boot_timer_print(void);
+
+#endif
+
+#endif /* __BOOT_TIMER_H */
@@ -0,0 +1,102 @@
+#include <generated/csr.h>
+
+#include <stdlib.h>
+
+#include <irq.h>
+#include <system.h>
+
+#include "dma.h"
+
+#ifdef CSR_DMA_BASE
+
+static volatile int dma_running;
+
+static void dma_caches_flush(void)
+{
+	flush_cpu_dcache();
+	/* DMA traffic bypasses the L2 cache */
+	l2_cache_flush_write(1);
+	while(l2_cache_flushing_read());
+}
+
+static int dma_aligned(unsigned int value)
+{
+	return (value & 0x7) == 0;
+}
+
+void dma_init(void)
+{
+	dma_running = 0;
+	dma_ev_pending_write(dma_ev_pending_read());
+	dma_ev_enable_write(1);
+	irq_setmask(irq_getmask() | (1 << DMA_INTERRUPT));
+}
+
+void dma_isr(void)
+{
+	dma_ev_pending_write(1);
+	dma_running = 0;
+}
+
+static void dma_start(unsigned int start)
+{
+	dma_caches_flush();
+	dma_running = 1;
+	dma_start_write(start);
+}
+
+int dma_copy(void *dst, const void *src, unsigned int length)
+{
+	if(!dma_aligned((unsigned int)dst) || !dma_aligned((unsigned int)src) || !dma_aligned(length))
+		return -1;
+	dma_src_write((unsigned int)src);
+	dma_dst_write((unsigned int)dst);
+	dma_length_write(length);
+	dma_fill_write(0);
+	dma_start(0x1);
+	return 0;
+}
+
+int dma_fill(void *dst, unsigned int value, unsigned int length)
+{
+	if(!dma_aligned((unsigned int)dst) || !dma_aligned(length))
+		return -1;
+	dma_src_write(value);
+	dma_dst_write((unsigned int)dst);
+	dma_length_write(length);
+	dma_fill_write(1);
+	dma_start(0x1);
+	return 0;
+}
+
+int dma_chain(struct dma_descriptor *first)
+{
+	struct dma_descriptor *d;
+
+	for(d = first; d != NULL; d = (struct dma_descriptor *)(d->next & ~0xf)) {
+		if(((unsigned int)d & 0xf) != 0 || !dma_aligned(d->dst) || !dma_aligned(d->length))
+			return -1;
+		if(!(d->next & DMA_DESCRIPTOR_FILL) && !dma_aligned(d->src))
+			return -1;
+	}
+	dma_descriptor_write((unsigned int)first);
+	dma_start(0x2);
+	return 0;
+}
+
+int dma_done(void)
+{
+	return !dma_running;
+}
+
+void dma_wait(void)
+{
+	while(dma_running);
+	flush_cpu_dcache();
+#ifdef CSR_L2_BRIDGE_PREFETCH_FLUSH_ADDR
+	/* lines of the destination may have been prefetched during the transfer */
+	l2_bridge_prefetch_flush_write(1);
+#endif
+}
+
+#endif
@@ -0,0 +1,37 @@
+#ifndef __DMA_H
+#define __DMA_H
+
+#include <generated/csr.h>
+
+#ifdef CSR_DMA_BASE
+
+/*
+ * Scatter-gather descriptor, read by the engine from main_ram (not from the
+ * integrated SRAM or scratchpad, that are not on the AXI bus).
+ */
+struct dma_descriptor {
+	unsigned int src;	/* source address or fill value */
+	unsigned int dst;
+	unsigned int length;
+	unsigned int next;	/* next descriptor (0 ends the chain) | flags */
+} __attribute__((aligned(16)));
+
+#define DMA_DESCRIPTOR_FILL 0x1
+
+/*
+ * Addresses and lengths must be multiples of 8 bytes and in main_ram. The
+ * caches are written back before a transfer is started, the CPU data
+ * cache and the lines prefetched by the L2 bridge are invalidated by
+ * dma_wait(), the CPU must not access the destination in between.
+ */
+void dma_init(void);
+void dma_isr(void);
+int dma_copy(void *dst, const void *src, unsigned int length);
+int dma_fill(void *dst, unsigned int value, unsigned int length);
+int dma_chain(struct dma_descriptor *first);
+int dma_done(void);
+void dma_wait(void);
+
+#endif
+
+#endif /* __DMA_H */
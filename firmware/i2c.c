@@ -0,0 +1,203 @@
+#include <generated/csr.h>
+
+#include <irq.h>
+
+#include "i2c.h"
+
+#ifdef CSR_I2C_BASE
+
+static volatile int i2c_running;
+
+/*
+ * Wait loops give up (and abort the engine) after this number of polls
+ * without a command executed, the stretch timeout of the engine normally
+ * ends a stuck transfer long before.
+ */
+#define I2C_WAIT_LOOPS (SYSTEM_CLOCK_FREQUENCY/2)
+
+static unsigned int i2c_loops, i2c_level;
+
+void i2c_init(void)
+{
+	i2c_running = 0;
+	i2c_ev_pending_write(i2c_ev_pending_read());
+	i2c_ev_enable_write(1);
+	irq_setmask(irq_getmask() | (1 << I2C_INTERRUPT));
+}
+
+void i2c_isr(void)
+{
+	i2c_ev_pending_write(1);
+	i2c_running = 0;
+}
+
+void i2c_config(unsigned int freq)
+{
+	/* 5 periods of divider + 1 cycles per bit */
+	i2c_divider_write((SYSTEM_CLOCK_FREQUENCY + 5*freq - 1)/(5*freq) - 1);
+}
+
+void i2c_abort(void)
+{
+	unsigned int loops;
+
+	i2c_abort_write(1);
+	/* Clock out the byte a slave may be sending, then stop */
+	i2c_cmd_write(I2C_READ_NACK << 8);
+	i2c_cmd_write(I2C_STOP << 8);
+	for(loops = 0; i2c_busy_read() && loops < I2C_WAIT_LOOPS; loops++);
+	i2c_abort_write(1);
+}
+
+static void i2c_wait_start(void)
+{
+	i2c_loops = 0;
+	i2c_level = i2c_cmd_level_read();
+}
+
+/* Called in the wait loops, 1 when the engine is stuck (and aborted) */
+static int i2c_stuck(void)
+{
+	unsigned int level;
+
+	level = i2c_cmd_level_read();
+	if(level != i2c_level) {
+		i2c_level = level;
+		i2c_loops = 0;
+		return 0;
+	}
+	if(++i2c_loops < I2C_WAIT_LOOPS)
+		return 0;
+	i2c_abort();
+	return 1;
+}
+
+/* Transfer result, the engine is aborted (bus recovery) after a timeout */
+static int i2c_result(void)
+{
+	if(i2c_timeout_read()) {
+		i2c_abort();
+		return -1;
+	}
+	return i2c_nack_read() ? -1 : 0;
+}
+
+static int i2c_cmd(unsigned int command, unsigned int data)
+{
+	i2c_wait_start();
+	while(i2c_cmd_level_read() >= I2C_FIFO_DEPTH)
+		if(i2c_stuck())
+			return -1;
+	i2c_cmd_write((command << 8) | data);
+	return 0;
+}
+
+/*
+ * Start, device address and register, then repeated start for reads.
+ * The engine is idle, the start (which clears nack) is executed at once.
+ */
+static int i2c_header(unsigned char addr, unsigned char reg, int read)
+{
+	if(i2c_cmd(I2C_START, 0) < 0 ||
+	   i2c_cmd(I2C_WRITE, addr << 1) < 0 ||
+	   i2c_cmd(I2C_WRITE, reg) < 0)
+		return -1;
+	if(read)
+		if(i2c_cmd(I2C_START, 0) < 0 ||
+		   i2c_cmd(I2C_WRITE, (addr << 1) | 1) < 0)
+			return -1;
+	return 0;
+}
+
+int i2c_write(unsigned char addr, unsigned char reg, const unsigned char *data, unsigned int length)
+{
+	unsigned int i;
+
+	if(i2c_header(addr, reg, 0) < 0)
+		return -1;
+	for(i = 0; i < length; i++)
+		if(i2c_cmd(I2C_WRITE, data[i]) < 0)
+			return -1;
+	if(i2c_cmd(I2C_STOP, 0) < 0)
+		return -1;
+	i2c_wait_start();
+	while(i2c_busy_read())
+		if(i2c_stuck())
+			return -1;
+	return i2c_result();
+}
+
+static unsigned int i2c_rx(unsigned char *data, unsigned int received, unsigned int length)
+{
+	while(received < length && i2c_rx_level_read()) {
+		data[received++] = i2c_rx_read();
+		i2c_rx_pop_write(1);
+	}
+	return received;
+}
+
+int i2c_read(unsigned char addr, unsigned char reg, unsigned char *data, unsigned int length)
+{
+	unsigned int queued, received;
+
+	if(i2c_header(addr, reg, 1) < 0)
+		return -1;
+	/* Keep the command FIFO fed without overflowing the RX FIFO */
+	queued = 0;
+	received = 0;
+	i2c_wait_start();
+	while(queued < length && !i2c_nack_read() && !i2c_timeout_read()) {
+		if(i2c_cmd_level_read() < I2C_FIFO_DEPTH && queued - received < I2C_FIFO_DEPTH) {
+			queued++;
+			i2c_cmd_write((queued == length ? I2C_READ_NACK : I2C_READ_ACK) << 8);
+		} else if(i2c_stuck())
+			return -1;
+		received = i2c_rx(data, received, length);
+	}
+	if(i2c_cmd(I2C_STOP, 0) < 0)
+		return -1;
+	i2c_wait_start();
+	while(i2c_busy_read()) {
+		if(i2c_stuck())
+			return -1;
+		received = i2c_rx(data, received, length);
+	}
+	received = i2c_rx(data, received, length);
+	return (i2c_result() < 0 || received < length) ? -1 : 0;
+}
+
+int i2c_read_start(unsigned char addr, unsigned char reg, unsigned int length)
+{
+	unsigned int i, ie;
+
+	if(length == 0 || length > I2C_READ_MAX || i2c_running)
+		return -1;
+	/* Queued at once, the engine must not complete in between */
+	ie = irq_getie();
+	irq_setie(0);
+	i2c_running = 1;
+	i2c_header(addr, reg, 1);
+	for(i = 0; i < length; i++)
+		i2c_cmd_write((i == length - 1 ? I2C_READ_NACK : I2C_READ_ACK) << 8);
+	i2c_cmd_write(I2C_STOP << 8);
+	irq_setie(ie);
+	return 0;
+}
+
+int i2c_done(void)
+{
+	return !i2c_running;
+}
+
+int i2c_read_finish(unsigned char *data, unsigned int length)
+{
+	i2c_wait_start();
+	while(i2c_running)
+		if(i2c_stuck()) {
+			i2c_running = 0;
+			return -1;
+		}
+	return (i2c_result() < 0 || i2c_rx(data, 0, length) < length) ? -1 : 0;
+}
+
+#endif
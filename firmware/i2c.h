@@ -0,0 +1,44 @@
+#ifndef __I2C_H
+#define __I2C_H
+
+#include <generated/csr.h>
+
+#ifdef CSR_I2C_BASE
+
+/* commands (cmd register: command << 8 | data) */
+#define I2C_START     1
+#define I2C_STOP      2
+#define I2C_WRITE     3
+#define I2C_READ_ACK  4
+#define I2C_READ_NACK 5
+
+#define I2C_STANDARD_MODE 100000
+#define I2C_FAST_MODE     400000
+
+/*
+ * Register transfers with 7-bit device addresses: the register is written
+ * after the address, then the data (i2c_write) or the data is read after a
+ * repeated start (i2c_read). Both return -1 when a byte is not acknowledged
+ * or a slave holds SCL low too long (the engine is then aborted and the bus
+ * recovered by i2c_abort). One transfer at a time, the SCL frequency is at
+ * most freq.
+ */
+void i2c_init(void);
+void i2c_isr(void);
+void i2c_config(unsigned int freq);
+void i2c_abort(void);
+int i2c_write(unsigned char addr, unsigned char reg, const unsigned char *data, unsigned int length);
+int i2c_read(unsigned char addr, unsigned char reg, unsigned char *data, unsigned int length);
+
+/*
+ * Queue a register read of up to I2C_READ_MAX bytes and return, the bytes
+ * are fetched by i2c_read_finish() once i2c_done() (completion interrupt).
+ */
+#define I2C_READ_MAX (I2C_FIFO_DEPTH - 6)
+int i2c_read_start(unsigned char addr, unsigned char reg, unsigned int length);
+int i2c_done(void);
+int i2c_read_finish(unsigned char *data, unsigned int length);
+
+#endif
+
+#endif /* __I2C_H */
@@ -2,10 +2,17 @@
 #include <irq.h>
 #include <uart.h>
 
+#include "scratchpad.h"
+#include "dma.h"
+#include "spi.h"
+#include "profiler.h"
+#include "spiflash.h"
+#include "i2c.h"
+
 extern void periodic_isr(void);
 
 void isr(void);
-void isr(void)
+void __fasttext isr(void)
 {
 	unsigned int irqs;
 
@@ -14,4 +21,29 @@ void isr(void)
 	if(irqs & (1 << UART_INTERRUPT))
 		uart_isr();
 
+#ifdef CSR_DMA_BASE
+	if(irqs & (1 << DMA_INTERRUPT))
+		dma_isr();
+#endif
+
+#ifdef CSR_SPI_BASE
+	if(irqs & (1 << SPI_INTERRUPT))
+		spi_isr();
+#endif
+
+#ifdef CSR_PROFILER_BASE
+	if(irqs & (1 << PROFILER_INTERRUPT))
+		profiler_isr();
+#endif
+
+#ifdef CSR_SPIFLASH_SRC_ADDR
+	if(irqs & (1 << SPIFLASH_INTERRUPT))
+		spiflash_isr();
+#endif
+
+#ifdef CSR_I2C_BASE
+	if(irqs & (1 << I2C_INTERRUPT))
+		i2c_isr();
+#endif
+
 }
@@ -5,9 +5,19 @@
 #include <irq.h>
 #include <uart.h>
 #include <console.h>
+#include <crc.h>
 #include <generated/csr.h>
 
 #include "sdram.h"
+#include "bist.h"
+#include "bench.h"
+#include "dma.h"
+#include "spi.h"
+#include "spiflash.h"
+#include "i2c.h"
+#include "profiler.h"
+#include "boot_timer.h"
+#include "scratchpad.h"
 
 
 static char *readstr(void)
@@ -76,6 +86,42 @@ static void help(void)
 	puts("reboot                          - reboot CPU");
 	puts("");
 	puts("sdram_test                      - test SDRAM from CPU");
+	puts("l2_stats                        - show/reset L2 cache counters");
+#ifdef CSR_BOOT_TIMER_BASE
+	puts("boot_times                      - show boot/calibration timestamps");
+#endif
+#ifdef CSR_L2_BRIDGE_RESET_ADDR
+	puts("l2_bridge [wbuf] [prefetch]     - enable/disable L2 write buffer/prefetcher");
+#endif
+#ifdef CSR_DMA_BASE
+	puts("bench [test] [size]             - memory benchmarks (seq/lat/stride/rand/dma/spi/flash/i2c)");
+#else
+	puts("bench [test] [size]             - memory benchmarks (seq/lat/stride/rand/spi/flash/i2c)");
+#endif
+#ifdef CSR_DMA_BASE
+	puts("dma [size]                      - DMA copy/fill/chain against memcpy/memset");
+#endif
+#ifdef CSR_AXI_BIST_BASE
+	puts("bist [len] [burst] [out] [pat]  - test/benchmark SDRAM from AXI BIST");
+#endif
+#ifdef CSR_AXI_MONITOR_BASE
+	puts("axi_stats                       - show/reset AXI monitor counters");
+#endif
+#ifdef CSR_SPIFLASH_BASE
+	puts("flash_info                      - SPI flash id and read cache counters");
+	puts("flash_write <off> <addr> <len>  - erase/program the SPI flash from memory");
+#endif
+#ifdef CSR_SPIFLASH_SRC_ADDR
+	puts("flash_read <off> <addr> <len>   - copy from the SPI flash to main_ram");
+#endif
+#ifdef CSR_I2C_BASE
+	puts("i2c_read <dev> <reg> [len]      - read I2C device registers");
+	puts("i2c_write <dev> <reg> <byte>... - write I2C device registers");
+#endif
+#ifdef CSR_PROFILER_BASE
+	puts("profile [interval] <command>    - run a command with PC sampling");
+	puts("profile_dump                    - print the samples (tools/profile.py)");
+#endif
 	puts("");
 }
 
@@ -89,13 +135,341 @@ static void sdram_test(void)
 	memtest();
 }
 
-static void console_service(void)
+#ifdef CSR_AXI_BIST_BASE
+static void bist_test(char *str)
+{
+	char *token;
+	unsigned int length;
+	int burst_length, outstanding, pattern;
+
+	/* Defaults to the whole main_ram above the firmware */
+	length = MAIN_RAM_SIZE - (SDRAM_TEST_BASE - MAIN_RAM_BASE);
+	burst_length = 16;
+	outstanding = 8;
+	pattern = BIST_PATTERN_PRBS;
+
+	token = get_token(&str);
+	if(*token)
+		length = strtoul(token, NULL, 0);
+	token = get_token(&str);
+	if(*token)
+		burst_length = strtoul(token, NULL, 0);
+	token = get_token(&str);
+	if(*token)
+		outstanding = strtoul(token, NULL, 0);
+	token = get_token(&str);
+	if(*token)
+		pattern = strtoul(token, NULL, 0);
+
+	bist(SDRAM_TEST_BASE, length, burst_length, outstanding, pattern);
+}
+#endif
+
+static void bench_test(char *str)
+{
+	char *test;
+	char *token;
+	unsigned int size;
+
+	test = get_token(&str);
+	size = BENCH_DEFAULT_SIZE;
+	token = get_token(&str);
+	if(*token)
+		size = strtoul(token, NULL, 0);
+
+	if(*test == 0 || strcmp(test, "all") == 0)
+		bench(size);
+	else if(strcmp(test, "seq") == 0)
+		bench_seq(size);
+	else if(strcmp(test, "lat") == 0)
+		bench_latency(size);
+	else if(strcmp(test, "stride") == 0)
+		bench_stride(size);
+	else if(strcmp(test, "rand") == 0)
+		bench_random(size);
+#ifdef CSR_DMA_BASE
+	else if(strcmp(test, "dma") == 0)
+		bench_dma(size);
+#endif
+#ifdef CSR_SPI_BASE
+	else if(strcmp(test, "spi") == 0)
+		bench_spi(size);
+#endif
+#ifdef CSR_SPIFLASH_BASE
+	else if(strcmp(test, "flash") == 0)
+		bench_flash(size);
+#endif
+#ifdef CSR_I2C_BASE
+	else if(strcmp(test, "i2c") == 0)
+		bench_i2c(size);
+#endif
+	else
+		printf("unknown bench test: %s\n", test);
+}
+
+#ifdef CSR_DMA_BASE
+static void dma_test(char *str)
+{
+	char *token;
+	unsigned int size;
+
+	size = BENCH_DEFAULT_SIZE;
+	token = get_token(&str);
+	if(*token)
+		size = strtoul(token, NULL, 0);
+	bench_dma(size);
+}
+#endif
+
+static void l2_stats(void)
+{
+	printf("L2: %d bytes, %d ways, %d bytes/line\n", L2_SIZE, L2_WAYS, L2_LINE_SIZE);
+	printf("hits:      %u\n", l2_cache_hits_read());
+	printf("misses:    %u\n", l2_cache_misses_read());
+	printf("evictions: %u\n", l2_cache_evictions_read());
+	printf("flushes:   %u\n", l2_cache_flushes_read());
+	l2_cache_reset_write(1);
+#ifdef CSR_L2_BRIDGE_WRITE_POSTED_ADDR
+	printf("write buffer: %d lines, %s\n", L2_WRITE_BUFFER_DEPTH,
+		l2_bridge_write_buffer_enable_read() ? "enabled" : "disabled");
+	printf("posted:    %u\n", l2_bridge_write_posted_read());
+	printf("bursts:    %u\n", l2_bridge_write_bursts_read());
+	printf("merged:    %u\n", l2_bridge_write_merged_read());
+	printf("full:      %u\n", l2_bridge_write_full_read());
+#endif
+#ifdef CSR_L2_BRIDGE_PREFETCH_HITS_ADDR
+	printf("prefetch: %d lines, %s\n", L2_PREFETCH_DEPTH,
+		l2_bridge_prefetch_enable_read() ? "enabled" : "disabled");
+	printf("issued:    %u\n", l2_bridge_prefetch_issued_read());
+	printf("hits:      %u\n", l2_bridge_prefetch_hits_read());
+	printf("late:      %u\n", l2_bridge_prefetch_late_read());
+#endif
+#ifdef CSR_L2_BRIDGE_RESET_ADDR
+	l2_bridge_reset_write(1);
+#endif
+}
+
+#ifdef CSR_L2_BRIDGE_RESET_ADDR
+static void l2_bridge(char *str)
+{
+	char *token;
+
+	token = get_token(&str);
+#ifdef CSR_L2_BRIDGE_WRITE_POSTED_ADDR
+	if(*token)
+		l2_bridge_write_buffer_enable_write(strtoul(token, NULL, 0));
+#endif
+	token = get_token(&str);
+#ifdef CSR_L2_BRIDGE_PREFETCH_HITS_ADDR
+	if(*token)
+		l2_bridge_prefetch_enable_write(strtoul(token, NULL, 0));
+#endif
+	l2_stats();
+}
+#endif
+
+#ifdef CSR_AXI_MONITOR_BASE
+static void axi_histogram(const char *name, unsigned int select)
+{
+	int i;
+
+	printf("%s latency histogram (cycles):\n", name);
+	for(i = 0; i < AXI_MONITOR_BUCKETS; i++) {
+		axi_monitor_histogram_select_write(select | i);
+		if(i == AXI_MONITOR_BUCKETS - 1)
+			printf("  >=%-6u: %u\n", 1 << i, axi_monitor_histogram_value_read());
+		else
+			printf("  <%-7u: %u\n", 2 << i, axi_monitor_histogram_value_read());
+	}
+}
+
+static void axi_stats(void)
+{
+	unsigned int write_transactions, read_transactions;
+	unsigned int write_timed, read_timed;
+
+	/* Freeze the counters while dumping them */
+	axi_monitor_enable_write(0);
+	write_transactions = axi_monitor_write_transactions_read();
+	read_transactions = axi_monitor_read_transactions_read();
+	write_timed = write_transactions - axi_monitor_write_dropped_read();
+	read_timed = read_transactions - axi_monitor_read_dropped_read();
+
+	printf("cycles:       %u\n", axi_monitor_cycles_read());
+	printf("write:        %u transactions, %u beats, %u bytes\n",
+		write_transactions,
+		axi_monitor_write_beats_read(),
+		axi_monitor_write_bytes_read());
+	printf("write stalls: aw %u, w %u, b %u\n",
+		axi_monitor_aw_stalls_read(),
+		axi_monitor_w_stalls_read(),
+		axi_monitor_b_stalls_read());
+	printf("write latency: avg %u, max %u, max outstanding %u, untimed %u\n",
+		write_timed ? axi_monitor_write_latency_sum_read()/write_timed : 0,
+		axi_monitor_write_latency_max_read(),
+		axi_monitor_write_outstanding_max_read(),
+		write_transactions - write_timed);
+	printf("read:         %u transactions, %u beats, %u bytes\n",
+		read_transactions,
+		axi_monitor_read_beats_read(),
+		axi_monitor_read_bytes_read());
+	printf("read stalls:  ar %u, r %u\n",
+		axi_monitor_ar_stalls_read(),
+		axi_monitor_r_stalls_read());
+	printf("read latency: avg %u, max %u, max outstanding %u, untimed %u\n",
+		read_timed ? axi_monitor_read_latency_sum_read()/read_timed : 0,
+		axi_monitor_read_latency_max_read(),
+		axi_monitor_read_outstanding_max_read(),
+		read_transactions - read_timed);
+	axi_histogram("write", 0x10);
+	axi_histogram("read", 0x00);
+
+	axi_monitor_reset_write(1);
+	axi_monitor_enable_write(1);
+}
+#endif
+
+#ifdef CSR_SPIFLASH_BASE
+static int flash_args(char *str, unsigned int *offset, unsigned int *addr, unsigned int *length)
+{
+	char *token[3];
+	int i;
+
+	for(i = 0; i < 3; i++) {
+		token[i] = get_token(&str);
+		if(*token[i] == 0)
+			return -1;
+	}
+	*offset = strtoul(token[0], NULL, 0);
+	*addr = strtoul(token[1], NULL, 0);
+	*length = strtoul(token[2], NULL, 0);
+	return 0;
+}
+
+static void flash_info(void)
+{
+	unsigned char id[3];
+
+	spiflash_id(id);
+	printf("id: %02x %02x %02x, %d bytes at 0x%08x\n", id[0], id[1], id[2], SPIFLASH_SIZE, SPIFLASH_BASE);
+#ifdef FLASH_BOOT_ADDRESS
+	printf("boot image: 0x%08x\n", FLASH_BOOT_ADDRESS);
+#endif
+	printf("read cache: %u hits, %u misses\n", spiflash_hits_read(), spiflash_misses_read());
+}
+
+static void flash_write(char *str)
+{
+	unsigned int offset, addr, length;
+
+	if(flash_args(str, &offset, &addr, &length) < 0) {
+		puts("usage: flash_write <offset> <addr> <length>");
+		return;
+	}
+	if(spiflash_write(offset, (void *)addr, length) < 0) {
+		printf("offset must be a multiple of %d, in the flash\n", SPIFLASH_SECTOR_SIZE);
+		return;
+	}
+	if(memcmp((void *)(SPIFLASH_BASE + offset), (void *)addr, length) != 0)
+		puts("verify failed");
+	else
+		printf("%u bytes written, crc %08x\n", length, crc32((unsigned char *)addr, length));
+}
+
+#ifdef CSR_SPIFLASH_SRC_ADDR
+static void flash_read(char *str)
+{
+	unsigned int offset, addr, length;
+
+	if(flash_args(str, &offset, &addr, &length) < 0) {
+		puts("usage: flash_read <offset> <addr> <length>");
+		return;
+	}
+	if(spiflash_copy((void *)addr, offset, length) < 0) {
+		puts("addr and length must be multiples of 8 bytes, in the flash");
+		return;
+	}
+	printf("%u bytes read, crc %08x\n", length, spiflash_wait());
+}
+#endif
+#endif
+
+#ifdef CSR_I2C_BASE
+#define I2C_COMMAND_MAX 16
+
+static void i2c_read_test(char *str)
+{
+	char *token[3];
+	unsigned char data[I2C_COMMAND_MAX];
+	unsigned int length, i;
+
+	for(i = 0; i < 3; i++)
+		token[i] = get_token(&str);
+	if(*token[0] == 0 || *token[1] == 0) {
+		puts("usage: i2c_read <dev> <reg> [len]");
+		return;
+	}
+	length = 1;
+	if(*token[2])
+		length = strtoul(token[2], NULL, 0);
+	if(length == 0 || length > I2C_COMMAND_MAX) {
+		printf("length must be 1 to %d\n", I2C_COMMAND_MAX);
+		return;
+	}
+	if(i2c_read(strtoul(token[0], NULL, 0), strtoul(token[1], NULL, 0), data, length) < 0) {
+		puts("nack or timeout");
+		return;
+	}
+	for(i = 0; i < length; i++)
+		printf("%02x ", data[i]);
+	printf("\n");
+}
+
+static void i2c_write_test(char *str)
+{
+	char *token[2];
+	char *byte;
+	unsigned char data[I2C_COMMAND_MAX];
+	unsigned int length, i;
+
+	for(i = 0; i < 2; i++)
+		token[i] = get_token(&str);
+	if(*token[0] == 0 || *token[1] == 0) {
+		puts("usage: i2c_write <dev> <reg> <byte>...");
+		return;
+	}
+	length = 0;
+	while(*(byte = get_token(&str)) && length < I2C_COMMAND_MAX)
+		data[length++] = strtoul(byte, NULL, 0);
+	if(i2c_write(strtoul(token[0], NULL, 0), strtoul(token[1], NULL, 0), data, length) < 0)
+		puts("nack or timeout");
+}
+#endif
+
+#ifdef CSR_PROFILER_BASE
+static void do_command(char *str);
+
+static void profile(char *str)
+{
+	unsigned int interval;
+
+	interval = PROFILER_DEFAULT_INTERVAL;
+	if(*str >= '0' && *str <= '9')
+		interval = strtoul(get_token(&str), NULL, 0);
+	if(*str == 0 || interval == 0 || strncmp(str, "profile", 7) == 0) {
+		puts("usage: profile [interval] <command>");
+		return;
+	}
+	profiler_start(interval);
+	do_command(str);
+	profiler_stop();
+}
+#endif
+
+static void do_command(char *str)
 {
-	char *str;
 	char *token;
 
-	str = readstr();
-	if(str == NULL) return;
 	token = get_token(&str);
 	if(strcmp(token, "help") == 0)
 		help();
@@ -103,16 +477,92 @@ static void console_service(void)
 		reboot();
 	else if(strcmp(token, "sdram_test") == 0)
 		sdram_test();
+	else if(strcmp(token, "l2_stats") == 0)
+		l2_stats();
+#ifdef CSR_BOOT_TIMER_BASE
+	else if(strcmp(token, "boot_times") == 0)
+		boot_timer_print();
+#endif
+#ifdef CSR_L2_BRIDGE_RESET_ADDR
+	else if(strcmp(token, "l2_bridge") == 0)
+		l2_bridge(str);
+#endif
+	else if(strcmp(token, "bench") == 0)
+		bench_test(str);
+#ifdef CSR_DMA_BASE
+	else if(strcmp(token, "dma") == 0)
+		dma_test(str);
+#endif
+#ifdef CSR_AXI_BIST_BASE
+	else if(strcmp(token, "bist") == 0)
+		bist_test(str);
+#endif
+#ifdef CSR_AXI_MONITOR_BASE
+	else if(strcmp(token, "axi_stats") == 0)
+		axi_stats();
+#endif
+#ifdef CSR_SPIFLASH_BASE
+	else if(strcmp(token, "flash_info") == 0)
+		flash_info();
+	else if(strcmp(token, "flash_write") == 0)
+		flash_write(str);
+#endif
+#ifdef CSR_SPIFLASH_SRC_ADDR
+	else if(strcmp(token, "flash_read") == 0)
+		flash_read(str);
+#endif
+#ifdef CSR_I2C_BASE
+	else if(strcmp(token, "i2c_read") == 0)
+		i2c_read_test(str);
+	else if(strcmp(token, "i2c_write") == 0)
+		i2c_write_test(str);
+#endif
+#ifdef CSR_PROFILER_BASE
+	else if(strcmp(token, "profile") == 0)
+		profile(str);
+	else if(strcmp(token, "profile_dump") == 0)
+		profiler_dump();
+#endif
+}
+
+static void console_service(void)
+{
+	char *str;
+
+	str = readstr();
+	if(str == NULL) return;
+	do_command(str);
 	prompt();
 }
 
 int main(void)
 {
+	scratchpad_init();
+
 	irq_setmask(0);
 	irq_setie(1);
+#ifdef CSR_DMA_BASE
+	dma_init();
+#endif
+#ifdef CSR_SPI_BASE
+	spi_init();
+#endif
+#ifdef CSR_PROFILER_BASE
+	profiler_init();
+#endif
+#ifdef CSR_SPIFLASH_SRC_ADDR
+	spiflash_init();
+#endif
+#ifdef CSR_I2C_BASE
+	i2c_init();
+#endif
 
 	uart_init();
 	puts("\nLiteX Avalanche CPU testing software built "__DATE__" "__TIME__"\n");
+#ifdef CSR_BOOT_TIMER_BASE
+	boot_timer_print();
+	puts("");
+#endif
 	help();
 	prompt();
 
@@ -0,0 +1,84 @@
+#include <generated/csr.h>
+
+#include <stdio.h>
+#include <string.h>
+
+#include <irq.h>
+#include <system.h>
+
+#include "scratchpad.h"
+#include "profiler.h"
+
+#ifdef CSR_PROFILER_BASE
+
+static unsigned int profiler_interval;
+
+static void profiler_caches_flush(void)
+{
+	flush_cpu_dcache();
+	/* the samples are written next to the L2 cache */
+	l2_cache_flush_write(1);
+	while(l2_cache_flushing_read());
+}
+
+void profiler_init(void)
+{
+	profiler_enable_write(0);
+	profiler_base_write(PROFILER_BUFFER);
+	profiler_length_write(PROFILER_ENTRIES);
+	profiler_ev_pending_write(profiler_ev_pending_read());
+	profiler_ev_enable_write(1);
+	irq_setmask(irq_getmask() | (1 << PROFILER_INTERRUPT));
+}
+
+/* The CPU has no PC output, the interrupted PC is handed to the profiler */
+void __fasttext profiler_isr(void)
+{
+	unsigned int pc;
+
+	__asm__ volatile("csrr %0, mepc" : "=r"(pc));
+	profiler_pc_write(pc);
+	profiler_ev_pending_write(1);
+}
+
+void profiler_start(unsigned int interval)
+{
+	/* unused entries read as zero in raw dumps of the ring buffer */
+	memset((void *)PROFILER_BUFFER, 0, PROFILER_ENTRIES*sizeof(struct profiler_sample));
+	/* no dirty line of the ring buffer must be written back over the samples */
+	profiler_caches_flush();
+	profiler_interval = interval;
+	profiler_interval_write(interval);
+	profiler_enable_write(1);
+}
+
+void profiler_stop(void)
+{
+	profiler_enable_write(0);
+	/* let the last samples reach main_ram */
+	while(profiler_busy_read());
+	printf("PROFILE interval=%u sys_clk=%u samples=%u dropped=%u\n",
+		profiler_interval, SYSTEM_CLOCK_FREQUENCY,
+		profiler_count_read(), profiler_dropped_read());
+}
+
+void profiler_dump(void)
+{
+	volatile struct profiler_sample *samples = (struct profiler_sample *)PROFILER_BUFFER;
+	unsigned int i, first, n;
+
+	profiler_caches_flush();
+	n = profiler_count_read();
+	first = 0;
+	if(n > PROFILER_ENTRIES) {
+		/* oldest sample first */
+		first = profiler_index_read();
+		n = PROFILER_ENTRIES;
+	}
+	for(i = 0; i < n; i++)
+		printf("PROFILE 0x%08x %u\n",
+			samples[(first + i) % PROFILER_ENTRIES].pc,
+			samples[(first + i) % PROFILER_ENTRIES].cycles);
+}
+
+#endif
@@ -0,0 +1,37 @@
+#ifndef __PROFILER_H
+#define __PROFILER_H
+
+#include <generated/csr.h>
+#include <generated/mem.h>
+
+#ifdef CSR_PROFILER_BASE
+
+/*
+ * Samples (PC, sys_clk cycles since the start) are written by the profiler
+ * to a ring buffer in main_ram, below the area used by the tests/benchmarks
+ * (SDRAM_TEST_BASE), the last PROFILER_ENTRIES are kept. The ring buffer
+ * is cleared by profiler_start().
+ */
+#define PROFILER_BUFFER (MAIN_RAM_BASE + 0x00f00000)
+#define PROFILER_ENTRIES (0x100000/8)
+#define PROFILER_DEFAULT_INTERVAL (SYSTEM_CLOCK_FREQUENCY/10000)
+
+struct profiler_sample {
+	unsigned int pc;
+	unsigned int cycles;
+};
+
+void profiler_init(void);
+void profiler_isr(void);
+void profiler_start(unsigned int interval);
+void profiler_stop(void);
+/*
+ * Print the "PROFILE" header (interval, sys_clk, samples and dropped
+ * samples) with profiler_stop(), then the samples with profiler_dump() for
+ * tools/profile.py.
+ */
+void profiler_dump(void);
+
+#endif
+
+#endif /* __PROFILER_H */
@@ -0,0 +1,18 @@
+#include <string.h>
+
+#include <system.h>
+
+#include "scratchpad.h"
+
+extern char _ffasttext[], _efasttext[], _lfasttext[];
+extern char _ffastdata[], _efastdata[], _lfastdata[];
+
+/* Copy .fasttext/.fastdata from their load address in main_ram, must be
+ * called before any of them is used */
+void scratchpad_init(void)
+{
+	memcpy(_ffasttext, _lfasttext, _efasttext - _ffasttext);
+	memcpy(_ffastdata, _lfastdata, _efastdata - _ffastdata);
+	flush_cpu_dcache();
+	flush_cpu_icache();
+}
@@ -0,0 +1,17 @@
+#ifndef __SCRATCHPAD_H
+#define __SCRATCHPAD_H
+
+#include <generated/mem.h>
+
+/*
+ * Place hot functions (inner loops, ISRs) and data in the scratchpad (or the
+ * integrated SRAM when the SoC has no scratchpad), away from DRAM misses.
+ * The stack is also at the top of this region, the link fails when less
+ * than STACK_SIZE bytes (linker.ld) are left for it.
+ */
+#define __fasttext __attribute__((section(".fasttext"), noinline))
+#define __fastdata __attribute__((section(".fastdata")))
+
+void scratchpad_init(void);
+
+#endif /* __SCRATCHPAD_H */
@@ -9,8 +9,6 @@
 
 #include "sdram.h"
 
-#define SDRAM_TEST_BASE MAIN_RAM_BASE + 0x01000000
-
 static unsigned int seed_to_data_32(unsigned int seed, int random)
 {
 	if (random)
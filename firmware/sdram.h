@@ -2,6 +2,9 @@
 #define __SDRAM_H
 
 #include <generated/csr.h>
+#include <generated/mem.h>
+
+#define SDRAM_TEST_BASE (MAIN_RAM_BASE + 0x01000000)
 
 int memtest(void);
 
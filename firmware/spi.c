@@ -0,0 +1,106 @@
+#include <generated/csr.h>
+
+#include <stdlib.h>
+
+#include <irq.h>
+#include <system.h>
+
+#include "spi.h"
+
+#ifdef CSR_SPI_BASE
+
+static unsigned int spi_mode;
+static volatile int spi_running;
+
+void spi_init(void)
+{
+	spi_mode = 0;
+	spi_running = 0;
+	spi_ev_pending_write(spi_ev_pending_read());
+	spi_ev_enable_write(1);
+	irq_setmask(irq_getmask() | (1 << SPI_INTERRUPT));
+}
+
+void spi_isr(void)
+{
+	spi_ev_pending_write(1);
+	spi_running = 0;
+}
+
+void spi_config(unsigned int divider, unsigned int mode)
+{
+	spi_divider_write(divider);
+	spi_mode = ((mode & 0x2) ? SPI_CPOL : 0) | ((mode & 0x1) ? SPI_CPHA : 0);
+}
+
+static void spi_start(unsigned int control, unsigned int length, unsigned int frame)
+{
+	spi_control_write(spi_mode | control);
+	spi_length_write(length);
+	spi_frame_write(frame);
+	spi_running = 1;
+	spi_start_write(1);
+}
+
+void spi_xfer(const unsigned char *tx, unsigned char *rx, unsigned int length, unsigned int frame)
+{
+	unsigned int sent, received;
+
+	/* Prefill the TX FIFO, then keep it fed and the RX FIFO drained */
+	sent = 0;
+	if(tx != NULL)
+		while(sent < length && spi_tx_level_read() < SPI_FIFO_DEPTH)
+			spi_tx_write(tx[sent++]);
+	spi_start((tx != NULL ? SPI_TX : 0) | (rx != NULL ? SPI_RX : 0), length, frame);
+	received = (rx != NULL) ? 0 : length;
+	while(spi_running || received < length) {
+		if(tx != NULL)
+			while(sent < length && spi_tx_level_read() < SPI_FIFO_DEPTH)
+				spi_tx_write(tx[sent++]);
+		while(received < length && spi_rx_level_read()) {
+			rx[received++] = spi_rx_read();
+			spi_rx_pop_write(1);
+		}
+	}
+}
+
+#ifdef CSR_SPI_TX_ADDR_ADDR
+
+static void spi_caches_flush(void)
+{
+	flush_cpu_dcache();
+	/* SPI DMA traffic bypasses the L2 cache */
+	l2_cache_flush_write(1);
+	while(l2_cache_flushing_read());
+}
+
+int spi_dma(const void *tx, void *rx, unsigned int length, unsigned int frame)
+{
+	if(((unsigned int)tx & 0x7) || ((unsigned int)rx & 0x7) || (length & 0x7))
+		return -1;
+	spi_caches_flush();
+	spi_tx_addr_write((unsigned int)tx);
+	spi_rx_addr_write((unsigned int)rx);
+	spi_start((tx != NULL ? SPI_TX | SPI_DMA_TX : 0) | (rx != NULL ? SPI_RX | SPI_DMA_RX : 0),
+		length, frame);
+	return 0;
+}
+
+int spi_done(void)
+{
+	return !spi_running;
+}
+
+void spi_wait(void)
+{
+	while(spi_running);
+	flush_cpu_dcache();
+#ifdef CSR_L2_BRIDGE_PREFETCH_FLUSH_ADDR
+	/* lines of the destination may have been prefetched during the transfer */
+	l2_bridge_prefetch_flush_write(1);
+#endif
+}
+
+#endif
+
+#endif
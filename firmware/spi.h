@@ -0,0 +1,40 @@
+#ifndef __SPI_H
+#define __SPI_H
+
+#include <generated/csr.h>
+
+#ifdef CSR_SPI_BASE
+
+/* control register */
+#define SPI_TX     0x01
+#define SPI_RX     0x02
+#define SPI_CPOL   0x04
+#define SPI_CPHA   0x08
+#define SPI_DMA_TX 0x10
+#define SPI_DMA_RX 0x20
+
+/*
+ * SCLK is sys_clk/(2*(divider + 1)), mode 0 to 3. Transfers keep the chip
+ * select asserted, except for one SPI clock period every frame bytes when
+ * frame is not 0. tx or rx can be NULL (0xff sent/received bytes dropped).
+ */
+void spi_init(void);
+void spi_isr(void);
+void spi_config(unsigned int divider, unsigned int mode);
+void spi_xfer(const unsigned char *tx, unsigned char *rx, unsigned int length, unsigned int frame);
+
+#ifdef CSR_SPI_TX_ADDR_ADDR
+/*
+ * Transfer from/to main_ram without the CPU (addresses and length multiple
+ * of 8 bytes), the caches are written back before the transfer, the CPU
+ * data cache and the lines prefetched by the L2 bridge are invalidated by
+ * spi_wait().
+ */
+int spi_dma(const void *tx, void *rx, unsigned int length, unsigned int frame);
+int spi_done(void);
+void spi_wait(void);
+#endif
+
+#endif
+
+#endif /* __SPI_H */
@@ -0,0 +1,159 @@
+#include <generated/csr.h>
+
+#include <stdlib.h>
+
+#include <irq.h>
+#include <system.h>
+
+#include "spiflash.h"
+
+#ifdef CSR_SPIFLASH_BASE
+
+#define SPIFLASH_READ_ID      0x9f
+#define SPIFLASH_READ_STATUS  0x05
+#define SPIFLASH_WRITE_ENABLE 0x06
+#define SPIFLASH_PAGE_PROGRAM 0x02
+#define SPIFLASH_SECTOR_ERASE 0x20
+
+#define SPIFLASH_STATUS_WIP   0x01
+
+static void spiflash_select(void)
+{
+	spiflash_cs_write(1);
+	/* wait for the end of a cache fill/copy */
+	while(spiflash_busy_read());
+}
+
+static void spiflash_deselect(void)
+{
+	spiflash_cs_write(0);
+	while(spiflash_busy_read());
+}
+
+static unsigned char spiflash_xfer(unsigned char byte)
+{
+	spiflash_tx_write(byte);
+	while(spiflash_busy_read());
+	return spiflash_rx_read();
+}
+
+static void spiflash_command(unsigned char command, unsigned int addr)
+{
+	spiflash_select();
+	spiflash_xfer(command);
+	spiflash_xfer(addr >> 16);
+	spiflash_xfer(addr >> 8);
+	spiflash_xfer(addr);
+}
+
+static void spiflash_write_enable(void)
+{
+	spiflash_select();
+	spiflash_xfer(SPIFLASH_WRITE_ENABLE);
+	spiflash_deselect();
+}
+
+static void spiflash_wait_ready(void)
+{
+	unsigned char status;
+
+	do {
+		spiflash_select();
+		spiflash_xfer(SPIFLASH_READ_STATUS);
+		status = spiflash_xfer(0xff);
+		spiflash_deselect();
+	} while(status & SPIFLASH_STATUS_WIP);
+}
+
+void spiflash_id(unsigned char *id)
+{
+	int i;
+
+	spiflash_select();
+	spiflash_xfer(SPIFLASH_READ_ID);
+	for(i = 0; i < 3; i++)
+		id[i] = spiflash_xfer(0xff);
+	spiflash_deselect();
+}
+
+int spiflash_write(unsigned int addr, const void *data, unsigned int length)
+{
+	const unsigned char *p = data;
+	unsigned int offset, i, n;
+
+	if(addr & (SPIFLASH_SECTOR_SIZE - 1) || addr + length > SPIFLASH_SIZE)
+		return -1;
+	for(offset = 0; offset < length; offset += SPIFLASH_SECTOR_SIZE) {
+		spiflash_write_enable();
+		spiflash_command(SPIFLASH_SECTOR_ERASE, addr + offset);
+		spiflash_deselect();
+		spiflash_wait_ready();
+	}
+	for(offset = 0; offset < length; offset += n) {
+		n = length - offset;
+		if(n > SPIFLASH_PAGE_SIZE)
+			n = SPIFLASH_PAGE_SIZE;
+		spiflash_write_enable();
+		spiflash_command(SPIFLASH_PAGE_PROGRAM, addr + offset);
+		for(i = 0; i < n; i++)
+			spiflash_xfer(p[offset + i]);
+		spiflash_deselect();
+		spiflash_wait_ready();
+	}
+	flush_cpu_dcache();
+	return 0;
+}
+
+#ifdef CSR_SPIFLASH_SRC_ADDR
+
+static volatile int spiflash_running;
+
+void spiflash_init(void)
+{
+	spiflash_running = 0;
+	spiflash_ev_pending_write(spiflash_ev_pending_read());
+	spiflash_ev_enable_write(1);
+	irq_setmask(irq_getmask() | (1 << SPIFLASH_INTERRUPT));
+}
+
+void spiflash_isr(void)
+{
+	spiflash_ev_pending_write(1);
+	spiflash_running = 0;
+}
+
+int spiflash_copy(void *dst, unsigned int src, unsigned int length)
+{
+	if(((unsigned int)dst & 0x7) || (length & 0x7) || src + length > SPIFLASH_SIZE)
+		return -1;
+	flush_cpu_dcache();
+	/* the copy bypasses the L2 cache */
+	l2_cache_flush_write(1);
+	while(l2_cache_flushing_read());
+	spiflash_src_write(src);
+	spiflash_dst_write((unsigned int)dst);
+	spiflash_length_write(length);
+	spiflash_running = 1;
+	spiflash_start_write(1);
+	return 0;
+}
+
+int spiflash_done(void)
+{
+	return !spiflash_running;
+}
+
+unsigned int spiflash_wait(void)
+{
+	while(spiflash_running);
+	flush_cpu_dcache();
+#ifdef CSR_L2_BRIDGE_PREFETCH_FLUSH_ADDR
+	/* lines of the destination may have been prefetched during the transfer */
+	l2_bridge_prefetch_flush_write(1);
+#endif
+	return spiflash_crc_read();
+}
+
+#endif
+
+#endif
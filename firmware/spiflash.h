@@ -0,0 +1,37 @@
+#ifndef __SPIFLASH_H
+#define __SPIFLASH_H
+
+#include <generated/csr.h>
+#include <generated/mem.h>
+
+#ifdef CSR_SPIFLASH_BASE
+
+#define SPIFLASH_PAGE_SIZE   256
+#define SPIFLASH_SECTOR_SIZE 4096
+
+/*
+ * The flash is also readable at SPIFLASH_BASE (execute in place, through the
+ * read cache of the controller). Erase/program are done with the chip select
+ * held by the CPU, the controller cache is invalidated after each command
+ * and the CPU data cache by spiflash_write().
+ */
+void spiflash_id(unsigned char *id);
+/* addr multiple of SPIFLASH_SECTOR_SIZE, the sectors are erased first */
+int spiflash_write(unsigned int addr, const void *data, unsigned int length);
+
+#ifdef CSR_SPIFLASH_SRC_ADDR
+/*
+ * Copy from the flash to main_ram without the CPU (dst and length multiples
+ * of 8 bytes), spiflash_wait() returns the CRC-32 of the data and
+ * invalidates the CPU data cache and the lines prefetched by the L2 bridge.
+ */
+void spiflash_init(void);
+void spiflash_isr(void);
+int spiflash_copy(void *dst, unsigned int src, unsigned int length);
+int spiflash_done(void);
+unsigned int spiflash_wait(void);
+#endif
+
+#endif
+
+#endif /* __SPIFLASH_H */
@@ -0,0 +1,360 @@
+from functools import reduce
+from operator import xor
+
+from migen import *
+
+from litex.soc.interconnect.csr import *
+
+
+patterns = {
+    "prbs":        0,
+    "address":     1,
+    "walking_one": 2,
+}
+
+
+class _PRBSGenerator(Module):
+    def __init__(self, n_out, n_state=31, taps=[27, 30]):
+        self.o = Signal(n_out)
+        self.seed = Signal(n_state)
+        self.load = Signal()
+        self.ce = Signal()
+
+        # # #
+
+        state = Signal(n_state, reset=1)
+        curval = [state[i] for i in range(n_state)]
+        curval += [0]*(n_out - n_state)
+        for i in range(n_out):
+            nv = reduce(xor, [curval[tap] for tap in taps])
+            curval.insert(0, nv)
+            curval.pop()
+
+        self.comb += self.o.eq(Cat(*curval[:n_out]))
+        self.sync += \
+            If(self.load,
+                state.eq(self.seed)
+            ).Elif(self.ce,
+                state.eq(Cat(*curval[:n_state]))
+            )
+
+
+class _PatternGenerator(Module):
+    def __init__(self, data_width):
+        self.pattern = Signal(2)
+        self.seed = Signal(31)
+        self.load = Signal()
+        self.ce = Signal()
+        self.address = Signal(32)
+        self.o = Signal(data_width)
+
+        # # #
+
+        prbs = _PRBSGenerator(data_width)
+        self.submodules += prbs
+        self.comb += [
+            prbs.seed.eq(self.seed),
+            prbs.load.eq(self.load),
+            prbs.ce.eq(self.ce)
+        ]
+
+        walking_one = Signal(data_width, reset=1)
+        self.sync += \
+            If(self.load,
+                walking_one.eq(1)
+            ).Elif(self.ce,
+                walking_one.eq(Cat(walking_one[-1], walking_one[:-1]))
+            )
+
+        self.comb += \
+            Case(self.pattern, {
+                patterns["prbs"]:        self.o.eq(prbs.o),
+                patterns["address"]:     self.o.eq(Replicate(Cat(self.address, ~self.address), data_width//64)),
+                patterns["walking_one"]: self.o.eq(walking_one),
+                "default":               self.o.eq(0)
+            })
+
+
+class _AXIBISTWriter(Module):
+    def __init__(self, port, max_outstanding):
+        self.start = Signal()
+        self.base = Signal(32)
+        self.length = Signal(32)
+        self.burst_length = Signal(9)
+        self.outstanding = Signal(max=max_outstanding + 1)
+        self.done = Signal()
+
+        self.submodules.generator = generator = _PatternGenerator(port.data_width)
+
+        # # #
+
+        ashift = log2_int(port.data_width//8)
+
+        cmd_addr = Signal(32)
+        cmd_beats = Signal(32)
+        data_addr = Signal(32)
+        data_beats = Signal(32)
+        data_count = Signal(9)
+        data_bursts = Signal(max=max_outstanding + 1)
+        pending = Signal(max=max_outstanding + 1)
+        running = Signal()
+
+        aw_done = Signal()
+        w_done = Signal()
+        b_done = Signal()
+        self.comb += [
+            aw_done.eq(port.aw.valid & port.aw.ready),
+            w_done.eq(port.w.valid & port.w.ready & port.w.last),
+            b_done.eq(port.b.valid & port.b.ready)
+        ]
+
+        # Commands
+        self.comb += [
+            port.aw.valid.eq(running & (cmd_beats != 0) & (pending < self.outstanding)),
+            port.aw.addr.eq(cmd_addr),
+            port.aw.burst.eq(0b01), # INCR
+            port.aw.len.eq(self.burst_length - 1),
+            port.aw.size.eq(ashift),
+            port.aw.id.eq(0)
+        ]
+        self.sync += [
+            If(self.start,
+                cmd_addr.eq(self.base),
+                cmd_beats.eq(self.length[ashift:])
+            ).Elif(aw_done,
+                cmd_addr.eq(cmd_addr + (self.burst_length << ashift)),
+                cmd_beats.eq(cmd_beats - self.burst_length)
+            ),
+            If(self.start,
+                pending.eq(0)
+            ).Elif(aw_done & ~b_done,
+                pending.eq(pending + 1)
+            ).Elif(~aw_done & b_done,
+                pending.eq(pending - 1)
+            )
+        ]
+
+        # Data (only for bursts whose command has been issued)
+        self.comb += [
+            generator.load.eq(self.start),
+            generator.ce.eq(port.w.valid & port.w.ready),
+            generator.address.eq(data_addr),
+            port.w.valid.eq(running & (data_bursts != 0)),
+            port.w.data.eq(generator.o),
+            port.w.strb.eq(2**(port.data_width//8) - 1),
+            port.w.last.eq(data_count == (self.burst_length - 1))
+        ]
+        self.sync += [
+            If(self.start,
+                data_addr.eq(self.base),
+                data_beats.eq(self.length[ashift:]),
+                data_count.eq(0)
+            ).Elif(port.w.valid & port.w.ready,
+                data_addr.eq(data_addr + 2**ashift),
+                data_beats.eq(data_beats - 1),
+                data_count.eq(data_count + 1),
+                If(port.w.last,
+                    data_count.eq(0)
+                )
+            ),
+            If(self.start,
+                data_bursts.eq(0)
+            ).Elif(aw_done & ~w_done,
+                data_bursts.eq(data_bursts + 1)
+            ).Elif(~aw_done & w_done,
+                data_bursts.eq(data_bursts - 1)
+            )
+        ]
+
+        # Responses
+        self.comb += [
+            port.b.ready.eq(1),
+            self.done.eq(running & (cmd_beats == 0) & (data_beats == 0) & (pending == 0))
+        ]
+        self.sync += \
+            If(self.start,
+                running.eq(1)
+            ).Elif(self.done,
+                running.eq(0)
+            )
+
+
+class _AXIBISTReader(Module):
+    def __init__(self, port, max_outstanding):
+        self.start = Signal()
+        self.base = Signal(32)
+        self.length = Signal(32)
+        self.burst_length = Signal(9)
+        self.outstanding = Signal(max=max_outstanding + 1)
+        self.done = Signal()
+        self.errors = Signal(32)
+        self.error_address = Signal(32)
+
+        self.submodules.generator = generator = _PatternGenerator(port.data_width)
+
+        # # #
+
+        ashift = log2_int(port.data_width//8)
+
+        cmd_addr = Signal(32)
+        cmd_beats = Signal(32)
+        data_addr = Signal(32)
+        data_beats = Signal(32)
+        pending = Signal(max=max_outstanding + 1)
+        running = Signal()
+
+        ar_done = Signal()
+        r_done = Signal()
+        self.comb += [
+            ar_done.eq(port.ar.valid & port.ar.ready),
+            r_done.eq(port.r.valid & port.r.ready & port.r.last)
+        ]
+
+        # Commands
+        self.comb += [
+            port.ar.valid.eq(running & (cmd_beats != 0) & (pending < self.outstanding)),
+            port.ar.addr.eq(cmd_addr),
+            port.ar.burst.eq(0b01), # INCR
+            port.ar.len.eq(self.burst_length - 1),
+            port.ar.size.eq(ashift),
+            port.ar.id.eq(0)
+        ]
+        self.sync += [
+            If(self.start,
+                cmd_addr.eq(self.base),
+                cmd_beats.eq(self.length[ashift:])
+            ).Elif(ar_done,
+                cmd_addr.eq(cmd_addr + (self.burst_length << ashift)),
+                cmd_beats.eq(cmd_beats - self.burst_length)
+            ),
+            If(self.start,
+                pending.eq(0)
+            ).Elif(ar_done & ~r_done,
+                pending.eq(pending + 1)
+            ).Elif(~ar_done & r_done,
+                pending.eq(pending - 1)
+            )
+        ]
+
+        # Data check
+        self.comb += [
+            generator.load.eq(self.start),
+            generator.ce.eq(port.r.valid & port.r.ready),
+            generator.address.eq(data_addr),
+            port.r.ready.eq(1)
+        ]
+        self.sync += [
+            If(self.start,
+                data_addr.eq(self.base),
+                data_beats.eq(self.length[ashift:]),
+                self.errors.eq(0)
+            ).Elif(port.r.valid & port.r.ready,
+                data_addr.eq(data_addr + 2**ashift),
+                data_beats.eq(data_beats - 1),
+                If(port.r.data != generator.o,
+                    self.errors.eq(self.errors + 1),
+                    If(self.errors == 0,
+                        self.error_address.eq(data_addr)
+                    )
+                )
+            )
+        ]
+
+        self.comb += self.done.eq(running & (cmd_beats == 0) & (data_beats == 0) & (pending == 0))
+        self.sync += \
+            If(self.start,
+                running.eq(1)
+            ).Elif(self.done,
+                running.eq(0)
+            )
+
+
+class AXIBIST(Module, AutoCSR):
+    """AXI traffic generator and checker
+
+    Writes and/or reads back length bytes from base (AXI addresses) with the
+    selected pattern, in INCR bursts of burst_length beats with up to
+    outstanding bursts in flight. length must be a multiple of the burst size
+    and base aligned on it. Each pass is timed in sys_clk cycles, the read
+    pass counts the mismatching beats and latches the address of the first
+    one.
+    """
+    def __init__(self, port, max_outstanding=8):
+        self._start = CSR(2)
+        self._base = CSRStorage(32)
+        self._length = CSRStorage(32)
+        self._pattern = CSRStorage(2)
+        self._seed = CSRStorage(31, reset=1)
+        self._burst_length = CSRStorage(9, reset=16)
+        self._outstanding = CSRStorage(bits_for(max_outstanding), reset=max_outstanding)
+        self._done = CSRStatus()
+        self._write_ticks = CSRStatus(32)
+        self._read_ticks = CSRStatus(32)
+        self._errors = CSRStatus(32)
+        self._error_address = CSRStatus(32)
+
+        # # #
+
+        writer = _AXIBISTWriter(port, max_outstanding)
+        reader = _AXIBISTReader(port, max_outstanding)
+        self.submodules += writer, reader
+
+        for module in writer, reader:
+            self.comb += [
+                module.base.eq(self._base.storage),
+                module.length.eq(self._length.storage),
+                module.burst_length.eq(self._burst_length.storage),
+                module.outstanding.eq(self._outstanding.storage),
+                module.generator.pattern.eq(self._pattern.storage),
+                module.generator.seed.eq(self._seed.storage)
+            ]
+        self.comb += [
+            self._errors.status.eq(reader.errors),
+            self._error_address.status.eq(reader.error_address)
+        ]
+
+        write = Signal()
+        read = Signal()
+        write_ticks = Signal(32)
+        read_ticks = Signal(32)
+        self.comb += [
+            self._write_ticks.status.eq(write_ticks),
+            self._read_ticks.status.eq(read_ticks)
+        ]
+
+        self.submodules.fsm = fsm = FSM(reset_state="IDLE")
+        fsm.act("IDLE",
+            self._done.status.eq(1),
+            If(self._start.re,
+                NextValue(write, self._start.r[0]),
+                NextValue(read, self._start.r[1]),
+                NextValue(write_ticks, 0),
+                NextValue(read_ticks, 0),
+                NextState("START")
+            )
+        )
+        fsm.act("START",
+            If(write,
+                writer.start.eq(1),
+                NextState("WRITE")
+            ).Elif(read,
+                reader.start.eq(1),
+                NextState("READ")
+            ).Else(
+                NextState("IDLE")
+            )
+        )
+        fsm.act("WRITE",
+            NextValue(write_ticks, write_ticks + 1),
+            If(writer.done,
+                NextValue(write, 0),
+                NextState("START")
+            )
+        )
+        fsm.act("READ",
+            NextValue(read_ticks, read_ticks + 1),
+            If(reader.done,
+                NextValue(read, 0),
+                NextState("START")
+            )
+        )
@@ -0,0 +1,340 @@
+from migen import *
+from migen.genlib.fifo import SyncFIFO
+
+from litex.soc.interconnect.csr import *
+from litex.soc.interconnect.csr_eventmanager import *
+
+
+def _burst_beats(module, addr, beats, max_burst, ashift):
+    """Beats of the next burst: up to max_burst, not crossing a 4KB boundary"""
+    n = Signal(max=max_burst + 1)
+    to_boundary = Signal(12 - ashift + 1)
+    module.comb += [
+        to_boundary.eq((4096 >> ashift) - addr[ashift:12]),
+        If((beats < max_burst) & (beats < to_boundary),
+            n.eq(beats)
+        ).Elif(to_boundary < max_burst,
+            n.eq(to_boundary)
+        ).Else(
+            n.eq(max_burst)
+        )
+    ]
+    return n
+
+
+class DMAReader(Module):
+    """Reads beats from addr into fifo (migen SyncFIFO of the port data width)"""
+    def __init__(self, port, fifo, max_burst):
+        self.start = Signal()
+        self.addr = Signal(32)
+        self.beats = Signal(32)
+        self.done = Signal()
+
+        # # #
+
+        ashift = log2_int(port.data_width//8)
+
+        cmd_addr = Signal(32)
+        cmd_beats = Signal(32)
+        data_beats = Signal(32)
+        reserved = Signal(max=fifo.depth + 1)
+        free = Signal(max=fifo.depth + 1)
+        running = Signal()
+
+        n = _burst_beats(self, cmd_addr, cmd_beats, max_burst, ashift)
+
+        ar_done = Signal()
+        r_done = Signal()
+        self.comb += [
+            ar_done.eq(port.ar.valid & port.ar.ready),
+            r_done.eq(port.r.valid & port.r.ready)
+        ]
+
+        # Commands (only when the FIFO has room for the whole burst)
+        self.comb += [
+            free.eq(fifo.depth - fifo.level - reserved),
+            port.ar.valid.eq(running & (cmd_beats != 0) & (free >= n)),
+            port.ar.addr.eq(cmd_addr),
+            port.ar.burst.eq(0b01), # INCR
+            port.ar.len.eq(n - 1),
+            port.ar.size.eq(ashift),
+            port.ar.id.eq(0)
+        ]
+        self.sync += [
+            If(self.start,
+                cmd_addr.eq(self.addr),
+                cmd_beats.eq(self.beats)
+            ).Elif(ar_done,
+                cmd_addr.eq(cmd_addr + (n << ashift)),
+                cmd_beats.eq(cmd_beats - n)
+            ),
+            If(self.start,
+                reserved.eq(0)
+            ).Elif(ar_done,
+                reserved.eq(reserved + n - r_done)
+            ).Elif(r_done,
+                reserved.eq(reserved - 1)
+            )
+        ]
+
+        # Data
+        self.comb += [
+            port.r.ready.eq(1),
+            fifo.din.eq(port.r.data),
+            fifo.we.eq(r_done)
+        ]
+        self.sync += \
+            If(self.start,
+                data_beats.eq(self.beats)
+            ).Elif(r_done,
+                data_beats.eq(data_beats - 1)
+            )
+
+        self.comb += self.done.eq(running & (cmd_beats == 0) & (data_beats == 0))
+        self.sync += \
+            If(self.start,
+                running.eq(1)
+            ).Elif(self.done,
+                running.eq(0)
+            )
+
+
+class DMAWriter(Module):
+    """Writes beats from fifo (re pops it) or fill_value to addr"""
+    def __init__(self, port, fifo, max_burst, max_outstanding):
+        self.start = Signal()
+        self.addr = Signal(32)
+        self.beats = Signal(32)
+        self.fill = Signal()
+        self.fill_value = Signal(32)
+        self.re = Signal()
+        self.done = Signal()
+
+        # # #
+
+        ashift = log2_int(port.data_width//8)
+
+        cmd_addr = Signal(32)
+        cmd_beats = Signal(32)
+        count = Signal(max=max_burst + 1)
+        pending = Signal(max=max_outstanding + 1)
+        running = Signal()
+
+        n = _burst_beats(self, cmd_addr, cmd_beats, max_burst, ashift)
+
+        aw_done = Signal()
+        w_done = Signal()
+        b_done = Signal()
+        self.comb += [
+            aw_done.eq(port.aw.valid & port.aw.ready),
+            w_done.eq(port.w.valid & port.w.ready),
+            b_done.eq(port.b.valid & port.b.ready)
+        ]
+
+        # Commands (one burst of data at a time, only issued when its data
+        # is available so the W channel of the controller is never held)
+        self.comb += [
+            port.aw.valid.eq(running & (cmd_beats != 0) & (count == 0) &
+                (pending < max_outstanding) & (self.fill | (fifo.level >= n))),
+            port.aw.addr.eq(cmd_addr),
+            port.aw.burst.eq(0b01), # INCR
+            port.aw.len.eq(n - 1),
+            port.aw.size.eq(ashift),
+            port.aw.id.eq(0)
+        ]
+        self.sync += [
+            If(self.start,
+                cmd_addr.eq(self.addr),
+                cmd_beats.eq(self.beats)
+            ).Elif(aw_done,
+                cmd_addr.eq(cmd_addr + (n << ashift)),
+                cmd_beats.eq(cmd_beats - n)
+            ),
+            If(self.start,
+                pending.eq(0)
+            ).Elif(aw_done & ~b_done,
+                pending.eq(pending + 1)
+            ).Elif(~aw_done & b_done,
+                pending.eq(pending - 1)
+            )
+        ]
+
+        # Data
+        self.comb += [
+            port.w.valid.eq((count != 0) & (self.fill | fifo.readable)),
+            port.w.data.eq(Mux(self.fill, Replicate(self.fill_value, port.data_width//32), fifo.dout)),
+            port.w.strb.eq(2**(port.data_width//8) - 1),
+            port.w.last.eq(count == 1),
+            self.re.eq(w_done & ~self.fill)
+        ]
+        self.sync += \
+            If(self.start,
+                count.eq(0)
+            ).Elif(aw_done,
+                count.eq(n)
+            ).Elif(w_done,
+                count.eq(count - 1)
+            )
+
+        # Responses
+        self.comb += [
+            port.b.ready.eq(1),
+            self.done.eq(running & (cmd_beats == 0) & (count == 0) & (pending == 0))
+        ]
+        self.sync += \
+            If(self.start,
+                running.eq(1)
+            ).Elif(self.done,
+                running.eq(0)
+            )
+
+
+class AXIDMA(Module, AutoCSR):
+    """AXI DMA engine (copy/fill, single transfer or scatter-gather)
+
+    A transfer copies length bytes from src to dst (AXI addresses), or fills
+    them with the 32-bit value given in src, in INCR bursts of up to
+    max_burst beats that do not cross 4KB boundaries. Reads run ahead of the
+    writes through a FIFO of two bursts. Addresses and length must be
+    multiples of the data width (8 bytes), lower bits are ignored.
+
+    start bit 0 runs the transfer described by the src/dst/length/fill
+    registers, bit 1 runs the chain of descriptors at descriptor. A
+    descriptor is 16 bytes aligned and read from memory by the engine:
+
+        word 0: src (or fill value)
+        word 1: dst
+        word 2: length
+        word 3: next descriptor (0 ends the chain), bit 0: fill
+
+    The done event is raised at the end of the transfer or of the chain,
+    ticks counts its sys_clk cycles.
+    """
+    def __init__(self, port, max_burst=16, max_outstanding=8):
+        self._start = CSR(2)
+        self._src = CSRStorage(32)
+        self._dst = CSRStorage(32)
+        self._length = CSRStorage(32)
+        self._fill = CSRStorage()
+        self._descriptor = CSRStorage(32)
+        self._busy = CSRStatus()
+        self._ticks = CSRStatus(32)
+        self._descriptors = CSRStatus(32)
+
+        self.submodules.ev = EventManager()
+        self.ev.done = EventSourcePulse()
+        self.ev.finalize()
+
+        # # #
+
+        assert port.data_width == 64 # descriptor layout
+        ashift = log2_int(port.data_width//8)
+
+        self.submodules.fifo = fifo = SyncFIFO(port.data_width, 2*max_burst)
+        reader = DMAReader(port, fifo, max_burst)
+        writer = DMAWriter(port, fifo, max_burst, max_outstanding)
+        self.submodules += reader, writer
+
+        src = Signal(32)
+        dst = Signal(32)
+        length = Signal(32)
+        fill = Signal()
+        descriptor = Signal(32)
+        next_descriptor = Signal(32)
+        ticks = Signal(32)
+        descriptors = Signal(32)
+        self.comb += [
+            self._ticks.status.eq(ticks),
+            self._descriptors.status.eq(descriptors)
+        ]
+
+        desc_re = Signal()
+        self.comb += [
+            fifo.re.eq(writer.re | desc_re),
+            writer.addr.eq(dst[ashift:] << ashift),
+            writer.beats.eq(length[ashift:]),
+            writer.fill.eq(fill),
+            writer.fill_value.eq(src)
+        ]
+
+        # Descriptors are fetched through the reader and the FIFO
+        fetch = Signal()
+        self.comb += [
+            reader.addr.eq(Mux(fetch, descriptor, src[ashift:] << ashift)),
+            reader.beats.eq(Mux(fetch, 16 >> ashift, length[ashift:]))
+        ]
+
+        self.submodules.fsm = fsm = FSM(reset_state="IDLE")
+        fsm.act("IDLE",
+            If(self._start.re,
+                NextValue(ticks, 0),
+                NextValue(descriptors, 0),
+                If(self._start.r[1],
+                    NextValue(descriptor, self._descriptor.storage),
+                    NextState("FETCH")
+                ).Elif(self._start.r[0],
+                    NextValue(src, self._src.storage),
+                    NextValue(dst, self._dst.storage),
+                    NextValue(length, self._length.storage),
+                    NextValue(fill, self._fill.storage),
+                    NextValue(next_descriptor, 0),
+                    NextState("START")
+                )
+            )
+        )
+        fsm.act("FETCH",
+            NextValue(ticks, ticks + 1),
+            fetch.eq(1),
+            reader.start.eq(1),
+            NextState("FETCH-WAIT")
+        )
+        fsm.act("FETCH-WAIT",
+            NextValue(ticks, ticks + 1),
+            fetch.eq(1),
+            If(reader.done,
+                NextState("DESCRIPTOR-0")
+            )
+        )
+        fsm.act("DESCRIPTOR-0",
+            NextValue(ticks, ticks + 1),
+            desc_re.eq(1),
+            NextValue(src, fifo.dout[:32]),
+            NextValue(dst, fifo.dout[32:]),
+            NextState("DESCRIPTOR-1")
+        )
+        fsm.act("DESCRIPTOR-1",
+            NextValue(ticks, ticks + 1),
+            desc_re.eq(1),
+            NextValue(length, fifo.dout[:32]),
+            NextValue(fill, fifo.dout[32]),
+            NextValue(next_descriptor, Cat(Replicate(0, 4), fifo.dout[36:])),
+            NextValue(descriptors, descriptors + 1),
+            NextState("START")
+        )
+        fsm.act("START",
+            NextValue(ticks, ticks + 1),
+            If(length[ashift:] == 0,
+                NextState("NEXT")
+            ).Else(
+                writer.start.eq(1),
+                reader.start.eq(~fill),
+                NextState("RUN")
+            )
+        )
+        fsm.act("RUN",
+            NextValue(ticks, ticks + 1),
+            If(writer.done,
+                NextState("NEXT")
+            )
+        )
+        fsm.act("NEXT",
+            NextValue(ticks, ticks + 1),
+            If(next_descriptor != 0,
+                NextValue(descriptor, next_descriptor),
+                NextState("FETCH")
+            ).Else(
+                self.ev.done.trigger.eq(1),
+                NextState("IDLE")
+            )
+        )
+        self.comb += self._busy.status.eq(~fsm.ongoing("IDLE"))
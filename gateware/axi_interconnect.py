@@ -0,0 +1,132 @@
+from functools import reduce
+from operator import or_
+
+from migen import *
+from migen.genlib.roundrobin import *
+from migen.genlib.fifo import SyncFIFO
+
+
+class _PriorityArbiter(Module):
+    """Round-robin arbitration among the requesting masters of highest priority
+
+    The grant only moves when the granted master is not requesting or when
+    its request is accepted (ce), so a presented command is never withdrawn.
+    """
+    def __init__(self, requests, priorities):
+        n = len(requests)
+        self.ce = Signal()
+        self.grant = Signal(max=max(n, 2))
+
+        # # #
+
+        masked = Signal(n)
+        statement = masked.eq(Cat(*requests))
+        for level in sorted(set(priorities)):
+            members = [i for i, p in enumerate(priorities) if p == level]
+            statement = If(reduce(or_, [requests[i] for i in members]),
+                masked.eq(Cat(*[requests[i] if priorities[i] == level else 0 for i in range(n)]))
+            ).Else(statement)
+        self.comb += statement
+
+        self.submodules.rr = rr = RoundRobin(n, SP_CE)
+        self.comb += [
+            rr.request.eq(masked),
+            rr.ce.eq(self.ce | ~Array(requests)[rr.grant]),
+            self.grant.eq(rr.grant)
+        ]
+
+
+class AXIInterconnect(Module):
+    """AXI masters to a single slave port
+
+    Each master is identified on the slave by its index on the upper bits of
+    the slave ID (the lower bits carry the master's own ID), B and R
+    responses are routed back on it so the masters can have transactions in
+    flight concurrently. AW and AR are arbitrated per transaction with a
+    round-robin among the requesting masters of highest priority (a higher
+    priority master can starve the others), W bursts follow the order of the
+    accepted AW commands. The slave is expected to return the responses of
+    an ID in order.
+    """
+    def __init__(self, masters, slave, priorities=None, max_write_outstanding=16):
+        n = len(masters)
+        if priorities is None:
+            priorities = [0]*n
+        assert len(priorities) == n
+
+        if n == 1:
+            m = masters[0]
+            self.comb += [
+                m.aw.connect(slave.aw),
+                m.w.connect(slave.w),
+                slave.b.connect(m.b),
+                m.ar.connect(slave.ar),
+                slave.r.connect(m.r)
+            ]
+            return
+
+        # # #
+
+        index_bits = bits_for(n - 1)
+        id_bits = len(slave.aw.id) - index_bits
+        assert id_bits >= 0
+
+        def slave_id(ax, i):
+            return Cat(*([ax.id[:id_bits]] if id_bits else []), i)
+
+        # Write commands
+        self.submodules.write_arbiter = write_arbiter = _PriorityArbiter(
+            [m.aw.valid for m in masters], priorities)
+        write_order = SyncFIFO(index_bits, max_write_outstanding)
+        self.submodules += write_order
+        self.comb += [
+            write_arbiter.ce.eq(slave.aw.valid & slave.aw.ready),
+            write_order.din.eq(write_arbiter.grant),
+            write_order.we.eq(slave.aw.valid & slave.aw.ready)
+        ]
+        for i, m in enumerate(masters):
+            self.comb += If(write_arbiter.grant == i,
+                m.aw.connect(slave.aw, omit={"valid", "ready", "id"}),
+                slave.aw.id.eq(slave_id(m.aw, i)),
+                slave.aw.valid.eq(m.aw.valid & write_order.writable),
+                m.aw.ready.eq(slave.aw.ready & write_order.writable)
+            )
+
+        # Write data (in AW order)
+        self.comb += write_order.re.eq(slave.w.valid & slave.w.ready & slave.w.last)
+        for i, m in enumerate(masters):
+            self.comb += If(write_order.readable & (write_order.dout == i),
+                m.w.connect(slave.w)
+            )
+
+        # Write responses
+        b_index = slave.b.id[id_bits:]
+        for i, m in enumerate(masters):
+            self.comb += [
+                m.b.resp.eq(slave.b.resp),
+                m.b.id.eq(slave.b.id[:id_bits] if id_bits else 0),
+                m.b.valid.eq(slave.b.valid & (b_index == i)),
+                If(b_index == i, slave.b.ready.eq(m.b.ready))
+            ]
+
+        # Read commands
+        self.submodules.read_arbiter = read_arbiter = _PriorityArbiter(
+            [m.ar.valid for m in masters], priorities)
+        self.comb += read_arbiter.ce.eq(slave.ar.valid & slave.ar.ready)
+        for i, m in enumerate(masters):
+            self.comb += If(read_arbiter.grant == i,
+                m.ar.connect(slave.ar, omit={"id"}),
+                slave.ar.id.eq(slave_id(m.ar, i))
+            )
+
+        # Read data
+        r_index = slave.r.id[id_bits:]
+        for i, m in enumerate(masters):
+            self.comb += [
+                m.r.resp.eq(slave.r.resp),
+                m.r.data.eq(slave.r.data),
+                m.r.last.eq(slave.r.last),
+                m.r.id.eq(slave.r.id[:id_bits] if id_bits else 0),
+                m.r.valid.eq(slave.r.valid & (r_index == i)),
+                If(r_index == i, slave.r.ready.eq(m.r.ready))
+            ]
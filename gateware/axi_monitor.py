@@ -0,0 +1,208 @@
+from functools import reduce
+from operator import add
+
+from migen import *
+from migen.genlib.fifo import SyncFIFO
+
+from litex.soc.interconnect.csr import *
+
+
+class _LatencyHistogram(Module):
+    """Latencies bucketed on powers of two: [0, 2), [2, 4), ..., [2**(n-1), inf)"""
+    def __init__(self, nbuckets, clear, enable, latency_width=16):
+        self.latency = Signal(latency_width)
+        self.ce = Signal()
+        self.buckets = [Signal(32) for i in range(nbuckets)]
+        self.sum = Signal(32)
+        self.max = Signal(latency_width)
+
+        # # #
+
+        bucket = Signal(max=max(nbuckets, 2))
+        for i in range(1, nbuckets):
+            self.comb += If(self.latency >= 2**i, bucket.eq(i))
+
+        self.sync += \
+            If(clear,
+                [b.eq(0) for b in self.buckets],
+                self.sum.eq(0),
+                self.max.eq(0)
+            ).Elif(enable & self.ce,
+                Case(bucket, {i: self.buckets[i].eq(self.buckets[i] + 1) for i in range(nbuckets)}),
+                self.sum.eq(self.sum + self.latency),
+                If(self.latency > self.max,
+                    self.max.eq(self.latency)
+                )
+            )
+
+
+class AXIMonitor(Module, AutoCSR):
+    """AXI bus performance monitor
+
+    Passively taps an AXI port and counts transactions, beats, bytes and
+    stalled cycles (valid without ready) of each channel, tracks outstanding
+    transactions and records write (AW to B) and read (AR to first R beat)
+    latencies in power-of-two histograms. Responses are paired with their
+    request per AXI ID (in order within an ID, interleaved/reordered between
+    IDs), up to max_outstanding transactions per ID and direction are timed,
+    the others are counted in write/read_dropped.
+
+    Counting can be paused with enable, the reset CSR clears everything and
+    histogram buckets are read through histogram_select (bit 0-3: bucket,
+    bit 4: 0 read / 1 write) and histogram_value.
+    """
+    def __init__(self, port, nbuckets=10, max_outstanding=4):
+        assert nbuckets <= 16
+        self.nbuckets = nbuckets
+
+        self._enable = CSRStorage(reset=1)
+        self._reset = CSR()
+        self._cycles = CSRStatus(32)
+
+        self._write_transactions = CSRStatus(32)
+        self._write_beats = CSRStatus(32)
+        self._write_bytes = CSRStatus(32)
+        self._aw_stalls = CSRStatus(32)
+        self._w_stalls = CSRStatus(32)
+        self._b_stalls = CSRStatus(32)
+        self._write_outstanding_max = CSRStatus(8)
+        self._write_latency_sum = CSRStatus(32)
+        self._write_latency_max = CSRStatus(16)
+        self._write_dropped = CSRStatus(32)
+
+        self._read_transactions = CSRStatus(32)
+        self._read_beats = CSRStatus(32)
+        self._read_bytes = CSRStatus(32)
+        self._ar_stalls = CSRStatus(32)
+        self._r_stalls = CSRStatus(32)
+        self._read_outstanding_max = CSRStatus(8)
+        self._read_latency_sum = CSRStatus(32)
+        self._read_latency_max = CSRStatus(16)
+        self._read_dropped = CSRStatus(32)
+
+        self._histogram_select = CSRStorage(5)
+        self._histogram_value = CSRStatus(32)
+
+        # # #
+
+        clear = self._reset.re
+        enable = self._enable.storage
+        bytes_per_beat = port.data_width//8
+
+        def counter(csr, increment):
+            value = Signal(32)
+            self.sync += \
+                If(clear,
+                    value.eq(0)
+                ).Elif(enable,
+                    value.eq(value + increment)
+                )
+            self.comb += csr.status.eq(value)
+
+        aw = port.aw.valid & port.aw.ready
+        w = port.w.valid & port.w.ready
+        b = port.b.valid & port.b.ready
+        ar = port.ar.valid & port.ar.ready
+        r = port.r.valid & port.r.ready
+        r_last = r & port.r.last
+
+        strb_count = Signal(max=bytes_per_beat + 1)
+        self.comb += strb_count.eq(reduce(add, [port.w.strb[i] for i in range(bytes_per_beat)]))
+
+        counter(self._cycles, 1)
+
+        counter(self._write_transactions, aw)
+        counter(self._write_beats, w)
+        counter(self._write_bytes, Mux(w, strb_count, 0))
+        counter(self._aw_stalls, port.aw.valid & ~port.aw.ready)
+        counter(self._w_stalls, port.w.valid & ~port.w.ready)
+        counter(self._b_stalls, port.b.valid & ~port.b.ready)
+
+        counter(self._read_transactions, ar)
+        counter(self._read_beats, r)
+        counter(self._read_bytes, Mux(r, bytes_per_beat, 0))
+        counter(self._ar_stalls, port.ar.valid & ~port.ar.ready)
+        counter(self._r_stalls, port.r.valid & ~port.r.ready)
+
+        # Outstanding transactions
+        for csr, start, end in [(self._write_outstanding_max, aw, b),
+                                (self._read_outstanding_max, ar, r_last)]:
+            outstanding = Signal(8)
+            outstanding_max = Signal(8)
+            self.sync += [
+                If(start & ~end,
+                    outstanding.eq(outstanding + 1)
+                ).Elif(~start & end,
+                    outstanding.eq(outstanding - 1)
+                ),
+                If(clear,
+                    outstanding_max.eq(0)
+                ).Elif(enable & (outstanding > outstanding_max),
+                    outstanding_max.eq(outstanding)
+                )
+            ]
+            self.comb += csr.status.eq(outstanding_max)
+
+        # Latencies
+        timestamp = Signal(16)
+        self.sync += timestamp.eq(timestamp + 1)
+
+        r_first = Signal(reset=1)
+        self.sync += If(r, r_first.eq(port.r.last))
+
+        # one timestamp FIFO per ID (responses are only ordered per ID), when
+        # one is full the next transactions of the ID are not timed (counted in
+        # dropped) until all their responses are seen, to keep the pairing
+        nids = 2**len(port.aw.id)
+        histograms = []
+        for name, start, start_id, measure, end, end_id in [
+                ("write", aw, port.aw.id, b, b, port.b.id),
+                ("read", ar, port.ar.id, r & r_first, r_last, port.r.id)]:
+            histogram = _LatencyHistogram(nbuckets, clear, enable)
+            self.submodules += histogram
+            douts = []
+            readables = []
+            untimed = Signal()
+            for i in range(nids):
+                timestamps = SyncFIFO(16, max_outstanding)
+                skip = Signal(8)
+                self.submodules += timestamps
+                push = Signal()
+                pop = Signal()
+                skip_inc = Signal()
+                skip_dec = Signal()
+                self.comb += [
+                    push.eq(start & (start_id == i) & timestamps.writable & (skip == 0)),
+                    skip_inc.eq(start & (start_id == i) & ~push),
+                    pop.eq(end & (end_id == i) & timestamps.readable),
+                    skip_dec.eq(end & (end_id == i) & ~timestamps.readable & (skip != 0)),
+                    timestamps.din.eq(timestamp),
+                    timestamps.we.eq(push),
+                    timestamps.re.eq(pop),
+                    If(skip_inc, untimed.eq(1))
+                ]
+                self.sync += \
+                    If(skip_inc & ~skip_dec,
+                        skip.eq(skip + 1)
+                    ).Elif(~skip_inc & skip_dec,
+                        skip.eq(skip - 1)
+                    )
+                douts.append(timestamps.dout)
+                readables.append(timestamps.readable)
+            self.comb += [
+                histogram.latency.eq(timestamp - Array(douts)[end_id]),
+                histogram.ce.eq(measure & Array(readables)[end_id])
+            ]
+            counter(getattr(self, "_" + name + "_dropped"), untimed)
+            self.comb += [
+                getattr(self, "_" + name + "_latency_sum").status.eq(histogram.sum),
+                getattr(self, "_" + name + "_latency_max").status.eq(histogram.max)
+            ]
+            histograms.append(histogram)
+
+        read_histogram, write_histogram = histograms[1], histograms[0]
+        self.comb += \
+            Case(self._histogram_select.storage, dict(
+                [(i, self._histogram_value.status.eq(read_histogram.buckets[i])) for i in range(nbuckets)] +
+                [(16 + i, self._histogram_value.status.eq(write_histogram.buckets[i])) for i in range(nbuckets)]
+            ))
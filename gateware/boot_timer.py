@@ -0,0 +1,55 @@
+from migen import *
+from migen.genlib.cdc import MultiReg
+
+from litex.soc.interconnect.csr import *
+
+
+class BootTimer(Module, AutoCSR):
+    """Boot timestamps
+
+    A counter of the free-running osc domain (never reset, starts with the
+    FPGA configuration) is latched the first time each event goes high. The
+    timestamps are static once latched, only the done flags are resynchronized
+    to sys, a timestamp reads 0xffffffff until its event has occurred (and
+    wraps after 2**32 cycles of osc).
+
+    cycles counts the sys_clk cycles since the release of the sys reset, it
+    times the software boot (CPU start to the current point) with the sys
+    timer still available to the firmware.
+
+    events is a list of (name, signal), a CSR is created for each.
+    """
+    def __init__(self, events):
+        self._cycles = CSRStatus(32)
+
+        # # #
+
+        counter = Signal(32)
+        self.sync.osc += counter.eq(counter + 1)
+
+        for name, event in events:
+            csr = CSRStatus(32, name=name)
+            setattr(self, "_" + name, csr)
+
+            event_osc = Signal()
+            timestamp = Signal(32)
+            done = Signal()
+            done_sys = Signal()
+            self.specials += [
+                MultiReg(event, event_osc, "osc"),
+                MultiReg(done, done_sys, "sys")
+            ]
+            self.sync.osc += \
+                If(event_osc & ~done,
+                    timestamp.eq(counter),
+                    done.eq(1)
+                )
+            # timestamp is read in sys without synchronizer: it is written
+            # in the osc cycle setting done and never changes after, so it
+            # is stable by the time done_sys is seen (osc/sys are declared
+            # asynchronous clock groups in the CRG)
+            self.comb += csr.status.eq(Mux(done_sys, timestamp, 2**32 - 1))
+
+        cycles = Signal(32)
+        self.sync += cycles.eq(cycles + 1)
+        self.comb += self._cycles.status.eq(cycles)
@@ -0,0 +1,202 @@
+from migen import *
+from migen.genlib.misc import WaitTimer
+
+from litex.soc.interconnect import stream
+
+
+class DDR3Model(Module):
+    """Behavioral stand-in for the Microsemi ``ddr3`` core
+
+    Exposes the control/status signals of the ``ddr3`` instance and serves the
+    AXI port from a simulation memory. Timings are expressed in SYS_CLK cycles,
+    defaults are the controller configuration of components/ddr3/ddr3.v
+    (DDR3 @ 400MHz, 4:1 ratio) rounded up to the 100MHz user clock.
+    """
+    def __init__(self, axi_port, size=0x2000000, init=[],
+            read_latency=8, write_latency=4,
+            trcd=2, trp=2, trefi=780, trfc=26,
+            col_bits=10, bank_bits=3,
+            pll_lock_cycles=64, init_cycles=1024):
+        self.PLL_REF_CLK = Signal()
+        self.SYS_RESET_N = Signal()
+        self.SYS_CLK = Signal()
+        self.PLL_LOCK = Signal()
+        self.CTRLR_READY = Signal()
+
+        # # #
+
+        dw = axi_port.data_width
+        ashift = log2_int(dw//8)
+        depth = size//(dw//8)
+        depth_bits = log2_int(depth)
+
+        # control / status
+        self.clock_domains.cd_ddram_ref = ClockDomain()
+        self.comb += [
+            self.cd_ddram_ref.clk.eq(self.PLL_REF_CLK),
+            self.cd_ddram_ref.rst.eq(~self.SYS_RESET_N),
+            self.SYS_CLK.eq(self.PLL_REF_CLK)
+        ]
+
+        pll_lock_timer = ClockDomainsRenamer("ddram_ref")(WaitTimer(pll_lock_cycles))
+        init_timer = ClockDomainsRenamer("ddram_ref")(WaitTimer(init_cycles))
+        self.submodules += pll_lock_timer, init_timer
+        self.comb += [
+            pll_lock_timer.wait.eq(1),
+            init_timer.wait.eq(pll_lock_timer.done),
+            self.PLL_LOCK.eq(pll_lock_timer.done),
+            self.CTRLR_READY.eq(init_timer.done)
+        ]
+
+        # memory
+        mem = Memory(dw, depth, init=init)
+        rdport = mem.get_port(async_read=True)
+        wrport = mem.get_port(write_capable=True, we_granularity=8)
+        self.specials += mem, rdport, wrport
+
+        # bank/row tracking (x16 device, row-bank-col mapping)
+        row_shift = col_bits + 1 + bank_bits
+        row_bits = max(32 - row_shift, 1)
+        nbanks = 2**bank_bits
+        bank_open = Array(Signal() for i in range(nbanks))
+        bank_row = Array(Signal(row_bits) for i in range(nbanks))
+
+        # refresh
+        refresh_timer = WaitTimer(trefi)
+        refresh_pending = Signal()
+        refresh_done = Signal()
+        self.submodules += refresh_timer
+        self.comb += refresh_timer.wait.eq(~refresh_timer.done)
+        self.sync += \
+            If(refresh_timer.done,
+                refresh_pending.eq(1)
+            ).Elif(refresh_done,
+                refresh_pending.eq(0)
+            )
+
+        # command arbitration (alternate between writes and reads)
+        cmd = stream.Endpoint(axi_port.aw.description)
+        cmd_write = Signal()
+        last_write = Signal()
+        self.comb += [
+            cmd_write.eq(axi_port.aw.valid & (~axi_port.ar.valid | ~last_write)),
+            If(cmd_write,
+                axi_port.aw.connect(cmd)
+            ).Else(
+                axi_port.ar.connect(cmd)
+            )
+        ]
+
+        cmd_bank = Signal(bank_bits)
+        cmd_row = Signal(row_bits)
+        cmd_latency = Signal(max=max(read_latency, write_latency) + trp + trcd + 1)
+        self.comb += [
+            cmd_bank.eq(cmd.addr[col_bits + 1:row_shift]),
+            cmd_row.eq(cmd.addr[row_shift:]),
+            cmd_latency.eq(Mux(cmd_write, write_latency, read_latency)),
+            If(~bank_open[cmd_bank],
+                cmd_latency.eq(Mux(cmd_write, write_latency, read_latency) + trcd)
+            ).Elif(bank_row[cmd_bank] != cmd_row,
+                cmd_latency.eq(Mux(cmd_write, write_latency, read_latency) + trp + trcd)
+            )
+        ]
+        self.sync += \
+            If(refresh_done,
+                [bank_open[i].eq(0) for i in range(nbanks)]
+            ).Elif(cmd.valid & cmd.ready,
+                bank_open[cmd_bank].eq(1),
+                bank_row[cmd_bank].eq(cmd_row),
+                last_write.eq(cmd_write)
+            )
+
+        # transaction
+        adr = Signal(depth_bits)
+        burst = Signal(2)
+        count = Signal(8)
+        length = Signal(8)
+        id = Signal(len(axi_port.aw.id))
+        timer = Signal(max=max(read_latency, write_latency) + trp + trcd + trfc + 1)
+
+        self.comb += [
+            rdport.adr.eq(adr),
+            wrport.adr.eq(adr),
+            wrport.dat_w.eq(axi_port.w.data),
+            axi_port.r.data.eq(rdport.dat_r),
+            axi_port.r.id.eq(id),
+            axi_port.r.resp.eq(0),
+            axi_port.r.last.eq(count == length),
+            axi_port.b.id.eq(id),
+            axi_port.b.resp.eq(0)
+        ]
+
+        self.submodules.fsm = fsm = FSM(reset_state="IDLE")
+        fsm.act("IDLE",
+            If(refresh_pending,
+                NextValue(timer, trfc - 1),
+                NextState("REFRESH")
+            ).Else(
+                cmd.ready.eq(1),
+                If(cmd.valid,
+                    NextValue(adr, cmd.addr[ashift:]),
+                    NextValue(burst, cmd.burst),
+                    NextValue(count, 0),
+                    NextValue(length, cmd.len),
+                    NextValue(id, cmd.id),
+                    NextValue(timer, cmd_latency),
+                    If(cmd_write,
+                        NextState("WRITE-WAIT")
+                    ).Else(
+                        NextState("READ-WAIT")
+                    )
+                )
+            )
+        )
+        fsm.act("REFRESH",
+            NextValue(timer, timer - 1),
+            If(timer == 0,
+                refresh_done.eq(1),
+                NextState("IDLE")
+            )
+        )
+        fsm.act("WRITE-WAIT",
+            NextValue(timer, timer - 1),
+            If(timer == 0,
+                NextState("WRITE")
+            )
+        )
+        fsm.act("WRITE",
+            axi_port.w.ready.eq(1),
+            If(axi_port.w.valid,
+                wrport.we.eq(axi_port.w.strb),
+                If(burst != 0b00,
+                    NextValue(adr, adr + 1)
+                ),
+                If(axi_port.w.last,
+                    NextState("WRITE-RESP")
+                )
+            )
+        )
+        fsm.act("WRITE-RESP",
+            axi_port.b.valid.eq(1),
+            If(axi_port.b.ready,
+                NextState("IDLE")
+            )
+        )
+        fsm.act("READ-WAIT",
+            NextValue(timer, timer - 1),
+            If(timer == 0,
+                NextState("READ")
+            )
+        )
+        fsm.act("READ",
+            axi_port.r.valid.eq(1),
+            If(axi_port.r.ready,
+                If(burst != 0b00,
+                    NextValue(adr, adr + 1)
+                ),
+                NextValue(count, count + 1),
+                If(axi_port.r.last,
+                    NextState("IDLE")
+                )
+            )
+        )
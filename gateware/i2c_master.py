@@ -0,0 +1,285 @@
+from migen import *
+from migen.genlib.fifo import SyncFIFO
+from migen.genlib.cdc import MultiReg
+
+from litex.soc.interconnect.csr import *
+from litex.soc.interconnect.csr_eventmanager import *
+
+
+# commands (bits 8-10 of cmd, data in bits 0-7)
+I2C_START = 1
+I2C_STOP = 2
+I2C_WRITE = 3
+I2C_READ_ACK = 4
+I2C_READ_NACK = 5
+
+
+class I2CMaster(Module, AutoCSR):
+    """I2C master with command/receive FIFOs
+
+    The CPU queues start/stop/write/read commands (cmd), executed in order
+    while it does something else; read bytes go to the rx FIFO and the done
+    event is raised when the command FIFO is empty and the bus is idle again.
+    A write that is not acknowledged sets nack and the following commands of
+    the transaction (repeated starts included) are dropped up to its stop,
+    nack is cleared by the next start.
+
+    Bits are 5 periods of divider + 1 sys_clk cycles: SCL low for 3 (SDA
+    changed after the first), released for 2, which meets the minimum low
+    and high times of both standard-mode (100kHz, divider =
+    sys_clk/500000 - 1) and fast-mode (400kHz) with margins. A slave holding
+    SCL low (clock stretching) delays the high periods, for at most
+    stretch_timeout sys_clk cycles (0: no limit, default 25ms as the SMBus
+    timeout): then timeout is set, SCL/SDA are released and the commands
+    are dropped until abort. abort stops the engine at once (SCL/SDA
+    released), empties the FIFOs and clears timeout, a read_nack and a stop
+    then let a slave interrupted while sending a byte release SDA. SCL/SDA
+    are open drain: scl_oe/sda_oe pull them low, scl_i/sda_i are the bus
+    levels.
+    """
+    def __init__(self, sys_clk_freq, fifo_depth=32):
+        self.fifo_depth = fifo_depth
+        self.scl_oe = Signal()
+        self.sda_oe = Signal()
+        self.scl_i = Signal(reset=1)
+        self.sda_i = Signal(reset=1)
+
+        self._divider = CSRStorage(16, reset=sys_clk_freq//(5*100000) - 1)
+        self._cmd = CSR(11)
+        self._cmd_level = CSRStatus(bits_for(fifo_depth))
+        self._rx = CSRStatus(8)
+        self._rx_pop = CSR()
+        self._rx_level = CSRStatus(bits_for(fifo_depth))
+        self._nack = CSRStatus()
+        self._busy = CSRStatus()
+        self._stretch_timeout = CSRStorage(32, reset=sys_clk_freq//40)
+        self._timeout = CSRStatus()
+        self._abort = CSR()
+
+        self.submodules.ev = EventManager()
+        self.ev.done = EventSourcePulse()
+        self.ev.finalize()
+
+        # # #
+
+        scl = Signal()
+        sda = Signal()
+        self.specials += [
+            MultiReg(self.scl_i, scl),
+            MultiReg(self.sda_i, sda)
+        ]
+
+        # FIFOs
+        timeout = Signal()
+        timeout_status = Signal()
+        self.submodules.cmd_fifo = cmd_fifo = ResetInserter()(SyncFIFO(11, fifo_depth))
+        self.submodules.rx_fifo = rx_fifo = ResetInserter()(SyncFIFO(8, fifo_depth))
+        self.comb += [
+            cmd_fifo.reset.eq(self._abort.re | timeout | timeout_status),
+            rx_fifo.reset.eq(self._abort.re),
+            cmd_fifo.din.eq(self._cmd.r),
+            cmd_fifo.we.eq(self._cmd.re),
+            self._cmd_level.status.eq(cmd_fifo.level),
+            self._rx.status.eq(rx_fifo.dout),
+            rx_fifo.re.eq(self._rx_pop.re),
+            self._rx_level.status.eq(rx_fifo.level)
+        ]
+        command = cmd_fifo.dout[8:11]
+        data = cmd_fifo.dout[:8]
+
+        # Timings (in periods)
+        period = Signal(16)
+        timer = Signal(19)
+        timer_load = Signal()
+        timer_value = Signal(19)
+        self.comb += period.eq(self._divider.storage + 1)
+        def wait(n):
+            return [timer_load.eq(1), timer_value.eq(n*period - 1)]
+        self.sync += \
+            If(timer_load,
+                timer.eq(timer_value)
+            ).Elif(timer != 0,
+                timer.eq(timer - 1)
+            )
+        ready = Signal()
+        self.comb += ready.eq(timer == 0)
+
+        # Bits (8 data + ack, MSB first)
+        shift = Signal(9)
+        bits = Signal(4)
+        read = Signal()
+        nack = Signal()
+        active = Signal()
+
+        scl_oe = Signal()
+        sda_oe = Signal()
+        self.sync += [
+            self.scl_oe.eq(scl_oe),
+            self.sda_oe.eq(sda_oe)
+        ]
+
+        # abort/timeout: back to IDLE with SCL/SDA released (FSM registers reset)
+        self.submodules.fsm = fsm = ResetInserter()(FSM(reset_state="IDLE"))
+        self.comb += fsm.reset.eq(self._abort.re | timeout)
+        fsm.act("IDLE",
+            If(cmd_fifo.readable,
+                cmd_fifo.re.eq(1),
+                If(command == I2C_STOP,
+                    NextValue(active, 0),
+                    NextValue(sda_oe, 1),
+                    wait(1),
+                    NextState("STOP-SCL")
+                ).Elif(nack & active,
+                    # dropped up to the stop
+                ).Elif(command == I2C_START,
+                    NextValue(nack, 0),
+                    NextValue(active, 1),
+                    NextValue(sda_oe, 0),
+                    wait(1),
+                    NextState("START-SCL")
+                ).Elif(command == I2C_WRITE,
+                    NextValue(shift, Cat(1, data)),
+                    NextValue(bits, 9),
+                    NextValue(read, 0),
+                    NextState("BIT")
+                ).Elif((command == I2C_READ_ACK) | (command == I2C_READ_NACK),
+                    NextValue(shift, Cat(command == I2C_READ_NACK, 0xff)),
+                    NextValue(bits, 9),
+                    NextValue(read, 1),
+                    NextState("BIT")
+                )
+            )
+        )
+        # start (or repeated start): SDA released, SCL released, SDA low, SCL low
+        fsm.act("START-SCL",
+            If(ready,
+                NextValue(scl_oe, 0),
+                NextState("START-WAIT")
+            )
+        )
+        fsm.act("START-WAIT",
+            If(scl,
+                wait(3),
+                NextState("START-SDA")
+            )
+        )
+        fsm.act("START-SDA",
+            If(ready,
+                NextValue(sda_oe, 1),
+                wait(2),
+                NextState("START-END")
+            )
+        )
+        fsm.act("START-END",
+            If(ready,
+                NextValue(scl_oe, 1),
+                wait(1),
+                NextState("END")
+            )
+        )
+        # stop: SDA low, SCL released, SDA released, bus free time
+        fsm.act("STOP-SCL",
+            If(ready,
+                NextValue(scl_oe, 0),
+                NextState("STOP-WAIT")
+            )
+        )
+        fsm.act("STOP-WAIT",
+            If(scl,
+                wait(2),
+                NextState("STOP-SDA")
+            )
+        )
+        fsm.act("STOP-SDA",
+            If(ready,
+                NextValue(sda_oe, 0),
+                wait(3),
+                NextState("END")
+            )
+        )
+        # bit: SCL low for 3 periods, SDA changed after the first, then
+        # released for 2 periods (from the end of the stretching)
+        fsm.act("BIT",
+            NextValue(scl_oe, 1),
+            wait(1),
+            NextState("BIT-SDA")
+        )
+        fsm.act("BIT-SDA",
+            If(ready,
+                NextValue(sda_oe, ~shift[8]),
+                wait(2),
+                NextState("BIT-SCL")
+            )
+        )
+        fsm.act("BIT-SCL",
+            If(ready,
+                NextValue(scl_oe, 0),
+                NextState("BIT-WAIT")
+            )
+        )
+        fsm.act("BIT-WAIT",
+            If(scl,
+                wait(2),
+                NextState("BIT-HIGH")
+            )
+        )
+        fsm.act("BIT-HIGH",
+            If(ready,
+                NextValue(shift, Cat(sda, shift[:8])),
+                NextValue(bits, bits - 1),
+                NextValue(scl_oe, 1),
+                If(bits == 1,
+                    NextState("BYTE")
+                ).Else(
+                    wait(1),
+                    NextState("BIT-SDA")
+                )
+            )
+        )
+        fsm.act("BYTE",
+            If(read,
+                rx_fifo.we.eq(1)
+            ).Elif(shift[0],
+                NextValue(nack, 1)
+            ),
+            NextState("IDLE")
+        )
+        fsm.act("END",
+            If(ready,
+                NextState("IDLE")
+            )
+        )
+        self.comb += rx_fifo.din.eq(shift[1:])
+
+        # Clock stretching timeout
+        stretch = Signal(32)
+        stretching = Signal()
+        self.comb += [
+            stretching.eq(fsm.ongoing("START-WAIT") | fsm.ongoing("STOP-WAIT") | fsm.ongoing("BIT-WAIT")),
+            timeout.eq(stretching & (self._stretch_timeout.storage != 0) &
+                       (stretch == self._stretch_timeout.storage))
+        ]
+        self.sync += [
+            If(stretching,
+                stretch.eq(stretch + 1)
+            ).Else(
+                stretch.eq(0)
+            ),
+            If(self._abort.re,
+                timeout_status.eq(0)
+            ).Elif(timeout,
+                timeout_status.eq(1)
+            )
+        ]
+
+        # Status
+        busy = Signal()
+        busy_d = Signal()
+        self.comb += busy.eq(~fsm.ongoing("IDLE") | cmd_fifo.readable)
+        self.sync += busy_d.eq(busy)
+        self.comb += [
+            self._nack.status.eq(nack),
+            self._timeout.status.eq(timeout_status),
+            self._busy.status.eq(busy),
+            self.ev.done.trigger.eq(busy_d & ~busy)
+        ]
@@ -0,0 +1,135 @@
+from migen import *
+
+
+class I2CModel(Module):
+    """Behavioral I2C slave (simulation)
+
+    A register bank of 256 bytes at address (7-bit), as EEPROMs and most
+    sensors: the first byte written after the address sets the register
+    pointer, the next ones are written from it and reads return the
+    registers from it, auto-incremented. Sampled with sys_clk (the bus
+    changes are slower by far). The slave stretches the clock (holds SCL
+    low) for stretch cycles after each byte. scl/sda are the bus levels,
+    scl_oe/sda_oe pull them low; init is the content of the registers.
+    """
+    def __init__(self, address=0x50, init=[], stretch=0):
+        self.scl = Signal(reset=1)
+        self.sda = Signal(reset=1)
+        self.scl_oe = Signal()
+        self.sda_oe = Signal()
+
+        assert len(init) <= 256
+        mem = Memory(8, 256, init=list(init) + [0]*(256 - len(init)))
+        rd_port = mem.get_port(async_read=True)
+        wr_port = mem.get_port(write_capable=True)
+        self.specials += mem, rd_port, wr_port
+
+        # # #
+
+        scl_d = Signal(reset=1)
+        sda_d = Signal(reset=1)
+        start = Signal()
+        stop = Signal()
+        rising = Signal()
+        falling = Signal()
+        self.sync += [
+            scl_d.eq(self.scl),
+            sda_d.eq(self.sda)
+        ]
+        self.comb += [
+            start.eq(self.scl & scl_d & sda_d & ~self.sda),
+            stop.eq(self.scl & scl_d & ~sda_d & self.sda),
+            rising.eq(self.scl & ~scl_d),
+            falling.eq(~self.scl & scl_d)
+        ]
+
+        # states
+        IDLE, ADDR, WRITE, READ = range(4)
+        state = Signal(2)
+        bits = Signal(4)  # bits of the current byte clocked (9: with the ack)
+        shift = Signal(8)
+        rw = Signal()
+        pointer = Signal(8)
+        first = Signal()
+        nack = Signal()
+        count = Signal(max=max(stretch, 1) + 1)
+
+        self.comb += [
+            rd_port.adr.eq(pointer),
+            wr_port.adr.eq(pointer),
+            wr_port.dat_w.eq(shift)
+        ]
+
+        self.sync += [
+            If(count != 0,
+                count.eq(count - 1),
+                If(count == 1,
+                    self.scl_oe.eq(0)
+                )
+            ),
+            If(start,
+                state.eq(ADDR),
+                bits.eq(0),
+                self.sda_oe.eq(0)
+            ).Elif(stop,
+                state.eq(IDLE),
+                self.sda_oe.eq(0)
+            ).Elif(state != IDLE,
+                If(rising,
+                    If(bits != 9,
+                        bits.eq(bits + 1)
+                    ),
+                    If((state != READ) & (bits < 8),
+                        shift.eq(Cat(self.sda, shift[:7]))
+                    ),
+                    If((state == READ) & (bits == 8),
+                        nack.eq(self.sda)
+                    )
+                ).Elif(falling,
+                    If(bits == 8,
+                        # ack slot
+                        If(state == ADDR,
+                            If(shift[1:] == address,
+                                self.sda_oe.eq(1),
+                                rw.eq(shift[0])
+                            ).Else(
+                                state.eq(IDLE)
+                            )
+                        ).Elif(state == WRITE,
+                            self.sda_oe.eq(1),
+                            first.eq(0),
+                            If(first,
+                                pointer.eq(shift)
+                            ).Else(
+                                pointer.eq(pointer + 1)
+                            )
+                        ).Else(
+                            self.sda_oe.eq(0)
+                        )
+                    ).Elif(bits == 9,
+                        # end of the byte
+                        bits.eq(0),
+                        If(stretch != 0,
+                            self.scl_oe.eq(1),
+                            count.eq(stretch)
+                        ),
+                        self.sda_oe.eq(0),
+                        If(((state == ADDR) & rw) | ((state == READ) & ~nack),
+                            state.eq(READ),
+                            shift.eq(rd_port.dat_r),
+                            self.sda_oe.eq(~rd_port.dat_r[7]),
+                            pointer.eq(pointer + 1)
+                        ).Elif(state == ADDR,
+                            state.eq(WRITE),
+                            first.eq(1)
+                        ).Elif(state == READ,
+                            state.eq(IDLE)
+                        )
+                    ).Elif(state == READ,
+                        shift.eq(shift << 1),
+                        self.sda_oe.eq(~shift[6])
+                    )
+                )
+            )
+        ]
+        self.comb += wr_port.we.eq((state == WRITE) & falling & (bits == 8) & ~first)
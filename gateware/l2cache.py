@@ -0,0 +1,319 @@
+from functools import reduce
+from operator import and_
+
+from migen import *
+
+from litex.soc.interconnect.csr import *
+
+
+class _LRU(Module):
+    """True LRU, one age per way (0: most recently used)"""
+    def __init__(self, ways):
+        ab = log2_int(ways)
+        self.state_bits = ways*ab
+        self.state_init = sum(i << (i*ab) for i in range(ways))
+        self.state = Signal(self.state_bits)
+        self.access = Signal(max=ways)
+        self.next_state = Signal(self.state_bits)
+        self.victim = Signal(max=ways)
+
+        # # #
+
+        ages = [self.state[i*ab:(i+1)*ab] for i in range(ways)]
+        next_ages = [self.next_state[i*ab:(i+1)*ab] for i in range(ways)]
+        access_age = Signal(ab)
+        self.comb += access_age.eq(Array(ages)[self.access])
+        for i in range(ways):
+            self.comb += \
+                If(self.access == i,
+                    next_ages[i].eq(0)
+                ).Elif(ages[i] < access_age,
+                    next_ages[i].eq(ages[i] + 1)
+                ).Else(
+                    next_ages[i].eq(ages[i])
+                )
+        for i in reversed(range(ways)):
+            self.comb += If(ages[i] == (ways - 1), self.victim.eq(i))
+
+
+class _PLRU(Module):
+    """Tree pseudo-LRU, one bit per node (0: victim on the left)"""
+    def __init__(self, ways):
+        levels = log2_int(ways)
+        self.state_bits = ways - 1
+        self.state_init = 0
+        self.state = Signal(self.state_bits)
+        self.access = Signal(max=ways)
+        self.next_state = Signal(self.state_bits)
+        self.victim = Signal(max=ways)
+
+        # # #
+
+        def path(way):
+            node = 1
+            for level in reversed(range(levels)):
+                direction = (way >> level) & 1
+                yield node - 1, direction
+                node = 2*node + direction
+
+        cases = {}
+        for way in range(ways):
+            # the tree points to way: victim
+            self.comb += If(reduce(and_, [self.state[n] == d for n, d in path(way)]),
+                self.victim.eq(way))
+            # point away from the accessed way
+            cases[way] = [self.next_state[n].eq(1 - d) for n, d in path(way)]
+        self.comb += [
+            self.next_state.eq(self.state),
+            Case(self.access, cases)
+        ]
+
+
+class L2Cache(Module, AutoCSR):
+    """Set-associative write-back cache
+
+    Size and line size are in bytes, the slave interface is one line wide
+    (lowest address on the LSBs). Replacement is "lru" or "plru" (tree
+    pseudo-LRU), invalid ways are always filled first.
+
+    The cache is kept compatible with the flush_l2_cache() read loop of the
+    BIOS library (2*L2_SIZE bytes read from main_ram evict every other
+    line) and can also be flushed (written back and invalidated) in hardware
+    through the flush CSR. flush is pulsed when it starts and it also waits
+    for slave_pending (posted writes of the bridge) to clear.
+    """
+    def __init__(self, size, master, slave, ways=1, replacement="lru"):
+        self.master = master
+        self.slave = slave
+        self.flush = Signal()
+        self.slave_pending = Signal()
+
+        self._flush = CSR()
+        self._flushing = CSRStatus()
+        self._reset = CSR()
+        self._hits = CSRStatus(32)
+        self._misses = CSRStatus(32)
+        self._evictions = CSRStatus(32)
+        self._flushes = CSRStatus(32)
+
+        # # #
+
+        dw_from = len(master.dat_r)
+        dw_to = len(slave.dat_r)
+        assert dw_to >= dw_from
+        line_size = dw_to//8
+        sets = size//(line_size*ways)
+        assert sets*line_size*ways == size
+
+        offsetbits = log2_int(dw_to//dw_from)
+        setbits = log2_int(sets)
+        tagbits = len(master.adr) - offsetbits - setbits
+        adr_offset = master.adr[:offsetbits]
+        adr_set = master.adr[offsetbits:offsetbits + setbits]
+        adr_tag = master.adr[offsetbits + setbits:]
+
+        flushing = Signal()
+        flush_pending = Signal()
+        flush_set = Signal(max=max(sets, 2))
+        mem_set = Signal(max=max(sets, 2))
+        self.comb += mem_set.eq(Mux(flushing, flush_set, adr_set))
+
+        # Ways
+        data_ports = []
+        tag_ports = []
+        valids = []
+        dirtys = []
+        tags = []
+        for way in range(ways):
+            data_mem = Memory(dw_to, sets)
+            data_port = data_mem.get_port(write_capable=True, we_granularity=8)
+            tag_mem = Memory(tagbits + 2, sets, init=[0]*sets)
+            tag_port = tag_mem.get_port(write_capable=True)
+            self.specials += data_mem, data_port, tag_mem, tag_port
+            self.comb += [
+                data_port.adr.eq(mem_set),
+                tag_port.adr.eq(mem_set)
+            ]
+            data_ports.append(data_port)
+            tag_ports.append(tag_port)
+            tags.append(tag_port.dat_r[:tagbits])
+            valids.append(tag_port.dat_r[tagbits])
+            dirtys.append(tag_port.dat_r[tagbits + 1])
+
+        hits = Signal(ways)
+        hit_way = Signal(max=max(ways, 2))
+        self.comb += [hits[i].eq(valids[i] & (tags[i] == adr_tag)) for i in range(ways)]
+        for i in reversed(range(ways)):
+            self.comb += If(hits[i], hit_way.eq(i))
+
+        # Replacement
+        victim = Signal(max=max(ways, 2))
+        victim_way = Signal(max=max(ways, 2))
+        update_replacement = Signal()
+        if ways > 1:
+            policy = {"lru": _LRU, "plru": _PLRU}[replacement](ways)
+            self.submodules += policy
+            state_mem = Memory(policy.state_bits, sets, init=[policy.state_init]*sets)
+            state_port = state_mem.get_port(write_capable=True)
+            self.specials += state_mem, state_port
+            self.comb += [
+                state_port.adr.eq(mem_set),
+                policy.state.eq(state_port.dat_r),
+                policy.access.eq(hit_way),
+                state_port.dat_w.eq(policy.next_state),
+                state_port.we.eq(update_replacement),
+                victim.eq(policy.victim)
+            ]
+            for i in reversed(range(ways)):
+                self.comb += If(~valids[i], victim.eq(i))
+
+        # Data / tag writes
+        line_write = Signal()
+        word_write = Signal()
+        tag_write = Signal()
+        tag_write_way = Signal(max=max(ways, 2))
+        tag_dat_w = Signal(tagbits + 2)
+        for way in range(ways):
+            self.comb += [
+                data_ports[way].dat_w.eq(Mux(line_write, slave.dat_r, Replicate(master.dat_w, dw_to//dw_from))),
+                If(line_write & (victim_way == way),
+                    data_ports[way].we.eq(2**(dw_to//8) - 1)
+                ).Elif(word_write & (hit_way == way),
+                    Case(adr_offset, {i: data_ports[way].we[i*dw_from//8:(i+1)*dw_from//8].eq(master.sel)
+                        for i in range(dw_to//dw_from)})
+                ),
+                tag_ports[way].dat_w.eq(tag_dat_w),
+                tag_ports[way].we.eq(tag_write & (tag_write_way == way))
+            ]
+
+        # Master / slave
+        self.comb += [
+            master.dat_r.eq(Array(Array(data_ports[i].dat_r[j*dw_from:(j+1)*dw_from]
+                for j in range(dw_to//dw_from)) for i in range(ways))[hit_way][adr_offset]),
+            slave.dat_w.eq(Array(data_ports[i].dat_r for i in range(ways))[victim_way]),
+            slave.sel.eq(2**(dw_to//8) - 1)
+        ]
+
+        # Counters
+        hit = Signal()
+        miss = Signal()
+        eviction = Signal()
+        flush_done = Signal()
+        counters = [
+            (self._hits, hit),
+            (self._misses, miss),
+            (self._evictions, eviction),
+            (self._flushes, flush_done),
+        ]
+        for csr, event in counters:
+            counter = Signal(32)
+            self.sync += \
+                If(self._reset.re,
+                    counter.eq(0)
+                ).Elif(event,
+                    counter.eq(counter + 1)
+                )
+            self.comb += csr.status.eq(counter)
+        self.comb += [
+            self.flush.eq(self._flush.re),
+            self._flushing.status.eq(flush_pending | self.slave_pending)
+        ]
+        self.sync += \
+            If(self._flush.re,
+                flush_pending.eq(1)
+            ).Elif(flush_done,
+                flush_pending.eq(0)
+            )
+
+        # Control
+        refilled = Signal()
+        flush_way = Signal(max=max(ways, 2))
+        victim_tag = Signal(tagbits)
+        self.comb += victim_tag.eq(Array(tags)[victim_way])
+        self.submodules.fsm = fsm = FSM(reset_state="IDLE")
+        fsm.act("IDLE",
+            If(flush_pending,
+                NextValue(flushing, 1),
+                NextValue(flush_set, 0),
+                NextState("FLUSH-READ")
+            ).Elif(master.cyc & master.stb,
+                NextState("TEST")
+            )
+        )
+        fsm.act("TEST",
+            If(hits != 0,
+                master.ack.eq(1),
+                word_write.eq(master.we),
+                tag_write.eq(master.we),
+                tag_write_way.eq(hit_way),
+                tag_dat_w.eq(Cat(adr_tag, 1, 1)),
+                update_replacement.eq(1),
+                hit.eq(~refilled),
+                NextValue(refilled, 0),
+                NextState("IDLE")
+            ).Else(
+                miss.eq(1),
+                NextValue(victim_way, victim),
+                If(Array(valids)[victim] & Array(dirtys)[victim],
+                    NextState("EVICT")
+                ).Else(
+                    NextState("REFILL")
+                )
+            )
+        )
+        fsm.act("EVICT",
+            slave.cyc.eq(1),
+            slave.stb.eq(1),
+            slave.we.eq(1),
+            slave.adr.eq(Cat(mem_set, victim_tag)),
+            If(slave.ack,
+                eviction.eq(1),
+                If(flushing,
+                    NextState("FLUSH-INVALIDATE")
+                ).Else(
+                    NextState("REFILL")
+                )
+            )
+        )
+        fsm.act("REFILL",
+            slave.cyc.eq(1),
+            slave.stb.eq(1),
+            slave.we.eq(0),
+            slave.adr.eq(Cat(adr_set, adr_tag)),
+            If(slave.ack,
+                line_write.eq(1),
+                tag_write.eq(1),
+                tag_write_way.eq(victim_way),
+                tag_dat_w.eq(Cat(adr_tag, 1, 0)),
+                NextValue(refilled, 1),
+                NextState("IDLE")
+            )
+        )
+        fsm.act("FLUSH-READ",
+            NextValue(flush_way, 0),
+            NextState("FLUSH-TEST")
+        )
+        fsm.act("FLUSH-TEST",
+            NextValue(victim_way, flush_way),
+            If(Array(valids)[flush_way] & Array(dirtys)[flush_way],
+                NextState("EVICT")
+            ).Else(
+                NextState("FLUSH-INVALIDATE")
+            )
+        )
+        fsm.act("FLUSH-INVALIDATE",
+            tag_write.eq(1),
+            tag_write_way.eq(flush_way),
+            tag_dat_w.eq(0),
+            NextValue(flush_way, flush_way + 1),
+            NextState("FLUSH-TEST"),
+            If(flush_way == (ways - 1),
+                NextValue(flush_set, flush_set + 1),
+                NextState("FLUSH-READ"),
+                If(flush_set == (sets - 1),
+                    flush_done.eq(1),
+                    NextValue(flushing, 0),
+                    NextState("IDLE")
+                )
+            )
+        )
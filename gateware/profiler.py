@@ -0,0 +1,140 @@
+from migen import *
+from migen.genlib.fifo import SyncFIFO
+
+from litex.soc.interconnect.csr import *
+from litex.soc.interconnect.csr_eventmanager import *
+
+
+class PCProfiler(Module, AutoCSR):
+    """PC-sampling profiler
+
+    While enabled, the sample event fires every interval sys_clk cycles. The
+    CPU has no PC output: its interrupt handler writes the interrupted PC
+    (mepc) to the pc CSR, that is all the software does. Each sample (PC in
+    the low word, sys_clk cycles since enable in the high word) is then
+    written by the profiler to a ring buffer of length 8-byte entries at base
+    in main_ram, through its own AXI port.
+
+    index is the next entry written, count the number of samples written
+    since enable (the ring holds the last length ones), dropped the samples
+    lost because the writes were late, busy is set until the samples are in
+    main_ram.
+    """
+    def __init__(self, port, fifo_depth=16):
+        self._enable = CSRStorage()
+        self._interval = CSRStorage(32, reset=10000)
+        self._base = CSRStorage(32)
+        self._length = CSRStorage(32)
+        self._pc = CSR(32)
+        self._index = CSRStatus(32)
+        self._count = CSRStatus(32)
+        self._dropped = CSRStatus(32)
+        self._busy = CSRStatus()
+
+        self.submodules.ev = EventManager()
+        self.ev.sample = EventSourcePulse()
+        self.ev.finalize()
+
+        # # #
+
+        assert port.data_width == 64
+        enable = self._enable.storage
+        start = Signal()
+        enable_d = Signal()
+        self.sync += enable_d.eq(enable)
+        self.comb += start.eq(enable & ~enable_d)
+
+        # Sample interval / timestamps
+        timer = Signal(32)
+        cycles = Signal(32)
+        self.sync += [
+            If(start | (timer == 0),
+                timer.eq(self._interval.storage - 1)
+            ).Else(
+                timer.eq(timer - 1)
+            ),
+            If(start,
+                cycles.eq(0)
+            ).Else(
+                cycles.eq(cycles + 1)
+            )
+        ]
+        self.comb += self.ev.sample.trigger.eq(enable & ~start & (timer == 0))
+
+        # Samples
+        self.submodules.fifo = fifo = SyncFIFO(64, fifo_depth)
+        self.comb += [
+            fifo.din.eq(Cat(self._pc.r, cycles)),
+            fifo.we.eq(self._pc.re & enable)
+        ]
+
+        # Ring buffer writes (single beats, one at a time)
+        index = Signal(32)
+        count = Signal(32)
+        dropped = Signal(32)
+        aw_done = Signal()
+        w_done = Signal()
+        b_done = Signal()
+        self.comb += [
+            aw_done.eq(port.aw.valid & port.aw.ready),
+            w_done.eq(port.w.valid & port.w.ready),
+            b_done.eq(port.b.valid & port.b.ready),
+            port.aw.addr.eq(self._base.storage + (index << 3)),
+            port.aw.burst.eq(0b01), # INCR
+            port.aw.len.eq(0),
+            port.aw.size.eq(3),
+            port.aw.id.eq(0),
+            port.w.data.eq(fifo.dout),
+            port.w.strb.eq(0xff),
+            port.w.last.eq(1),
+            fifo.re.eq(w_done)
+        ]
+
+        self.submodules.fsm = fsm = FSM(reset_state="IDLE")
+        fsm.act("IDLE",
+            If(fifo.readable,
+                NextState("AW")
+            )
+        )
+        fsm.act("AW",
+            port.aw.valid.eq(1),
+            If(port.aw.ready,
+                NextState("W")
+            )
+        )
+        fsm.act("W",
+            port.w.valid.eq(1),
+            If(port.w.ready,
+                NextState("B")
+            )
+        )
+        fsm.act("B",
+            port.b.ready.eq(1),
+            If(port.b.valid,
+                NextState("IDLE")
+            )
+        )
+        self.sync += [
+            If(start,
+                index.eq(0),
+                count.eq(0)
+            ).Elif(b_done,
+                If(index == self._length.storage - 1,
+                    index.eq(0)
+                ).Else(
+                    index.eq(index + 1)
+                ),
+                count.eq(count + 1)
+            ),
+            If(start,
+                dropped.eq(0)
+            ).Elif(self._pc.re & enable & ~fifo.writable,
+                dropped.eq(dropped + 1)
+            )
+        ]
+        self.comb += [
+            self._index.status.eq(index),
+            self._count.status.eq(count),
+            self._dropped.status.eq(dropped),
+            self._busy.status.eq(fifo.readable | ~fsm.ongoing("IDLE"))
+        ]
@@ -0,0 +1,326 @@
+from migen import *
+from migen.genlib.fifo import SyncFIFO
+
+from litex.soc.interconnect.csr import *
+from litex.soc.interconnect.csr_eventmanager import *
+
+from gateware.axi_dma import DMAReader, DMAWriter
+
+
+class SPIEngine(Module, AutoCSR):
+    """SPI master with FIFOs and main_ram streaming
+
+    A transfer shifts length bytes (MSB first) with chip select asserted,
+    deasserted for one SPI clock period every frame bytes if frame is not 0
+    (e.g. one ADC conversion per frame). SCLK is sys_clk/(2*(divider + 1)),
+    up to sys_clk/2.
+
+    control bits:
+        0: tx, send the bytes of the TX FIFO (or main_ram), else 0xff
+        1: rx, store the received bytes in the RX FIFO (or main_ram)
+        2: cpol
+        3: cpha
+        4: dma_tx, send from main_ram at tx_addr (with a port, implies tx)
+        5: dma_rx, receive to main_ram at rx_addr (with a port, implies rx)
+
+    The engine waits (SCLK stopped between bytes) when the TX FIFO is empty or
+    the RX FIFO is full, so the CPU can feed/drain them during the transfer.
+    main_ram addresses and length must be multiples of 8 bytes with DMA. The
+    done event is raised at the end of the transfer (after the last write to
+    main_ram), transfers and bytes count the transfers and bytes shifted.
+    """
+    def __init__(self, pads, port=None, fifo_depth=64, max_burst=16):
+        self.fifo_depth = fifo_depth
+
+        self._control = CSRStorage(6)
+        self._divider = CSRStorage(16)
+        self._length = CSRStorage(32)
+        self._frame = CSRStorage(16)
+        self._start = CSR()
+        self._busy = CSRStatus()
+
+        self._tx = CSR(8)
+        self._tx_level = CSRStatus(bits_for(fifo_depth))
+        self._rx = CSRStatus(8)
+        self._rx_pop = CSR()
+        self._rx_level = CSRStatus(bits_for(fifo_depth))
+
+        self._reset = CSR()
+        self._transfers = CSRStatus(32)
+        self._bytes = CSRStatus(32)
+
+        if port is not None:
+            self._tx_addr = CSRStorage(32)
+            self._rx_addr = CSRStorage(32)
+
+        self.submodules.ev = EventManager()
+        self.ev.done = EventSourcePulse()
+        self.ev.finalize()
+
+        # # #
+
+        cpol = self._control.storage[2]
+        cpha = self._control.storage[3]
+        dma_tx = Signal()
+        dma_rx = Signal()
+        tx_enable = Signal()
+        rx_enable = Signal()
+        self.comb += [
+            tx_enable.eq(self._control.storage[0] | dma_tx),
+            rx_enable.eq(self._control.storage[1] | dma_rx)
+        ]
+
+        # Byte streams of the shifter
+        tx_valid = Signal()
+        tx_data = Signal(8)
+        tx_ack = Signal()
+        rx_ready = Signal()
+        rx_data = Signal(8)
+        rx_we = Signal()
+
+        # CPU FIFOs
+        self.submodules.tx_fifo = tx_fifo = SyncFIFO(8, fifo_depth)
+        self.submodules.rx_fifo = rx_fifo = SyncFIFO(8, fifo_depth)
+        self.comb += [
+            tx_fifo.din.eq(self._tx.r),
+            tx_fifo.we.eq(self._tx.re),
+            self._tx_level.status.eq(tx_fifo.level),
+            self._rx.status.eq(rx_fifo.dout),
+            rx_fifo.re.eq(self._rx_pop.re),
+            self._rx_level.status.eq(rx_fifo.level),
+            rx_fifo.din.eq(rx_data)
+        ]
+
+        start = Signal()
+        writer_busy = Signal()
+        if port is not None:
+            self.comb += [
+                dma_tx.eq(self._control.storage[4]),
+                dma_rx.eq(self._control.storage[5])
+            ]
+
+            # main_ram -> bytes (emptied at start, a transfer can leave bytes
+            # of its last beat)
+            rd_fifo = ResetInserter()(SyncFIFO(port.data_width, 2*max_burst))
+            reader = DMAReader(port, rd_fifo, max_burst)
+            rd_byte = Signal(3)
+            rd_bytes = Array(rd_fifo.dout[8*i:8*(i + 1)] for i in range(8))
+            self.submodules += rd_fifo, reader
+            self.comb += [
+                rd_fifo.reset.eq(start),
+                reader.start.eq(start & dma_tx),
+                reader.addr.eq(self._tx_addr.storage),
+                reader.beats.eq(self._length.storage[3:])
+            ]
+            self.sync += \
+                If(start,
+                    rd_byte.eq(0)
+                ).Elif(tx_ack & dma_tx,
+                    rd_byte.eq(rd_byte + 1)
+                )
+
+            # bytes -> main_ram
+            wr_fifo = SyncFIFO(port.data_width, 2*max_burst)
+            writer = DMAWriter(port, wr_fifo, max_burst, max_outstanding=4)
+            wr_byte = Signal(3)
+            wr_word = Signal(64)
+            self.submodules += wr_fifo, writer
+            self.comb += [
+                writer.start.eq(start & dma_rx),
+                writer.addr.eq(self._rx_addr.storage),
+                writer.beats.eq(self._length.storage[3:]),
+                wr_fifo.re.eq(writer.re),
+                wr_fifo.din.eq(Cat(wr_word[8:], rx_data)),
+                wr_fifo.we.eq(rx_we & dma_rx & (wr_byte == 7))
+            ]
+            self.sync += [
+                If(start,
+                    wr_byte.eq(0)
+                ).Elif(rx_we & dma_rx,
+                    wr_word.eq(Cat(wr_word[8:], rx_data)),
+                    wr_byte.eq(wr_byte + 1)
+                ),
+                If(writer.start,
+                    writer_busy.eq(1)
+                ).Elif(writer.done,
+                    writer_busy.eq(0)
+                )
+            ]
+
+            self.comb += [
+                If(dma_tx,
+                    tx_valid.eq(rd_fifo.readable),
+                    tx_data.eq(rd_bytes[rd_byte]),
+                    rd_fifo.re.eq(tx_ack & (rd_byte == 7))
+                ).Else(
+                    tx_valid.eq(tx_fifo.readable),
+                    tx_data.eq(tx_fifo.dout),
+                    tx_fifo.re.eq(tx_ack)
+                ),
+                If(dma_rx,
+                    rx_ready.eq(wr_fifo.level < wr_fifo.depth - 1)
+                ).Else(
+                    rx_ready.eq(rx_fifo.level < fifo_depth - 1),
+                    rx_fifo.we.eq(rx_we)
+                )
+            ]
+        else:
+            self.comb += [
+                tx_valid.eq(tx_fifo.readable),
+                tx_data.eq(tx_fifo.dout),
+                tx_fifo.re.eq(tx_ack),
+                rx_ready.eq(rx_fifo.level < fifo_depth - 1),
+                rx_fifo.we.eq(rx_we)
+            ]
+
+        # SCLK half periods
+        clk_run = Signal()
+        tick = Signal()
+        divider = Signal(16)
+        self.comb += tick.eq(divider == 0)
+        self.sync += \
+            If(~clk_run | tick,
+                divider.eq(self._divider.storage)
+            ).Else(
+                divider.eq(divider - 1)
+            )
+
+        # Shifter (16 half periods per byte, MOSI shifted at the end of the odd
+        # ones, MISO sampled one cycle later to match the registered pads)
+        remaining = Signal(32)
+        frame_count = Signal(16)
+        half = Signal(4)
+        shift_out = Signal(8)
+        shift_in = Signal(8)
+        load = Signal()
+        shifting = Signal()
+        byte_done = Signal()
+        sample = Signal()
+        sample_last = Signal()
+        frame_last = Signal()
+        gap_done = Signal()
+        can_load = Signal()
+        cs = Signal()
+        self.comb += [
+            frame_last.eq((self._frame.storage != 0) & (frame_count == self._frame.storage)),
+            can_load.eq((~tx_enable | tx_valid) & (~rx_enable | rx_ready)),
+            tx_ack.eq(load & tx_enable),
+            byte_done.eq(shifting & tick & (half == 15)),
+            rx_data.eq(Cat(pads.miso, shift_in[:7])),
+            rx_we.eq(sample_last & rx_enable)
+        ]
+        self.sync += [
+            If(load,
+                shift_out.eq(Mux(tx_enable, tx_data, 0xff)),
+                half.eq(0)
+            ).Elif(shifting & tick,
+                half.eq(half + 1),
+                If(half[0],
+                    shift_out.eq(shift_out << 1)
+                )
+            ),
+            sample.eq(shifting & tick & half[0]),
+            sample_last.eq(byte_done),
+            If(sample,
+                shift_in.eq(rx_data)
+            ),
+            If(start,
+                remaining.eq(self._length.storage)
+            ).Elif(load,
+                remaining.eq(remaining - 1)
+            ),
+            If(start | gap_done,
+                frame_count.eq(0)
+            ).Elif(load,
+                frame_count.eq(frame_count + 1)
+            )
+        ]
+
+        self.submodules.fsm = fsm = FSM(reset_state="IDLE")
+        fsm.act("IDLE",
+            If(self._start.re,
+                start.eq(1),
+                NextState("LOAD")
+            )
+        )
+        fsm.act("LOAD",
+            cs.eq(1),
+            If(remaining == 0,
+                NextState("END")
+            ).Elif(frame_last,
+                NextState("GAP")
+            ).Elif(can_load,
+                load.eq(1),
+                NextState("SHIFT")
+            )
+        )
+        fsm.act("SHIFT",
+            cs.eq(1),
+            clk_run.eq(1),
+            shifting.eq(1),
+            If(byte_done,
+                # next byte without idle cycle when possible
+                If((remaining != 0) & ~frame_last & can_load,
+                    load.eq(1)
+                ).Else(
+                    NextState("LOAD")
+                )
+            )
+        )
+        # chip select deasserted for one SPI clock period between frames
+        fsm.act("GAP",
+            clk_run.eq(1),
+            If(tick,
+                NextState("GAP-1")
+            )
+        )
+        fsm.act("GAP-1",
+            clk_run.eq(1),
+            If(tick,
+                gap_done.eq(1),
+                NextState("LOAD")
+            )
+        )
+        # chip select hold, then wait for the last writes to main_ram
+        fsm.act("END",
+            cs.eq(1),
+            clk_run.eq(1),
+            If(tick,
+                NextState("FLUSH")
+            )
+        )
+        fsm.act("FLUSH",
+            If(~writer_busy,
+                self.ev.done.trigger.eq(1),
+                NextState("IDLE")
+            )
+        )
+        self.comb += self._busy.status.eq(~fsm.ongoing("IDLE"))
+
+        # Pads (registered)
+        self.sync += [
+            pads.cs_n.eq(Replicate(~cs, len(pads.cs_n))),
+            pads.clk.eq(Mux(shifting, cpol ^ cpha ^ half[0], cpol)),
+            pads.mosi.eq(shift_out[7])
+        ]
+
+        # Counters
+        transfers = Signal(32)
+        nbytes = Signal(32)
+        self.sync += [
+            If(self._reset.re,
+                transfers.eq(0),
+                nbytes.eq(0)
+            ).Else(
+                If(self.ev.done.trigger,
+                    transfers.eq(transfers + 1)
+                ),
+                If(byte_done,
+                    nbytes.eq(nbytes + 1)
+                )
+            )
+        ]
+        self.comb += [
+            self._transfers.status.eq(transfers),
+            self._bytes.status.eq(nbytes)
+        ]
@@ -0,0 +1,376 @@
+from functools import reduce
+from operator import xor
+
+from migen import *
+from migen.genlib.fifo import SyncFIFO
+
+from litex.soc.interconnect import wishbone
+from litex.soc.interconnect.csr import *
+from litex.soc.interconnect.csr_eventmanager import *
+
+from gateware.axi_dma import DMAWriter
+
+
+_fast_read = 0x0b
+
+
+def crc32_byte(crc, data):
+    """Next CRC-32 (zlib, reflected) register after an 8-bit data"""
+    # XOR equations of the bitwise algorithm, bits as sets of inputs
+    state = [{("crc", i)} | ({("data", i)} if i < 8 else set()) for i in range(32)]
+    for i in range(8):
+        feedback = state[0]
+        state = state[1:] + [set()]
+        for j in range(32):
+            if (0xedb88320 >> j) & 1:
+                state[j] = state[j] ^ feedback
+    inputs = {"crc": crc, "data": data}
+    return Cat(*[reduce(xor, [inputs[name][i] for name, i in sorted(bits)]) for bits in state])
+
+
+class SPIFlash(Module, AutoCSR):
+    """SPI NOR flash controller (execute in place, copy to main_ram)
+
+    The flash is mapped on the Wishbone bus (read only, 24-bit addresses): a
+    miss of the direct mapped read cache (cache_lines lines of line_size
+    bytes) reads the whole line with one fast read command (0x0b, 8 dummy
+    clocks), so sequential reads (BIOS flash boot copy, CPU cache refills of
+    code executed in place) stream from the flash.
+
+    With an AXI port, the copy engine reads length bytes at flash address src
+    with one fast read command and writes them to main_ram at dst in bursts
+    (dst and length multiples of 8 bytes), crc is the CRC-32 (zlib) of the
+    bytes read. The done event is raised after the last write to main_ram.
+
+    While cs is set (user mode), the CPU shifts the bytes of any command with
+    tx/rx (erase, program, status...), the cache and the copy engine wait;
+    the cache is invalidated when cs is released. SCLK is
+    sys_clk/(2*(divider + 1)), mode 0.
+    """
+    def __init__(self, pads, port=None, divider=1, line_size=32, cache_lines=8, max_burst=16):
+        self.bus = bus = wishbone.Interface()
+
+        self._divider = CSRStorage(16, reset=divider)
+        self._cs = CSRStorage()
+        self._tx = CSR(8)
+        self._rx = CSRStatus(8)
+        self._busy = CSRStatus()
+        self._hits = CSRStatus(32)
+        self._misses = CSRStatus(32)
+
+        if port is not None:
+            self._src = CSRStorage(24)
+            self._dst = CSRStorage(32)
+            self._length = CSRStorage(32)
+            self._start = CSR()
+            self._crc = CSRStatus(32)
+
+            self.submodules.ev = EventManager()
+            self.ev.done = EventSourcePulse()
+            self.ev.finalize()
+
+        # # #
+
+        line_words = line_size//4
+        offset_bits = log2_int(line_words)
+        index_bits = log2_int(cache_lines)
+        tag_bits = 22 - offset_bits - index_bits
+        assert cache_lines > 0 and tag_bits > 0
+
+        # Read cache
+        mem = Memory(32, cache_lines*line_words)
+        rd_port = mem.get_port()
+        wr_port = mem.get_port(write_capable=True)
+        self.specials += mem, rd_port, wr_port
+        tags = Array(Signal(tag_bits + 1) for i in range(cache_lines)) # valid, tag
+        bus_offset = bus.adr[:offset_bits]
+        bus_index = bus.adr[offset_bits:offset_bits + index_bits]
+        bus_tag = bus.adr[offset_bits + index_bits:22]
+        hit = Signal()
+        self.comb += [
+            hit.eq(tags[bus_index] == Cat(bus_tag, 1)),
+            rd_port.adr.eq(Cat(bus_offset, bus_index)),
+            bus.dat_r.eq(rd_port.dat_r)
+        ]
+        self.sync += bus.ack.eq(bus.cyc & bus.stb & ~bus.ack & (bus.we | hit))
+
+        # Shifter (same timings as the SPI engine, mode 0)
+        clk_run = Signal()
+        tick = Signal()
+        clk_divider = Signal(16)
+        self.comb += tick.eq(clk_divider == 0)
+        self.sync += \
+            If(~clk_run | tick,
+                clk_divider.eq(self._divider.storage)
+            ).Else(
+                clk_divider.eq(clk_divider - 1)
+            )
+
+        load = Signal()
+        tx_data = Signal(8)
+        half = Signal(4)
+        shift_out = Signal(8)
+        shift_in = Signal(8)
+        shifting = Signal()
+        byte_done = Signal()
+        sample = Signal()
+        sample_last = Signal()
+        rx_data = Signal(8)
+        cs = Signal()
+        self.comb += [
+            byte_done.eq(shifting & tick & (half == 15)),
+            rx_data.eq(Cat(pads.miso, shift_in[:7]))
+        ]
+        self.sync += [
+            If(load,
+                shift_out.eq(tx_data),
+                half.eq(0)
+            ).Elif(shifting & tick,
+                half.eq(half + 1),
+                If(half[0],
+                    shift_out.eq(shift_out << 1)
+                )
+            ),
+            sample.eq(shifting & tick & half[0]),
+            sample_last.eq(byte_done),
+            If(sample,
+                shift_in.eq(rx_data)
+            )
+        ]
+
+        # Read commands: command, address, dummy byte, then the data bytes
+        addr = Signal(24)
+        remaining = Signal(32)
+        command = Signal(max=6)
+        data_byte = Signal()
+        data_byte_d = Signal()
+        data_ready = Signal()
+        to_main_ram = Signal()
+        command_bytes = Array([_fast_read, addr[16:24], addr[8:16], addr[:8], 0])
+        user = Signal()
+        rx_we = Signal()
+        self.comb += [
+            If(user,
+                tx_data.eq(self._tx.r)
+            ).Elif(command != 5,
+                tx_data.eq(command_bytes[command])
+            ).Else(
+                tx_data.eq(0xff)
+            ),
+            rx_we.eq(sample_last & data_byte_d)
+        ]
+        self.sync += [
+            If(load,
+                data_byte.eq((command == 5) & ~user),
+                If(command == 5,
+                    remaining.eq(remaining - 1)
+                ).Else(
+                    command.eq(command + 1)
+                )
+            ),
+            If(byte_done,
+                data_byte_d.eq(data_byte)
+            )
+        ]
+
+        # Cache line fill
+        fill_index = Signal(index_bits)
+        fill_tag = Signal(tag_bits)
+        fill_word = Signal(32)
+        fill_byte = Signal(log2_int(line_size))
+        fill_done = Signal()
+        invalidate = Signal()
+        self.comb += [
+            wr_port.adr.eq(Cat(fill_byte[2:], fill_index)),
+            wr_port.dat_w.eq(Cat(fill_word[8:], rx_data)),
+            wr_port.we.eq(rx_we & ~to_main_ram & (fill_byte[:2] == 3))
+        ]
+        self.sync += [
+            If(rx_we & ~to_main_ram,
+                fill_word.eq(Cat(fill_word[8:], rx_data)),
+                fill_byte.eq(fill_byte + 1)
+            ),
+            If(invalidate,
+                *[tag.eq(0) for tag in tags]
+            ).Elif(fill_done,
+                tags[fill_index].eq(Cat(fill_tag, 1))
+            )
+        ]
+
+        # Copy engine
+        writer_busy = Signal()
+        start = Signal()
+        src = Signal(24)
+        length = Signal(32)
+        if port is not None:
+            assert port.data_width == 64
+            wr_fifo = SyncFIFO(64, 2*max_burst)
+            writer = DMAWriter(port, wr_fifo, max_burst, max_outstanding=4)
+            wr_byte = Signal(3)
+            wr_word = Signal(64)
+            crc = Signal(32)
+            self.submodules += wr_fifo, writer
+            self.comb += [
+                writer.start.eq(start),
+                writer.addr.eq(self._dst.storage),
+                writer.beats.eq(self._length.storage[3:]),
+                wr_fifo.re.eq(writer.re),
+                wr_fifo.din.eq(Cat(wr_word[8:], rx_data)),
+                wr_fifo.we.eq(rx_we & to_main_ram & (wr_byte == 7)),
+                src.eq(self._src.storage),
+                length.eq(self._length.storage),
+                self._crc.status.eq(~crc)
+            ]
+            self.sync += [
+                If(start,
+                    wr_byte.eq(0),
+                    crc.eq(0xffffffff)
+                ).Elif(rx_we & to_main_ram,
+                    wr_word.eq(Cat(wr_word[8:], rx_data)),
+                    wr_byte.eq(wr_byte + 1),
+                    crc.eq(crc32_byte(crc, rx_data))
+                ),
+                If(writer.start,
+                    writer_busy.eq(1)
+                ).Elif(writer.done,
+                    writer_busy.eq(0)
+                )
+            ]
+            self.comb += data_ready.eq(~to_main_ram | (wr_fifo.level < wr_fifo.depth - 1))
+        else:
+            self.comb += data_ready.eq(1)
+
+        # Control
+        self.submodules.fsm = fsm = FSM(reset_state="IDLE")
+        fsm.act("IDLE",
+            If(self._cs.storage,
+                NextState("USER")
+            ).Elif(start,
+                NextValue(to_main_ram, 1),
+                NextValue(addr, src),
+                NextValue(remaining, length),
+                NextValue(command, 0),
+                NextState("LOAD")
+            ).Elif(bus.cyc & bus.stb & ~bus.we & ~hit,
+                NextValue(to_main_ram, 0),
+                NextValue(addr, Cat(Replicate(0, 2 + offset_bits), bus.adr[offset_bits:22])),
+                NextValue(remaining, line_size),
+                NextValue(command, 0),
+                NextValue(fill_index, bus_index),
+                NextValue(fill_tag, bus_tag),
+                NextValue(fill_byte, 0),
+                NextState("LOAD")
+            )
+        )
+        if port is not None:
+            self.comb += start.eq(fsm.ongoing("IDLE") & ~self._cs.storage & self._start.re)
+            done = self.ev.done.trigger.eq(1)
+        else:
+            done = []
+        fsm.act("LOAD",
+            cs.eq(1),
+            If((command == 5) & (remaining == 0),
+                NextState("END")
+            ).Elif((command != 5) | data_ready,
+                load.eq(1),
+                NextState("SHIFT")
+            )
+        )
+        fsm.act("SHIFT",
+            cs.eq(1),
+            clk_run.eq(1),
+            shifting.eq(1),
+            If(byte_done,
+                # next byte without idle cycle when possible
+                If((command != 5) | ((remaining != 0) & data_ready),
+                    load.eq(1)
+                ).Else(
+                    NextState("LOAD")
+                )
+            )
+        )
+        # chip select hold, then deasserted for one SPI clock period
+        fsm.act("END",
+            cs.eq(1),
+            clk_run.eq(1),
+            If(tick,
+                NextState("GAP")
+            )
+        )
+        fsm.act("GAP",
+            clk_run.eq(1),
+            If(tick,
+                NextState("FLUSH")
+            )
+        )
+        # last writes to main_ram/cache
+        fsm.act("FLUSH",
+            If(~writer_busy & ~sample_last,
+                If(to_main_ram,
+                    done
+                ).Else(
+                    fill_done.eq(1)
+                ),
+                NextState("IDLE")
+            )
+        )
+        # user mode: one byte per write of tx
+        fsm.act("USER",
+            cs.eq(1),
+            If(~self._cs.storage,
+                invalidate.eq(1),
+                NextState("USER-END")
+            ).Elif(self._tx.re,
+                load.eq(1),
+                NextState("USER-SHIFT")
+            )
+        )
+        fsm.act("USER-SHIFT",
+            cs.eq(1),
+            clk_run.eq(1),
+            shifting.eq(1),
+            If(byte_done,
+                NextState("USER")
+            )
+        )
+        fsm.act("USER-END",
+            clk_run.eq(1),
+            If(tick,
+                NextState("IDLE")
+            )
+        )
+        self.comb += user.eq(fsm.ongoing("USER"))
+        self.sync += \
+            If(user & sample_last,
+                self._rx.status.eq(rx_data)
+            )
+        self.comb += self._busy.status.eq(~fsm.ongoing("IDLE") & ~fsm.ongoing("USER") | sample_last)
+
+        # Pads (registered)
+        self.sync += [
+            pads.cs_n.eq(~cs),
+            pads.clk.eq(shifting & half[0]),
+            pads.mosi.eq(shift_out[7])
+        ]
+
+        # Counters
+        hits = Signal(32)
+        misses = Signal(32)
+        missed = Signal()
+        self.sync += [
+            If(fill_done,
+                missed.eq(1)
+            ).Elif(bus.ack,
+                missed.eq(0)
+            ),
+            If(bus.ack & ~bus.we & ~missed,
+                hits.eq(hits + 1)
+            ),
+            If(fill_done,
+                misses.eq(misses + 1)
+            )
+        ]
+        self.comb += [
+            self._hits.status.eq(hits),
+            self._misses.status.eq(misses)
+        ]
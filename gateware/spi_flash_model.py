@@ -0,0 +1,143 @@
+from migen import *
+
+
+class SPIFlashModel(Module):
+    """Behavioral SPI NOR flash (simulation)
+
+    Mode 0, sampled with sys_clk (SCLK must be at most sys_clk/2), 24-bit
+    addresses wrapped to size. Supported commands: read (0x03), fast read
+    (0x0b), read status (0x05, WIP/WEL), write enable/disable (0x06/0x04),
+    page program (0x02, wrapping in the 256-byte page) and 4KB sector erase
+    (0x20) and read identification (0x9f). A program keeps WIP set for
+    program_cycles after the chip select is released, an erase for one cycle
+    per byte. init is the content from address 0, the rest is erased (0xff).
+    """
+    def __init__(self, pads, size=0x100000, init=[], program_cycles=64,
+                 identification=[0x20, 0xba, 0x18]):
+        assert len(init) <= size
+        mem = Memory(8, size, init=list(init) + [0xff]*(size - len(init)))
+        rd_port = mem.get_port(async_read=True)
+        wr_port = mem.get_port(write_capable=True)
+        self.specials += mem, rd_port, wr_port
+
+        # # #
+
+        clk_d = Signal()
+        cs_n_d = Signal(reset=1)
+        rising = Signal()
+        falling = Signal()
+        end = Signal()
+        self.sync += [
+            clk_d.eq(pads.clk),
+            cs_n_d.eq(pads.cs_n)
+        ]
+        self.comb += [
+            rising.eq(~pads.cs_n & pads.clk & ~clk_d),
+            falling.eq(~pads.cs_n & ~pads.clk & clk_d),
+            end.eq(pads.cs_n & ~cs_n_d)
+        ]
+
+        command = Signal(8)
+        count = Signal(max=6)  # bytes received, saturated
+        bits = Signal(3)
+        shift_in = Signal(8)
+        shift_out = Signal(8)
+        addr = Signal(24)
+        wel = Signal()
+        busy = Signal(max=max(program_cycles, 4096) + 1)
+        erase_addr = Signal(24)
+        erasing = Signal()
+        status = Signal(8)
+        byte = Signal(8)
+        byte_done = Signal()
+        self.comb += [
+            status.eq(Cat(busy != 0, wel)),
+            byte.eq(Cat(pads.mosi, shift_in[:7])),
+            byte_done.eq(rising & (bits == 7))
+        ]
+
+        # Data out, MSB first on the falling edges
+        data_phase = Signal()
+        identification = Array(Constant(b, 8) for b in identification)
+        self.comb += data_phase.eq(((command == 0x03) & (count >= 4)) |
+                                   ((command == 0x0b) & (count >= 5)))
+        self.sync += [
+            If(falling,
+                If((bits == 0) & data_phase,
+                    pads.miso.eq(rd_port.dat_r[7]),
+                    shift_out.eq(rd_port.dat_r << 1),
+                    addr.eq(addr + 1)
+                ).Elif((bits == 0) & (command == 0x05) & (count >= 1),
+                    pads.miso.eq(status[7]),
+                    shift_out.eq(status << 1)
+                ).Elif((bits == 0) & (command == 0x9f) & (count >= 1) & (count <= len(identification)),
+                    pads.miso.eq(identification[count - 1][7]),
+                    shift_out.eq(identification[count - 1] << 1)
+                ).Else(
+                    pads.miso.eq(shift_out[7]),
+                    shift_out.eq(shift_out << 1)
+                )
+            )
+        ]
+
+        # Commands
+        program = Signal()
+        self.comb += [
+            program.eq(byte_done & (command == 0x02) & (count >= 4) & wel),
+            rd_port.adr.eq(addr),
+            If(erasing,
+                wr_port.adr.eq(erase_addr),
+                wr_port.dat_w.eq(0xff),
+                wr_port.we.eq(1)
+            ).Else(
+                wr_port.adr.eq(addr),
+                wr_port.dat_w.eq(rd_port.dat_r & byte),
+                wr_port.we.eq(program)
+            )
+        ]
+        self.sync += [
+            If(pads.cs_n,
+                bits.eq(0),
+                count.eq(0)
+            ).Elif(rising,
+                bits.eq(bits + 1),
+                shift_in.eq(byte),
+                If(bits == 7,
+                    If(count != 5,
+                        count.eq(count + 1)
+                    ),
+                    If(count == 0,
+                        command.eq(byte)
+                    ).Elif((count <= 3) & (command != 0x05) & (command != 0x9f),
+                        addr.eq(Cat(byte, addr[:16]))
+                    ),
+                    If(program,
+                        addr[:8].eq(addr[:8] + 1)
+                    )
+                )
+            ),
+            If(end,
+                If(command == 0x06,
+                    wel.eq(1)
+                ).Elif(command == 0x04,
+                    wel.eq(0)
+                ).Elif((command == 0x02) & wel & (count >= 4),
+                    wel.eq(0),
+                    busy.eq(program_cycles)
+                ).Elif((command == 0x20) & wel & (count == 4),
+                    wel.eq(0),
+                    erasing.eq(1),
+                    erase_addr.eq(Cat(Replicate(0, 12), addr[12:])),
+                    busy.eq(4096)
+                ),
+                command.eq(0)
+            ).Elif(busy != 0,
+                busy.eq(busy - 1),
+                If(erasing,
+                    erase_addr.eq(erase_addr + 1),
+                    If(busy == 1,
+                        erasing.eq(0)
+                    )
+                )
+            )
+        ]
@@ -0,0 +1,27 @@
+from migen import *
+
+from litex.soc.interconnect import stream
+from litex.soc.interconnect.wishbonebridge import WishboneStreamingBridge
+
+
+class _BufferedPHY(Module):
+    def __init__(self, phy, depth):
+        self.submodules.fifo = fifo = stream.SyncFIFO([("data", 8)], depth)
+        self.comb += phy.source.connect(fifo.sink)
+        self.source = fifo.source
+        self.sink = phy.sink
+
+
+class UARTBridge(WishboneStreamingBridge):
+    """UART Wishbone bridge with a receive FIFO
+
+    Same protocol as the LiteX UART bridge (tools/uart_bridge.py): read/write
+    commands of up to 255 words at incrementing addresses. The RS232 receiver
+    has no flow control, bytes received while the bridge is busy (answering a
+    read) are kept in a FIFO of fifo_depth bytes, so the host can send the
+    next read commands before the data of the previous ones is received.
+    """
+    def __init__(self, phy, clk_freq, fifo_depth=64):
+        self.submodules.phy = phy
+        self.submodules.buffered_phy = _BufferedPHY(phy, fifo_depth)
+        WishboneStreamingBridge.__init__(self, self.buffered_phy, clk_freq)
@@ -0,0 +1,394 @@
+from functools import reduce
+from operator import or_
+
+from migen import *
+
+from litex.soc.interconnect.csr import *
+
+
+def _beat(line, count, beats, width):
+    if beats == 1:
+        return line
+    return Array(line[i*width:(i+1)*width] for i in range(beats))[count[:log2_int(beats)]]
+
+
+class Wishbone2AXIBurst(Module, AutoCSR):
+    """Wishbone to AXI bridge for cache line refills/writebacks
+
+    Each access of the (line wide) Wishbone interface is converted to a single
+    INCR burst of len(wishbone.dat_w)//port.data_width beats, the lowest
+    address being on the LSBs of the line.
+
+    With write_buffer_depth lines, writes are posted: they are acked as soon
+    as they are buffered and written in the background, contiguous buffered
+    lines being merged in a single burst (not crossing 4KB). A read of a line
+    still in the buffer waits for it to be written. Without it (or when
+    disabled) writes are acked after the AXI write response.
+
+    With prefetch_depth lines, a stream buffer holds the lines following the
+    last read miss: the next lines, or the lines at the stride of the last two
+    misses when it is repeated. Reads hitting it are served without an AXI
+    access and replace the line with the next one of the stream. Writes
+    invalidate the matching lines.
+
+    flush (or the prefetch_flush CSR, after main_ram was written by another
+    master) invalidates the prefetched lines, pending is set while posted
+    writes are not completed.
+    """
+    def __init__(self, wishbone, port, write_buffer_depth=0, prefetch_depth=0):
+        wishbone_dw = len(wishbone.dat_w)
+        axi_dw = port.data_width
+        assert wishbone_dw % axi_dw == 0
+        beats = wishbone_dw//axi_dw
+        assert beats <= 256
+        nentries = max(write_buffer_depth, 1)
+        assert nentries & (nentries - 1) == 0
+
+        self.flush = Signal()
+        self.pending = Signal()
+
+        counters = []
+        if write_buffer_depth or prefetch_depth:
+            self._reset = CSR()
+        if write_buffer_depth:
+            self._write_buffer_enable = CSRStorage(reset=1)
+            self._write_posted = CSRStatus(32)
+            self._write_bursts = CSRStatus(32)
+            self._write_merged = CSRStatus(32)
+            self._write_full = CSRStatus(32)
+        if prefetch_depth:
+            self._prefetch_enable = CSRStorage(reset=1)
+            self._prefetch_flush = CSR()
+            self._prefetch_issued = CSRStatus(32)
+            self._prefetch_hits = CSRStatus(32)
+            self._prefetch_late = CSRStatus(32)
+
+        # # #
+
+        ashift = log2_int(wishbone_dw//8)
+        beat_bits = log2_int(beats)
+        adr_bits = len(wishbone.adr)
+        mask = nentries - 1
+
+        # Write buffer (ring of lines, freed on the write response)
+        entry_adr = [Signal(adr_bits) for i in range(nentries)]
+        entry_dat = [Signal(wishbone_dw) for i in range(nentries)]
+        entry_sel = [Signal(wishbone_dw//8) for i in range(nentries)]
+        entry_valid = [Signal() for i in range(nentries)]
+        head = Signal(max(log2_int(nentries), 1))
+        level = Signal(max=nentries + 1)
+        push = Signal()
+        pop = Signal(max=nentries + 1)
+        posted = Signal()
+        if write_buffer_depth:
+            self.comb += posted.eq(self._write_buffer_enable.storage)
+
+        tail = Signal(len(head))
+        self.comb += tail.eq((head + level) & mask)
+        for i in range(nentries):
+            self.comb += entry_valid[i].eq(((i - head) & mask) < level)
+            self.sync += \
+                If(push & (tail == i),
+                    entry_adr[i].eq(wishbone.adr),
+                    entry_dat[i].eq(wishbone.dat_w),
+                    entry_sel[i].eq(wishbone.sel)
+                )
+        self.sync += [
+            head.eq((head + pop) & mask),
+            level.eq(level + push - pop)
+        ]
+        self.comb += self.pending.eq(level != 0)
+
+        def buffered(adr):
+            return reduce(or_, [entry_valid[i] & (entry_adr[i] == adr) for i in range(nentries)])
+
+        # contiguous lines at the head (up to 256 beats, not crossing 4KB)
+        merge = Signal(max=nentries + 1)
+        max_merge = min(nentries, 256//beats)
+        page_bits = max(12 - ashift, 0)
+        contiguous = 1
+        statements = [merge.eq(1)]
+        for i in range(1, max_merge):
+            next_adr = Signal(adr_bits)
+            self.comb += next_adr.eq(Array(entry_adr)[head] + i)
+            contiguous = contiguous & (level > i) & \
+                (Array(entry_adr)[(head + i) & mask] == next_adr) & \
+                (next_adr[:page_bits] != 0)
+            statements.append(If(contiguous, merge.eq(i + 1)))
+        self.comb += statements
+
+        burst = Signal(max=nentries + 1)
+        wcount = Signal(max=max(beats*nentries, 2))
+        wentry = Signal(len(head))
+        self.comb += wentry.eq((head + wcount[beat_bits:]) & mask)
+        self.comb += [
+            port.aw.addr[ashift:].eq(Array(entry_adr)[head]),
+            port.aw.burst.eq(0b01), # INCR
+            port.aw.len.eq((burst << beat_bits) - 1),
+            port.aw.size.eq(log2_int(axi_dw//8)),
+            port.aw.id.eq(0),
+            port.w.data.eq(_beat(Array(entry_dat)[wentry], wcount, beats, axi_dw)),
+            port.w.strb.eq(_beat(Array(entry_sel)[wentry], wcount, beats, axi_dw//8)),
+            port.w.last.eq(wcount == ((burst << beat_bits) - 1))
+        ]
+        self.submodules.write_fsm = write_fsm = FSM(reset_state="IDLE")
+        write_fsm.act("IDLE",
+            NextValue(wcount, 0),
+            If(level != 0,
+                NextValue(burst, merge),
+                NextState("CMD")
+            )
+        )
+        write_fsm.act("CMD",
+            port.aw.valid.eq(1),
+            If(port.aw.ready,
+                NextState("DATA")
+            )
+        )
+        write_fsm.act("DATA",
+            port.w.valid.eq(1),
+            If(port.w.ready,
+                NextValue(wcount, wcount + 1),
+                If(port.w.last,
+                    NextState("RESP")
+                )
+            )
+        )
+        write_fsm.act("RESP",
+            port.b.ready.eq(1),
+            If(port.b.valid,
+                pop.eq(burst),
+                NextState("IDLE")
+            )
+        )
+
+        # Prefetch stream buffer
+        hit = Signal()
+        hit_data = Signal(wishbone_dw)
+        hit_wait = Signal()
+        hit_take = Signal()
+        stream_reset = Signal()
+        write_invalidate = Signal()
+        prefetch = Signal()
+        prefetch_adr = Signal(adr_bits)
+        prefetch_issue = Signal()
+        prefetch_slot = Signal(max=max(prefetch_depth, 2))
+        fill_slot = Signal(max=max(prefetch_depth, 2))
+        fill = Signal()
+        line_data = Signal(wishbone_dw)
+        if prefetch_depth:
+            prefetch_enable = self._prefetch_enable.storage
+
+            stride = Signal(adr_bits)
+            stream_next = Signal(adr_bits)
+            last_miss = Signal(adr_bits)
+            last_delta = Signal(adr_bits)
+            delta = Signal(adr_bits)
+            new_stride = Signal(adr_bits)
+            self.comb += [
+                delta.eq(wishbone.adr - last_miss),
+                If((delta == last_delta) & (delta != 0),
+                    new_stride.eq(delta)
+                ).Else(
+                    new_stride.eq(1)
+                )
+            ]
+            self.sync += \
+                If(stream_reset,
+                    last_miss.eq(wishbone.adr),
+                    last_delta.eq(delta),
+                    stride.eq(new_stride),
+                    stream_next.eq(wishbone.adr + (prefetch_depth + 1)*new_stride)
+                ).Elif(hit_take,
+                    stream_next.eq(stream_next + stride)
+                )
+
+            hits = []
+            waits = []
+            datas = []
+            pendings = []
+            for i in range(prefetch_depth):
+                slot_adr = Signal(adr_bits)
+                slot_dat = Signal(wishbone_dw)
+                slot_valid = Signal()
+                slot_pending = Signal()
+                slot_inflight = Signal()
+                slot_match = Signal()
+                self.comb += slot_match.eq(slot_adr == wishbone.adr)
+                hits.append(slot_valid & slot_match)
+                waits.append((slot_pending | slot_inflight) & slot_match)
+                datas.append(Replicate(slot_valid & slot_match, wishbone_dw) & slot_dat)
+                pendings.append((slot_pending, slot_adr))
+                self.sync += \
+                    If(self.flush | self._prefetch_flush.re | ~prefetch_enable,
+                        slot_valid.eq(0),
+                        slot_pending.eq(0),
+                        slot_inflight.eq(0)
+                    ).Elif(stream_reset,
+                        slot_adr.eq(wishbone.adr + (i + 1)*new_stride),
+                        slot_valid.eq(0),
+                        slot_pending.eq(1),
+                        slot_inflight.eq(0)
+                    ).Elif(write_invalidate & slot_match,
+                        slot_valid.eq(0),
+                        slot_pending.eq(0),
+                        slot_inflight.eq(0)
+                    ).Elif(hit_take & slot_valid & slot_match,
+                        slot_adr.eq(stream_next),
+                        slot_valid.eq(0),
+                        slot_pending.eq(1)
+                    ).Elif(prefetch_issue & (prefetch_slot == i),
+                        slot_pending.eq(0),
+                        slot_inflight.eq(1)
+                    ).Elif(fill & (fill_slot == i) & slot_inflight,
+                        slot_dat.eq(line_data),
+                        slot_inflight.eq(0),
+                        slot_valid.eq(1)
+                    )
+            self.comb += [
+                hit.eq(reduce(or_, hits)),
+                hit_wait.eq(reduce(or_, waits)),
+                hit_data.eq(reduce(or_, datas))
+            ]
+
+            # first pending slot, not issued while its line is in the write buffer
+            statements = []
+            for i, (slot_pending, slot_adr) in reversed(list(enumerate(pendings))):
+                statements = [If(slot_pending,
+                    prefetch.eq(1),
+                    prefetch_adr.eq(slot_adr),
+                    prefetch_slot.eq(i)
+                ).Else(*statements)]
+            self.comb += statements
+
+        # Read engine (one burst in flight, demand reads first)
+        demand = Signal()
+        demand_done = Signal()
+        is_demand = Signal()
+        ar_adr = Signal(adr_bits)
+        count = Signal(max=max(beats, 2))
+        data = Signal(wishbone_dw)
+        self.comb += [
+            port.ar.addr[ashift:].eq(ar_adr),
+            port.ar.burst.eq(0b01), # INCR
+            port.ar.len.eq(beats - 1),
+            port.ar.size.eq(log2_int(axi_dw//8)),
+            port.ar.id.eq(0)
+        ]
+        if beats > 1:
+            self.sync += \
+                If(port.r.valid & port.r.ready,
+                    Case(count, {i: data[i*axi_dw:(i+1)*axi_dw].eq(port.r.data) for i in range(beats - 1)})
+                )
+            self.comb += line_data.eq(Cat(data[:wishbone_dw - axi_dw], port.r.data))
+        else:
+            self.comb += line_data.eq(port.r.data)
+
+        self.submodules.read_fsm = read_fsm = FSM(reset_state="IDLE")
+        read_fsm.act("IDLE",
+            NextValue(count, 0),
+            If(demand & ~buffered(wishbone.adr),
+                stream_reset.eq(1),
+                NextValue(is_demand, 1),
+                NextValue(ar_adr, wishbone.adr),
+                NextState("CMD")
+            ).Elif(prefetch & ~buffered(prefetch_adr),
+                prefetch_issue.eq(1),
+                NextValue(is_demand, 0),
+                NextValue(fill_slot, prefetch_slot),
+                NextValue(ar_adr, prefetch_adr),
+                NextState("CMD")
+            )
+        )
+        read_fsm.act("CMD",
+            port.ar.valid.eq(1),
+            If(port.ar.ready,
+                NextState("DATA")
+            )
+        )
+        read_fsm.act("DATA",
+            port.r.ready.eq(1),
+            If(port.r.valid,
+                NextValue(count, count + 1),
+                If(port.r.last,
+                    demand_done.eq(is_demand),
+                    fill.eq(~is_demand),
+                    NextState("IDLE")
+                )
+            )
+        )
+
+        # Wishbone
+        self.comb += wishbone.dat_r.eq(Mux(hit, hit_data, line_data))
+        full = Signal()
+        self.submodules.fsm = fsm = FSM(reset_state="IDLE")
+        fsm.act("IDLE",
+            If(wishbone.cyc & wishbone.stb,
+                If(wishbone.we,
+                    If(level != nentries,
+                        push.eq(1),
+                        write_invalidate.eq(1),
+                        If(posted,
+                            NextState("WRITE-ACK")
+                        ).Else(
+                            NextState("WRITE-WAIT")
+                        )
+                    ).Else(
+                        full.eq(1)
+                    )
+                ).Else(
+                    NextState("READ")
+                )
+            )
+        )
+        fsm.act("WRITE-ACK",
+            wishbone.ack.eq(1),
+            NextState("IDLE")
+        )
+        fsm.act("WRITE-WAIT",
+            If(level == 0,
+                wishbone.ack.eq(1),
+                NextState("IDLE")
+            )
+        )
+        fsm.act("READ",
+            If(hit,
+                hit_take.eq(1),
+                wishbone.ack.eq(1),
+                NextState("IDLE")
+            ).Elif(~hit_wait,
+                demand.eq(1),
+                If(demand_done,
+                    wishbone.ack.eq(1),
+                    NextState("IDLE")
+                )
+            )
+        )
+
+        # Counters (write_full and prefetch_late count the stalls, not their cycles)
+        def rising(event):
+            event_d = Signal()
+            self.sync += event_d.eq(event)
+            return event & ~event_d
+        if write_buffer_depth:
+            counters += [
+                (self._write_posted, push & posted),
+                (self._write_bursts, port.aw.valid & port.aw.ready),
+                (self._write_merged, Mux(port.aw.valid & port.aw.ready, burst - 1, 0)),
+                (self._write_full, rising(full))
+            ]
+        if prefetch_depth:
+            counters += [
+                (self._prefetch_issued, prefetch_issue),
+                (self._prefetch_hits, hit_take),
+                (self._prefetch_late, rising(fsm.ongoing("READ") & hit_wait & ~hit))
+            ]
+        for csr, increment in counters:
+            counter = Signal(32)
+            self.sync += \
+                If(self._reset.re,
+                    counter.eq(0)
+                ).Elif(increment != 0,
+                    counter.eq(counter + increment)
+                )
+            self.comb += csr.status.eq(counter)
@@ -0,0 +1,472 @@
+#!/usr/bin/env python3
+"""Trace-driven model of the BaseSoC memory path
+
+Replays a trace of CPU accesses through the VexRiscv L1 caches, the L2 cache,
+the Wishbone to AXI bridge (prefetcher, posted writes) and the DDR3 bank/row
+state, and predicts hit rates and the average access latency of many
+configurations in seconds instead of a Libero build and a board run each.
+
+The model is vectorized with numpy: the caches are evaluated from the LRU
+stack distance of each access (distinct lines of the same set used since the
+previous use of the line), computed once per set/line geometry for all the
+associativities. Approximations:
+
+ - L1: 1-way write-through caches without write allocate (VexRiscv), a miss
+   refills the 32-byte line with one L2 access per word.
+ - L2: true LRU (plru is modeled as lru), write allocate, the flushes of the
+   firmware are not modeled and the lines still in the L2 at the end of the
+   trace are not written back.
+ - Prefetcher: a read miss hits the stream buffer when it is within depth
+   lines of the previous read miss at its stride (the delta of the two
+   previous misses when repeated, else 1), prefetches are always on time.
+ - Write buffer: write backs are posted (never full) when it is enabled,
+   else they cost a DDR3 write to a closed row.
+ - DDR3: the row state of each bank is tracked on the refills (address map
+   of the controller), the refresh adds its average stall to each access.
+   Default latencies are the ones of the simulation model (sim.py).
+
+Traces are text files of "<r|w|i> <address>" lines (read, write, instruction
+fetch), .npz files with kind (0: r, 1: w, 2: i) and addr arrays, or synthesized
+from the workloads of the firmware bench command (--synth).
+"""
+
+import sys
+import csv
+import inspect
+import argparse
+import itertools
+
+import numpy as np
+
+from avalanche import BaseSoC, presets
+from components.wrappers import DDR3Controller
+
+
+_main_ram_base = 0x40000000
+_main_ram_size = 0x10000000
+_sdram_test_base = _main_ram_base + 0x01000000 # firmware/sdram.h
+_axi_data_width = 64
+
+# VexRiscv L1 caches (instruction, data) of the CPU variants, 32-byte lines
+_l1_line_size = 32
+_l1_caches = {
+    "min":  (0, 0),
+    "lite": (2048, 2048),
+    "std":  (4096, 4096),
+    "jtag": (4096, 4096),
+    "full": (8192, 8192),
+}
+
+# sys_clk cycles of each step of the path
+_costs = {
+    "l1_hit":        1, # every access
+    "onchip":        2, # per word, rom/sram/scratchpad
+    "l2_hit":        4, # per word, wishbone access hitting the L2
+    "bridge":        4, # per L2 miss, wishbone/AXI conversion and interconnect
+    "prefetch_hit":  2, # per L2 miss served by the stream buffer
+    "posted_write":  1, # per write back with the write buffer
+}
+
+# Swept parameters (BaseSoC arguments), short names for the results
+_parameters = {
+    "cpu_variant":           "cpu",
+    "l2_size":               "l2",
+    "l2_line_size":          "line",
+    "l2_ways":               "ways",
+    "l2_write_buffer_depth": "wb",
+    "l2_prefetch_depth":     "pf",
+    "ddr3_address_map":      "map",
+}
+
+_kinds = {"r": 0, "w": 1, "i": 2}
+
+
+def load_trace(filename):
+    if filename.endswith(".npz"):
+        trace = np.load(filename)
+        return trace["kind"].astype(np.uint8), trace["addr"].astype(np.int64)
+    with open(filename) as f:
+        tokens = f.read().split()
+    kind = np.array([_kinds[k[0].lower()] for k in tokens[0::2]], dtype=np.uint8)
+    addr = np.array([int(a, 0) for a in tokens[1::2]], dtype=np.int64)
+    return kind, addr
+
+
+def synth_trace(workload, size, iterations=4, loads=65536, stride=64):
+    """Data accesses of the firmware bench tests (firmware/bench.c)"""
+    base = _sdram_test_base
+    words = size//4
+    if workload == "seq_read":
+        addr = np.tile(base + 4*np.arange(words), iterations)
+        kind = np.zeros(len(addr), dtype=np.uint8)
+    elif workload == "seq_write":
+        addr = np.tile(base + 4*np.arange(words), iterations)
+        kind = np.ones(len(addr), dtype=np.uint8)
+    elif workload == "seq_copy":
+        offsets = 4*np.arange(words//2)
+        addr = np.tile(np.stack([base + offsets, base + size//2 + offsets], axis=1).ravel(), iterations)
+        kind = np.tile([0, 1], len(addr)//2).astype(np.uint8)
+    elif workload == "stride":
+        addr = base + 4*np.concatenate([np.arange(j, words, stride//4) for j in range(stride//4)])
+        kind = np.zeros(len(addr), dtype=np.uint8)
+    elif workload == "chase":
+        # single random cycle over the stride-spaced elements (Sattolo)
+        n = size//stride
+        rng = np.random.RandomState(1)
+        perm = np.arange(n)
+        for i in range(n - 1, 0, -1):
+            j = rng.randint(i)
+            perm[i], perm[j] = perm[j], perm[i]
+        chain = np.empty(loads, dtype=np.int64)
+        p = 0
+        for i in range(loads):
+            chain[i] = p
+            p = perm[p]
+        addr = base + stride*chain
+        kind = np.zeros(len(addr), dtype=np.uint8)
+    elif workload == "random":
+        rng = np.random.RandomState(1)
+        addr = base + 4*rng.randint(words, size=loads)
+        kind = np.zeros(len(addr), dtype=np.uint8)
+    else:
+        raise ValueError("Unknown workload {}".format(workload))
+    return kind, addr.astype(np.int64)
+
+
+def stack_distances(lines, sets, max_ways):
+    """LRU stack distance of each access, max_ways when above or a cold miss
+
+    A W-way LRU cache of sets sets hits an access if its distance is below W.
+    """
+    n = len(lines)
+    distances = np.full(n, max_ways, dtype=np.int64)
+    if n == 0:
+        return distances
+
+    # accesses grouped by set (in trace order), previous/next use of the line
+    order = np.argsort(lines % sets, kind="stable")
+    s = lines[order]
+    by_line = np.argsort(s, kind="stable")
+    same = s[by_line[1:]] == s[by_line[:-1]]
+    prev = np.full(n, -1, dtype=np.int64)
+    next = np.full(n, n, dtype=np.int64)
+    prev[by_line[1:][same]] = by_line[:-1][same]
+    next[by_line[:-1][same]] = by_line[1:][same]
+
+    # walk back from each access to its previous use, counting the lines not
+    # used again before the access (all the active accesses at once)
+    d = np.full(n, max_ways, dtype=np.int64)
+    active = np.nonzero(prev >= 0)[0]
+    count = np.zeros(len(active), dtype=np.int64)
+    m = 1
+    while len(active) > 64:
+        j = active - m
+        found = j == prev[active]
+        count += ~found & (next[j] > active)
+        d[active[found]] = count[found]
+        keep = ~found & (count < max_ways)
+        active = active[keep]
+        count = count[keep]
+        m += 1
+    # few long walks left (reuse among a few lines)
+    for i in active:
+        d[i] = min(len(np.unique(s[prev[i] + 1:i])), max_ways)
+
+    distances[order] = d
+    return distances
+
+
+def _ddr_fields(address_map):
+    """Bit positions of the bank and row fields in a byte address (x16)"""
+    fields = {"bank": [], "row": []}
+    position = 1
+    for field, width in DDR3Controller.address_maps[address_map]:
+        if field in ("bank", "chip"):
+            fields["bank"].append((position, width))
+        elif field == "row":
+            fields["row"].append((position, width))
+        position += width
+    return fields
+
+
+def _extract(addr, fields):
+    value = np.zeros(len(addr), dtype=np.int64)
+    shift = 0
+    for position, width in fields:
+        value |= ((addr >> position) & (2**width - 1)) << shift
+        shift += width
+    return value
+
+
+class MemoryModel:
+    def __init__(self, kind, addr, sys_clk_freq=100e6, read_latency=8, write_latency=4,
+            trcd=2, trp=2, trefi=780, trfc=26, costs=_costs, l1_caches=_l1_caches):
+        self.kind = kind
+        self.addr = addr
+        self.sys_clk_freq = sys_clk_freq
+        self.read_latency = read_latency
+        self.write_latency = write_latency
+        self.trcd = trcd
+        self.trp = trp
+        self.refresh_stall = trfc/trefi*trfc/2
+        self.costs = costs
+        self.l1_caches = l1_caches
+        self.max_ways = 1
+        self._l1 = {}
+        self._distances = {}
+
+    def _l1_stream(self, cpu_variant):
+        """L1 hits and the word accesses they leave to the bus"""
+        if cpu_variant in self._l1:
+            return self._l1[cpu_variant]
+        if cpu_variant not in self.l1_caches:
+            raise ValueError("Unknown L1 caches of cpu_variant {}".format(cpu_variant))
+        kind, addr = self.kind, self.addr
+        write = kind == _kinds["w"]
+        miss = np.ones(len(kind), dtype=bool)
+        words = np.ones(len(kind), dtype=np.int64)
+        hits = {}
+        for name, k, size in [("l1i", _kinds["i"], self.l1_caches[cpu_variant][0]),
+                              ("l1d", _kinds["r"], self.l1_caches[cpu_variant][1])]:
+            accesses = kind == k
+            if size and accesses.any():
+                d = stack_distances(addr[accesses]//_l1_line_size, size//_l1_line_size, 1)
+                miss[accesses] = d > 0
+                words[accesses] = _l1_line_size//4
+                hits[name] = float(1 - miss[accesses].mean())
+            else:
+                hits[name] = 0.
+        counts = np.where(miss | write, np.where(write, 1, words), 0)
+
+        # bus word accesses, in order
+        index = np.repeat(np.arange(len(kind)), counts)
+        offset = np.arange(len(index)) - np.repeat(np.cumsum(counts) - counts, counts)
+        refill = ~write[index] & (words[index] > 1)
+        bus_addr = np.where(refill, (addr[index] & ~(_l1_line_size - 1)) + 4*offset, addr[index] & ~3)
+        bus_write = write[index]
+        main_ram = (bus_addr >= _main_ram_base) & (bus_addr < _main_ram_base + _main_ram_size)
+        r = {
+            "hits": hits,
+            "onchip": np.count_nonzero(~main_ram),
+            "addr": bus_addr[main_ram],
+            "write": bus_write[main_ram],
+        }
+        self._l1[cpu_variant] = r
+        return r
+
+    def _stack_distances(self, cpu_variant, sets, line_size, ways):
+        """Stack distances of the L2 accesses and of a final access of each
+        line (sorted by line) after the trace, which tells whether its last
+        residency was evicted. The final accesses are appended most recently
+        used line first, so they add no line to the distances of the next
+        ones. Computed once for all the associativities (up to max_ways)."""
+        max_ways = max(self.max_ways, ways)
+        key = (cpu_variant, sets, line_size, max_ways)
+        if key not in self._distances:
+            l1 = self._l1_stream(cpu_variant)
+            lines = l1["addr"]//line_size
+            n = len(lines)
+            unique, last = np.unique(lines[::-1], return_index=True)
+            final = np.argsort(last, kind="stable")
+            d = stack_distances(np.concatenate([lines, unique[final]]), sets, max_ways)
+            final_distances = np.empty(len(unique), dtype=np.int64)
+            final_distances[final] = d[n:]
+            self._distances[key] = d[:n], final_distances
+        return self._distances[key]
+
+    def evaluate(self, cpu_variant="jtag", l2_size=8192, l2_line_size=32, l2_ways=1,
+            l2_write_buffer_depth=0, l2_prefetch_depth=0, ddr3_address_map="row-bank-col", **kwargs):
+        costs = self.costs
+        sets = l2_size//(l2_line_size*l2_ways)
+        if sets < 1 or sets*l2_line_size*l2_ways != l2_size or sets & (sets - 1):
+            raise ValueError("Unsupported L2 geometry {}/{}/{}".format(l2_size, l2_line_size, l2_ways))
+        l1 = self._l1_stream(cpu_variant)
+        n = len(self.kind)
+
+        # L2
+        lines = l1["addr"]//l2_line_size
+        distances, final_distances = self._stack_distances(cpu_variant, sets, l2_line_size, l2_ways)
+        hit = distances < l2_ways
+        nl2 = len(lines)
+
+        # write backs: residencies (miss and the following hits of a line)
+        # with a write, ended by a later miss of the line or evicted by the
+        # end of the trace (final access of the line missing)
+        by_line = np.argsort(lines, kind="stable")
+        line_hit = hit[by_line]
+        residency = np.cumsum(~line_hit) - 1
+        nresidencies = residency[-1] + 1 if nl2 else 0
+        dirty = np.zeros(nresidencies, dtype=bool)
+        dirty[residency[l1["write"][by_line]]] = True
+        evicted = np.zeros(nresidencies, dtype=bool)
+        same_line = lines[by_line][1:] == lines[by_line][:-1]
+        evicted[residency[:-1][same_line & ~line_hit[1:]]] = True
+        last = np.append(~same_line, True) if nl2 else np.zeros(0, dtype=bool)
+        evicted[residency[last]] |= final_distances >= l2_ways
+        writebacks = np.count_nonzero(dirty & evicted)
+
+        # refills and prefetcher
+        refills = lines[~hit]
+        prefetched = np.zeros(len(refills), dtype=bool)
+        if l2_prefetch_depth and len(refills) > 2:
+            delta = np.diff(refills)
+            stride = np.ones(len(refills), dtype=np.int64)
+            repeated = (delta[1:] == delta[:-1]) & (delta[1:] != 0)
+            stride[2:][repeated] = delta[1:][repeated]
+            distance = refills[1:] - refills[:-1]
+            k = distance//stride[:-1]
+            prefetched[1:] = (distance == k*stride[:-1]) & (k >= 1) & (k <= l2_prefetch_depth)
+
+        # DDR3 row state of each bank
+        fields = _ddr_fields(ddr3_address_map)
+        ddr_addr = refills*l2_line_size
+        bank = _extract(ddr_addr, fields["bank"])
+        row = _extract(ddr_addr, fields["row"])
+        by_bank = np.argsort(bank, kind="stable")
+        first = np.ones(len(refills), dtype=bool)
+        first[by_bank[1:]] = bank[by_bank[1:]] != bank[by_bank[:-1]]
+        row_hit = np.zeros(len(refills), dtype=bool)
+        row_hit[by_bank[1:]] = ~first[by_bank[1:]] & (row[by_bank[1:]] == row[by_bank[:-1]])
+        beats = 8*l2_line_size//_axi_data_width
+        read_cycles = self.read_latency + beats + np.where(row_hit, 0,
+            np.where(first, self.trcd, self.trp + self.trcd))
+        if l2_write_buffer_depth:
+            writeback_cycles = costs["posted_write"]
+        else:
+            writeback_cycles = self.write_latency + beats + self.trcd + self.refresh_stall
+
+        # latency
+        demand = ~prefetched
+        cycles = (n*costs["l1_hit"] +
+            l1["onchip"]*costs["onchip"] +
+            nl2*costs["l2_hit"] +
+            len(refills)*costs["bridge"] +
+            read_cycles[demand].sum() + np.count_nonzero(demand)*self.refresh_stall +
+            np.count_nonzero(prefetched)*costs["prefetch_hit"] +
+            writebacks*writeback_cycles)
+        return {
+            "l1i_hit":        l1["hits"]["l1i"],
+            "l1d_hit":        l1["hits"]["l1d"],
+            "l2_accesses":    nl2,
+            "l2_hit":         float(hit.mean()) if nl2 else 0.,
+            "prefetch_hit":   float(prefetched.mean()) if len(refills) else 0.,
+            "row_hit":        float(row_hit.mean()) if len(refills) else 0.,
+            "writebacks":     int(writebacks),
+            "ddr_bytes":      int(len(refills) + writebacks)*l2_line_size,
+            "latency_ns":     float(1e9*cycles/(n*self.sys_clk_freq)) if n else 0.,
+            "time_s":         float(cycles/self.sys_clk_freq),
+        }
+
+
+def _defaults(preset):
+    """BaseSoC defaults of the modeled parameters, overridden by the preset"""
+    signature = inspect.signature(BaseSoC.__init__).parameters
+    r = {k: signature[k].default for k in _parameters.keys() if k in signature}
+    r["cpu_variant"] = "jtag"
+    if preset is not None:
+        r.update({k: v for k, v in presets[preset].items() if k in _parameters})
+    return r
+
+
+def variant_name(variant):
+    return "-".join("{}{}".format(_parameters[k], variant[k]) for k in _parameters.keys())
+
+
+def write_results(results, filename):
+    columns = ["name"] + list(_parameters.keys()) + [c for c in results[0].keys()
+        if c != "name" and c not in _parameters]
+    if filename is not None:
+        with open(filename, "w", newline="") as f:
+            writer = csv.DictWriter(f, columns)
+            writer.writeheader()
+            writer.writerows(results)
+
+    # summary, best latency first
+    summary = ["name", "l1d_hit", "l2_hit", "prefetch_hit", "row_hit", "writebacks", "latency_ns", "time_s"]
+    rows = [[r["name"]] + ["{:.3f}".format(r[c]) if isinstance(r[c], float) else str(r[c]) for c in summary[1:]]
+        for r in sorted(results, key=lambda r: r["latency_ns"])]
+    widths = [max(len(c), *(len(row[i]) for row in rows)) for i, c in enumerate(summary)]
+    print(" ".join(c.ljust(w) for c, w in zip(summary, widths)))
+    for row in rows:
+        print(" ".join(v.ljust(w) for v, w in zip(row, widths)))
+
+
+def int_list(s):
+    return [int(v, 0) if v.lower().startswith("0x") else int(float(v)) for v in s.split(",")]
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Trace-driven model of the Avalanche SoC memory path")
+    parser.add_argument("trace", nargs="?", default=None,
+                        help="trace file (text \"<r|w|i> <address>\" lines or .npz)")
+    parser.add_argument("--synth", default=None, choices=["seq_read", "seq_write", "seq_copy",
+                        "stride", "chase", "random"],
+                        help="synthesize the trace of a firmware bench workload instead")
+    parser.add_argument("--synth-size", default=1024*1024, type=lambda x: int(x, 0),
+                        help="buffer size of the synthesized workload (default=1MB)")
+    parser.add_argument("--preset", default=None, choices=sorted(presets.keys()),
+                        help="named SoC configuration the variants are based on")
+    parser.add_argument("--cpu-variant", default=None, type=lambda s: s.split(","),
+                        help="comma separated VexRiscv variants (L1 caches)")
+    parser.add_argument("--l2-size", default=None, type=int_list,
+                        help="comma separated L2 cache sizes")
+    parser.add_argument("--l2-line-size", default=None, type=int_list,
+                        help="comma separated L2 line sizes")
+    parser.add_argument("--l2-ways", default=None, type=int_list,
+                        help="comma separated L2 associativities")
+    parser.add_argument("--l2-write-buffer-depth", default=None, type=int_list,
+                        help="comma separated L2 posted write buffer depths")
+    parser.add_argument("--l2-prefetch-depth", default=None, type=int_list,
+                        help="comma separated L2 prefetch stream buffer depths")
+    parser.add_argument("--ddr3-address-map", default=None, type=lambda s: s.split(","),
+                        help="comma separated DDR3 controller address maps")
+    parser.add_argument("--ddram-read-latency", default=8, type=int,
+                        help="DDR3 read latency in sys_clk cycles (default=8)")
+    parser.add_argument("--ddram-write-latency", default=4, type=int,
+                        help="DDR3 write latency in sys_clk cycles (default=4)")
+    parser.add_argument("--ddram-trcd", default=2, type=int,
+                        help="DDR3 activate to read/write in sys_clk cycles (default=2)")
+    parser.add_argument("--ddram-trp", default=2, type=int,
+                        help="DDR3 precharge in sys_clk cycles (default=2)")
+    parser.add_argument("--ddram-trefi", default=780, type=int,
+                        help="DDR3 refresh interval in sys_clk cycles (default=780)")
+    parser.add_argument("--ddram-trfc", default=26, type=int,
+                        help="DDR3 refresh duration in sys_clk cycles (default=26)")
+    parser.add_argument("--csv", default=None,
+                        help="write the results of all the variants to a CSV file")
+    args = parser.parse_args()
+
+    if (args.trace is None) == (args.synth is None):
+        parser.error("a trace file or --synth is required")
+    if args.synth is not None:
+        kind, addr = synth_trace(args.synth, args.synth_size)
+    else:
+        kind, addr = load_trace(args.trace)
+
+    defaults = _defaults(args.preset)
+    matrix = {k: getattr(args, k) or [defaults[k]] for k in _parameters.keys()}
+    keys = list(_parameters.keys())
+    variants = [dict(zip(keys, values)) for values in itertools.product(*[matrix[k] for k in keys])]
+    print("Modeling {} accesses, {} variants".format(len(kind), len(variants)), file=sys.stderr)
+
+    model = MemoryModel(kind, addr,
+        read_latency=args.ddram_read_latency,
+        write_latency=args.ddram_write_latency,
+        trcd=args.ddram_trcd,
+        trp=args.ddram_trp,
+        trefi=args.ddram_trefi,
+        trfc=args.ddram_trfc)
+    model.max_ways = max(matrix["l2_ways"])
+    results = []
+    for variant in variants:
+        try:
+            result = model.evaluate(**variant)
+        except ValueError as e:
+            print("{}: {}".format(variant_name(variant), e), file=sys.stderr)
+            continue
+        results.append(dict(variant, name=variant_name(variant), **result))
+    if results:
+        write_results(results, args.csv)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,86 @@
+#!/usr/bin/env python3
+"""Time of the SoC elaboration and gateware project generation
+
+Every build, CI job and sweep variant goes through these steps before the
+toolchain (or a build cache hit): BaseSoC construction (elaboration), Verilog
+conversion with the Libero project script and constraints (generation) and
+the build cache key over the generated files and the platform sources (cold:
+every source hashed, warm: hashes reused from the previous run).
+"""
+
+import os
+import sys
+import time
+import shutil
+import argparse
+import tempfile
+import statistics
+
+from litex.boards.platforms import avalanche as avalanche_platform
+
+from avalanche import BaseSoC, base_soc_args, base_soc_argdict
+from tools.build_cache import BuildCache
+
+
+def _lines(filename):
+    with open(filename, "rb") as f:
+        return sum(1 for line in f)
+
+
+def bench_run(soc_kwargs, build_dir):
+    times = {}
+
+    t = time.perf_counter()
+    platform = avalanche_platform.Platform()
+    soc = BaseSoC(platform, **soc_kwargs)
+    times["elaboration"] = time.perf_counter() - t
+
+    t = time.perf_counter()
+    gateware_dir = os.path.join(build_dir, "gateware")
+    soc.build(build_dir=gateware_dir, run=False)
+    times["generation"] = time.perf_counter() - t
+
+    cache_dir = os.path.join(build_dir, "cache")
+    shutil.rmtree(cache_dir, ignore_errors=True)
+    for phase in ["cache_key_cold", "cache_key_warm"]:
+        t = time.perf_counter()
+        BuildCache(cache_dir).key(platform, gateware_dir)
+        times[phase] = time.perf_counter() - t
+
+    return platform, times
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Elaboration and project generation time of avalanche.py")
+    base_soc_args(parser)
+    parser.add_argument("--runs", default=3, type=int,
+                        help="number of runs, the median is reported (default=3)")
+    parser.add_argument("--max-seconds", default=None, type=float,
+                        help="exit with an error when elaboration + generation take longer (median)")
+    args = parser.parse_args()
+
+    soc_kwargs = base_soc_argdict(args)
+    results = {}
+    build_dir = tempfile.mkdtemp(prefix="setup_bench-")
+    try:
+        for run in range(args.runs):
+            platform, times = bench_run(soc_kwargs, build_dir)
+            for phase, seconds in times.items():
+                results.setdefault(phase, []).append(seconds)
+    finally:
+        shutil.rmtree(build_dir)
+
+    sources = sorted(filename for filename, language, library in platform.sources)
+    print("sources: {} files, {} lines".format(len(sources), sum(_lines(f) for f in sources)))
+    for phase, seconds in results.items():
+        print("SETUP phase={} median={:.3f} min={:.3f} max={:.3f}".format(
+            phase, statistics.median(seconds), min(seconds), max(seconds)))
+
+    total = statistics.median(e + g for e, g in zip(results["elaboration"], results["generation"]))
+    print("SETUP phase=total median={:.3f}".format(total))
+    if args.max_seconds is not None and total > args.max_seconds:
+        print("elaboration + generation over {}s".format(args.max_seconds), file=sys.stderr)
+        sys.exit(1)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,247 @@
+#!/usr/bin/env python3
+
+import argparse
+
+from migen import *
+from migen.genlib.resetsync import AsyncResetSynchronizer
+
+from litex.build.generic_platform import *
+from litex.build.sim import SimPlatform
+from litex.build.sim.config import SimConfig
+
+from litex.soc.integration.soc_core import *
+from litex.soc.integration.builder import *
+from litex.soc.cores import uart
+
+from gateware.ddr3_model import DDR3Model
+from gateware.uart_bridge import UARTBridge
+from gateware.spi_flash_model import SPIFlashModel
+from gateware.i2c_model import I2CModel
+
+from components.wrappers import Monitor
+
+from avalanche import BaseSoC, base_soc_args, base_soc_argdict
+
+
+_io = [
+    ("sys_clk", 0, Pins(1)),
+    ("sys_rst", 0, Pins(1)),
+    ("serial", 0,
+        Subsignal("source_valid", Pins(1)),
+        Subsignal("source_ready", Pins(1)),
+        Subsignal("source_data", Pins(8)),
+
+        Subsignal("sink_valid", Pins(1)),
+        Subsignal("sink_ready", Pins(1)),
+        Subsignal("sink_data", Pins(8)),
+    ),
+    ("user_led", 0, Pins(1)),
+    ("user_led", 1, Pins(1)),
+    ("user_led", 2, Pins(1)),
+    ("mux_sel", 0, Pins(1)),
+    ("mux_sel", 1, Pins(1)),
+    ("mux_sel", 2, Pins(1)),
+    ("pmodspi", 0,
+        Subsignal("cs_n", Pins(1)),
+        Subsignal("clk", Pins(1)),
+        Subsignal("mosi", Pins(1)),
+        Subsignal("miso", Pins(1)),
+    ),
+    ("jtag", 0,
+        Subsignal("tdi", Pins(1)),
+        Subsignal("tms", Pins(1)),
+        Subsignal("tck", Pins(1)),
+        Subsignal("tdo", Pins(1)),
+    ),
+]
+
+
+class Platform(SimPlatform):
+    default_clk_name = "sys_clk"
+    default_clk_period = 1000 # ~ 1MHz
+
+    def __init__(self):
+        SimPlatform.__init__(self, "SIM", _io)
+
+    def do_finalize(self, fragment):
+        pass
+
+
+class _CRG(Module):
+    def __init__(self, platform):
+        self.clock_domains.cd_osc = ClockDomain(reset_less=True)
+        self.clock_domains.cd_ccc = ClockDomain()
+        self.clock_domains.cd_sys = ClockDomain()
+        self.cd_sys_pll_lock = Signal()
+        self.cd_sys_ddram_ready = Signal()
+        self.osc_clk_freq = int(1e9/platform.default_clk_period)
+
+        # # #
+
+        # Simulation clock replaces the RC oscillator + CCC
+        self.comb += [
+            self.cd_osc.clk.eq(platform.request("sys_clk")),
+            self.cd_ccc.clk.eq(self.cd_osc.clk)
+        ]
+        self.specials += AsyncResetSynchronizer(self.cd_ccc, platform.request("sys_rst"))
+
+        # System Clock (from the DDR3 model, as on hardware)
+        self.specials += AsyncResetSynchronizer(self.cd_sys, ~self.cd_sys_pll_lock | ~self.cd_sys_ddram_ready)
+
+        # Boot events (no initialization monitor, done from the start)
+        self.boot_events = [(name.lower(), Constant(1)) for name in Monitor.outputs]
+        self.boot_events += [
+            ("ccc_pll_lock",  ~self.cd_ccc.rst),
+            ("ddr3_pll_lock", self.cd_sys_pll_lock),
+            ("ddr3_ready",    self.cd_sys_ddram_ready),
+        ]
+
+
+class SimSoC(BaseSoC):
+    def __init__(self, ddram_model_args={}, main_ram_init=[], spiflash_model_args={},
+                 i2c_model_args={}, **kwargs):
+        platform = Platform()
+        self.ddram_model_args = ddram_model_args
+        self.main_ram_init = main_ram_init
+        self.spiflash_model_args = spiflash_model_args
+        self.i2c_model_args = i2c_model_args
+        BaseSoC.__init__(self, platform, with_uart=False, **kwargs)
+
+        # serial
+        if not hasattr(self, "uart_bridge"):
+            self.submodules.uart_phy = uart.RS232PHYModel(platform.request("serial"))
+            self.submodules.uart = uart.UART(self.uart_phy)
+
+        # boot preloaded main_ram content directly from the BIOS
+        if main_ram_init:
+            self.add_constant("ROM_BOOT_ADDRESS", self.mem_map["main_ram"])
+
+    def add_crg(self, platform, sys_clk_freq):
+        self.submodules.crg = _CRG(platform)
+
+    def add_uart_bridge(self, platform, baudrate):
+        phy = uart.RS232PHYModel(platform.request("serial"))
+        self.submodules.uart_bridge = UARTBridge(phy, self.clk_freq)
+        self.add_wb_master(self.uart_bridge.wishbone)
+
+    def add_spiflash_pads(self, platform):
+        pads = Record([("cs_n", 1), ("clk", 1), ("mosi", 1), ("miso", 1)])
+        self.submodules.spiflash_model = SPIFlashModel(pads, **self.spiflash_model_args)
+        return pads
+
+    def add_i2c_bus(self, platform, i2c):
+        self.submodules.i2c_model = I2CModel(**self.i2c_model_args)
+        scl = ~(i2c.scl_oe | self.i2c_model.scl_oe)
+        sda = ~(i2c.sda_oe | self.i2c_model.sda_oe)
+        self.comb += [
+            i2c.scl_i.eq(scl),
+            i2c.sda_i.eq(sda),
+            self.i2c_model.scl.eq(scl),
+            self.i2c_model.sda.eq(sda)
+        ]
+
+    def add_ddram(self, platform, axi_port, parameters={}):
+        # core parameters only validated, the model keeps its row-bank-col mapping
+        self.submodules.ddram = DDR3Model(axi_port,
+            init=self.main_ram_init,
+            **self.ddram_model_args)
+        self.comb += [
+            self.ddram.PLL_REF_CLK.eq(self.crg.cd_ccc.clk),
+            self.ddram.SYS_RESET_N.eq(~self.crg.cd_ccc.rst),
+            self.crg.cd_sys.clk.eq(self.ddram.SYS_CLK),
+            self.crg.cd_sys_pll_lock.eq(self.ddram.PLL_LOCK),
+            self.crg.cd_sys_ddram_ready.eq(self.ddram.CTRLR_READY),
+        ]
+        if not self.main_ram_init:
+            self.add_constant("MAIN_RAM_TEST", None)
+
+
+def get_mem_data(filename, data_width=64):
+    data = []
+    with open(filename, "rb") as mem_file:
+        while True:
+            w = mem_file.read(data_width//8)
+            if not w:
+                break
+            w = w + bytes(data_width//8 - len(w))
+            data.append(int.from_bytes(w, "little"))
+    return data
+
+
+def main():
+    parser = argparse.ArgumentParser(description="LiteX SoC simulation of Avalanche")
+    builder_args(parser)
+    base_soc_args(parser)
+    parser.add_argument("--threads", default=1,
+                        help="set number of threads (default=1)")
+    parser.add_argument("--trace", action="store_true",
+                        help="enable VCD tracing")
+    parser.add_argument("--ram-init", default=None,
+                        help="preload main_ram with a binary (e.g. firmware/firmware.bin) and boot it")
+    parser.add_argument("--ddram-size", default=0x2000000, type=lambda x: int(x, 0),
+                        help="size of the simulated DDR3 memory in bytes (default=32MB)")
+    parser.add_argument("--ddram-read-latency", default=8, type=int,
+                        help="row hit read latency in sys_clk cycles (default=8)")
+    parser.add_argument("--ddram-write-latency", default=4, type=int,
+                        help="row hit write latency in sys_clk cycles (default=4)")
+    parser.add_argument("--ddram-trcd", default=2, type=int,
+                        help="activate to read/write delay in sys_clk cycles (default=2)")
+    parser.add_argument("--ddram-trp", default=2, type=int,
+                        help="precharge delay in sys_clk cycles (default=2)")
+    parser.add_argument("--ddram-trefi", default=780, type=int,
+                        help="refresh interval in sys_clk cycles (default=780)")
+    parser.add_argument("--ddram-trfc", default=26, type=int,
+                        help="refresh stall in sys_clk cycles (default=26)")
+    parser.add_argument("--flash-image", default=None,
+                        help="preload the SPI flash with an image (tools/flash_image.py) at the boot offset")
+    parser.add_argument("--flash-size", default=0x100000, type=lambda x: int(x, 0),
+                        help="size of the simulated SPI flash in bytes (default=1MB)")
+    parser.add_argument("--i2c-stretch", default=0, type=int,
+                        help="clock stretching of the simulated I2C device after each byte in sys_clk cycles (default=0)")
+    parser.add_argument("--uart-bridge-port", default=1234, type=int,
+                        help="TCP port of the serial with --with-uart-bridge (default=1234)")
+    args = parser.parse_args()
+
+    ddram_model_args = {
+        "size":          args.ddram_size,
+        "read_latency":  args.ddram_read_latency,
+        "write_latency": args.ddram_write_latency,
+        "trcd":          args.ddram_trcd,
+        "trp":           args.ddram_trp,
+        "trefi":         args.ddram_trefi,
+        "trfc":          args.ddram_trfc,
+    }
+    main_ram_init = []
+    if args.ram_init is not None:
+        main_ram_init = get_mem_data(args.ram_init)
+
+    soc_kwargs = base_soc_argdict(args)
+    flash_init = []
+    if args.flash_image is not None:
+        with open(args.flash_image, "rb") as f:
+            # the model wraps the addresses to its size
+            boot_offset = soc_kwargs.get("spiflash_boot_offset", 0xc00000) % args.flash_size
+            flash_init = [0xff]*boot_offset + list(f.read())
+    spiflash_model_args = {
+        "size": args.flash_size,
+        "init": flash_init,
+    }
+
+    i2c_model_args = {
+        "stretch": args.i2c_stretch,
+    }
+
+    soc = SimSoC(ddram_model_args, main_ram_init, spiflash_model_args, i2c_model_args, **soc_kwargs)
+    sim_config = SimConfig(default_clk="sys_clk")
+    if args.with_uart_bridge:
+        sim_config.add_module("serial2tcp", "serial", args={"port": args.uart_bridge_port})
+    else:
+        sim_config.add_module("serial2console", "serial")
+
+    builder_kwargs = builder_argdict(args)
+    builder_kwargs["output_dir"] = args.output_dir or "build/sim"
+    builder = Builder(soc, **builder_kwargs)
+    builder.build(threads=args.threads, sim_config=sim_config, trace=args.trace)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,190 @@
+#!/usr/bin/env python3
+
+import os
+import re
+import csv
+import json
+import argparse
+import itertools
+import traceback
+from concurrent.futures import ProcessPoolExecutor
+
+from litex.soc.integration.builder import *
+
+from litex.boards.platforms import avalanche as avalanche_platform
+
+from avalanche import BaseSoC, presets, preset_argdict
+from tools.build_cache import BuildCache
+
+# BaseSoC arguments that can be swept, short names for the variant directories
+_parameters = {
+    "l2_size":               "l2",
+    "l2_write_buffer_depth": "wb",
+    "l2_prefetch_depth":     "pf",
+    "ddr3_queue_depth":      "qd",
+    "ddr3_address_map":      "map",
+    "cpu_variant":           "cpu",
+    "integrated_sram_size":  "sram",
+    "sys_clk_freq":          "clk",
+}
+
+_utilization_resources = ["4LUT", "DFF", "uSRAM", "LSRAM", "Math"]
+_bench_columns = [
+    ("seq_read",  "dram", "mbps"),
+    ("seq_write", "dram", "mbps"),
+    ("seq_copy",  "dram", "mbps"),
+    ("dma_copy",  "dram", "mbps"),
+]
+
+
+def variant_name(variant, preset=None):
+    name = [preset or "default"]
+    name += ["{}{}".format(_parameters[k], v) for k, v in sorted(variant.items())]
+    return "-".join(name)
+
+
+def _report_files(build_dir, extensions=(".rpt", ".log")):
+    for root, dirs, files in os.walk(build_dir):
+        for filename in files:
+            if filename.endswith(extensions):
+                yield os.path.join(root, filename)
+
+
+def parse_timing(build_dir):
+    """Worst slack (ns) found in the timing reports"""
+    slacks = []
+    for filename in _report_files(build_dir, (".rpt",)):
+        if "timing" not in os.path.basename(filename).lower():
+            continue
+        with open(filename, errors="replace") as f:
+            for line in f:
+                m = re.match(r"\s*(?:Worst\s+)?Slack\s*(?:\(ns\))?\s*[:=]?\s*(-?\d+\.\d+)", line, re.I)
+                if m:
+                    slacks.append(float(m.group(1)))
+    return min(slacks) if slacks else None
+
+
+def parse_utilization(build_dir):
+    """Used resources from the resource usage tables of the reports"""
+    utilization = {}
+    for filename in _report_files(build_dir):
+        with open(filename, errors="replace") as f:
+            for line in f:
+                m = re.match(r"\s*\|?\s*({})\s*\|\s*(\d+)\s*\|\s*(\d+)".format(
+                    "|".join(_utilization_resources)), line)
+                if m:
+                    utilization[m.group(1)] = int(m.group(2))
+    return utilization
+
+
+def parse_bench(filename):
+    """BENCH lines of the firmware bench command, captured by the user"""
+    results = {}
+    if not os.path.exists(filename):
+        return results
+    with open(filename, errors="replace") as f:
+        for line in f:
+            if not line.startswith("BENCH "):
+                continue
+            fields = dict(kv.split("=", 1) for kv in line.split()[1:] if "=" in kv)
+            for test, mem, metric in _bench_columns:
+                if fields.get("test") == test and fields.get("mem") == mem and metric in fields:
+                    results["{}_{}".format(test, mem)] = fields[metric]
+    return results
+
+
+def build_variant(variant, preset, output_dir, build_cache_dir, compile_gateware):
+    name = variant_name(variant, preset)
+    variant_dir = os.path.join(output_dir, name)
+    result = dict(variant, name=name, preset=preset, status="ok")
+    try:
+        platform = avalanche_platform.Platform()
+        soc = BaseSoC(platform, **preset_argdict(preset, **variant))
+        builder = Builder(soc, output_dir=variant_dir, compile_gateware=False)
+        builder.build()
+        gateware_dir = os.path.join(variant_dir, "gateware")
+        if compile_gateware:
+            build_cache = BuildCache(build_cache_dir)
+            result["cached"] = build_cache.build(platform, gateware_dir)
+            result["slack"] = parse_timing(gateware_dir)
+            result.update(parse_utilization(gateware_dir))
+        result.update(parse_bench(os.path.join(variant_dir, "bench.log")))
+    except Exception as e:
+        traceback.print_exc()
+        result["status"] = "{}: {}".format(type(e).__name__, e)
+    return result
+
+
+def write_results(results, filename):
+    columns = ["name", "status", "preset"] + list(_parameters.keys()) + ["cached", "slack"]
+    columns += _utilization_resources
+    columns += ["{}_{}".format(test, mem) for test, mem, metric in _bench_columns]
+    with open(filename, "w", newline="") as f:
+        writer = csv.DictWriter(f, columns, extrasaction="ignore")
+        writer.writeheader()
+        writer.writerows(results)
+
+    # summary
+    widths = [max(len(c), *(len(str(r.get(c, ""))) for r in results)) for c in columns]
+    print(" ".join(c.ljust(w) for c, w in zip(columns, widths)))
+    for r in results:
+        print(" ".join(str(r.get(c, "")).ljust(w) for c, w in zip(columns, widths)))
+
+
+def int_list(s):
+    return [int(v, 0) if v.lower().startswith("0x") else int(float(v)) for v in s.split(",")]
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Design-space sweep of the Avalanche SoC")
+    parser.add_argument("--preset", default=None, choices=sorted(presets.keys()),
+                        help="named SoC configuration the variants are based on")
+    parser.add_argument("--l2-size", default=None, type=int_list,
+                        help="comma separated L2 cache sizes")
+    parser.add_argument("--l2-write-buffer-depth", default=None, type=int_list,
+                        help="comma separated L2 posted write buffer depths")
+    parser.add_argument("--l2-prefetch-depth", default=None, type=int_list,
+                        help="comma separated L2 prefetch stream buffer depths")
+    parser.add_argument("--ddr3-queue-depth", default=None, type=int_list,
+                        help="comma separated DDR3 controller queue depths")
+    parser.add_argument("--ddr3-address-map", default=None, type=lambda s: s.split(","),
+                        help="comma separated DDR3 controller address maps")
+    parser.add_argument("--cpu-variant", default=None, type=lambda s: s.split(","),
+                        help="comma separated VexRiscv variants")
+    parser.add_argument("--integrated-sram-size", default=None, type=int_list,
+                        help="comma separated integrated SRAM sizes")
+    parser.add_argument("--sys-clk-freq", default=None, type=int_list,
+                        help="comma separated sys_clk frequencies")
+    parser.add_argument("--matrix", default=None,
+                        help="JSON file with the parameter lists, overrides the options above")
+    parser.add_argument("--jobs", default=os.cpu_count(), type=int,
+                        help="number of variants built concurrently (default=number of CPUs)")
+    parser.add_argument("--output-dir", default="build/sweep",
+                        help="sweep output directory, one subdirectory per variant (default=build/sweep)")
+    parser.add_argument("--build-cache", default="build/cache",
+                        help="bitstream cache directory shared by the variants (default=build/cache)")
+    parser.add_argument("--no-compile-gateware", action="store_true",
+                        help="only generate the variants")
+    args = parser.parse_args()
+
+    matrix = {k: getattr(args, k) for k in _parameters.keys() if getattr(args, k) is not None}
+    if args.matrix is not None:
+        with open(args.matrix) as f:
+            matrix.update(json.load(f))
+    for k in matrix.keys():
+        if k not in _parameters:
+            raise ValueError("Unknown sweep parameter {}".format(k))
+    keys = sorted(matrix.keys())
+    variants = [dict(zip(keys, values)) for values in itertools.product(*[matrix[k] for k in keys])]
+    print("Building {} variants with {} jobs".format(len(variants), args.jobs))
+
+    os.makedirs(args.output_dir, exist_ok=True)
+    with ProcessPoolExecutor(max_workers=args.jobs) as executor:
+        futures = [executor.submit(build_variant, variant, args.preset,
+            args.output_dir, args.build_cache, not args.no_compile_gateware) for variant in variants]
+        results = [future.result() for future in futures]
+
+    write_results(results, os.path.join(args.output_dir, "results.csv"))
+
+if __name__ == "__main__":
+    main()
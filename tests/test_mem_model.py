@@ -0,0 +1,52 @@
+import unittest
+
+import numpy as np
+
+from mem_model import MemoryModel, synth_trace, _main_ram_base
+
+
+def writebacks_lru(kind, addr, sets, ways, line_size):
+    """Write backs of a per-set write-back LRU cache (reference)"""
+    cache = [[] for i in range(sets)] # [line, dirty], LRU first
+    writebacks = 0
+    for k, a in zip(kind, addr):
+        line = a//line_size
+        lru = cache[line % sets]
+        for entry in lru:
+            if entry[0] == line:
+                lru.remove(entry)
+                break
+        else:
+            entry = [line, False]
+            if len(lru) == ways:
+                writebacks += lru.pop(0)[1]
+        entry[1] |= bool(k == 1)
+        lru.append(entry)
+    return writebacks
+
+
+class TestMemoryModel(unittest.TestCase):
+    def test_writebacks_random(self):
+        rng = np.random.RandomState(0)
+        for trial in range(100):
+            n = rng.randint(1, 400)
+            kind = rng.randint(2, size=n).astype(np.uint8)
+            addr = _main_ram_base + 4*rng.randint(rng.randint(1, 512), size=n).astype(np.int64)
+            model = MemoryModel(kind, addr)
+            model.max_ways = 4
+            for ways in [1, 2, 4]:
+                for l2_size in [256, 1024]:
+                    r = model.evaluate(cpu_variant="min", l2_size=l2_size, l2_line_size=32, l2_ways=ways)
+                    self.assertEqual(r["writebacks"],
+                        writebacks_lru(kind, addr, l2_size//(32*ways), ways, 32), (trial, ways, l2_size))
+
+    def test_writebacks_seq_write(self):
+        for iterations in [1, 4]:
+            kind, addr = synth_trace("seq_write", 1024*1024, iterations=iterations)
+            r = MemoryModel(kind, addr).evaluate(cpu_variant="min", l2_size=8192, l2_line_size=32, l2_ways=1)
+            lines = 1024*1024//32
+            self.assertEqual(r["writebacks"], iterations*lines - 8192//32)
+
+
+if __name__ == "__main__":
+    unittest.main()
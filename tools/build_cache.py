@@ -0,0 +1,165 @@
+"""Content-addressed cache of the Libero bitstream and reports
+
+The key hashes everything the vendor flow consumes: the generated Verilog,
+memory initialization files, project script and constraints, the contents of
+the platform sources (the DDR3 controller and other wrapped IP) and the
+identity of the toolchain. On a hit the cached outputs are restored in the
+gateware directory instead of running Libero. The hashes of the platform
+sources are kept in <cache>/sources.json and only computed again for the
+files that changed.
+"""
+
+import os
+import sys
+import json
+import glob
+import shutil
+import fnmatch
+import hashlib
+import tempfile
+import subprocess
+
+from components.sources import HashCache
+
+
+_generated_files = [
+    "{}.v",
+    "{}.tcl",
+    "{}.sdc",
+    "{}_io.pdc",
+    "{}_fp.pdc",
+    "build_{}.sh",
+    "build_{}.bat",
+]
+
+_output_patterns = [
+    "*.stp",
+    "*.job",
+    "*.spi",
+    "*.dat",
+    "*.ppd",
+    "*.rpt",
+]
+
+
+def _hash_file(h, filename):
+    with open(filename, "rb") as f:
+        for chunk in iter(lambda: f.read(1 << 20), b""):
+            h.update(chunk)
+
+
+def _script_name(build_name):
+    return "build_" + build_name + (".bat" if sys.platform == "win32" else ".sh")
+
+
+def toolchain_identity(toolchain_path=None):
+    """Path, size and modification time of the libero executable"""
+    if toolchain_path is not None:
+        libero = os.path.join(toolchain_path, "bin", "libero")
+        if not os.path.exists(libero):
+            libero = os.path.join(toolchain_path, "libero")
+    else:
+        libero = shutil.which("libero")
+    if libero is None or not os.path.exists(libero):
+        return "none"
+    libero = os.path.realpath(libero)
+    st = os.stat(libero)
+    return "{}:{}:{}".format(libero, st.st_size, int(st.st_mtime))
+
+
+class BuildCache:
+    def __init__(self, cache_dir, output_patterns=_output_patterns):
+        self.cache_dir = cache_dir
+        self.output_patterns = output_patterns
+        self.source_hashes = HashCache(os.path.join(cache_dir, "sources.json"))
+
+    def key(self, platform, build_dir, build_name="top", toolchain_path=None):
+        h = hashlib.sha256()
+
+        # generated gateware, project and constraints
+        generated = [pattern.format(build_name) for pattern in _generated_files]
+        generated += sorted(os.path.basename(f) for f in glob.glob(os.path.join(build_dir, "*.init")))
+        for filename in generated:
+            path = os.path.join(build_dir, filename)
+            if os.path.isfile(path):
+                h.update(filename.encode())
+                _hash_file(h, path)
+
+        # platform sources
+        for filename, language, library in sorted(platform.sources):
+            h.update("{}:{}:{}:{}".format(os.path.basename(filename), language, library,
+                self.source_hashes.hash(filename)).encode())
+        self.source_hashes.save()
+
+        # toolchain
+        h.update(toolchain_identity(toolchain_path).encode())
+
+        return h.hexdigest()
+
+    def _outputs(self, build_dir, since):
+        outputs = []
+        for root, dirs, files in os.walk(build_dir):
+            for filename in files:
+                path = os.path.join(root, filename)
+                if not any(fnmatch.fnmatch(filename, p) for p in self.output_patterns):
+                    continue
+                if os.path.getmtime(path) < since:
+                    continue
+                outputs.append(os.path.relpath(path, build_dir))
+        return sorted(outputs)
+
+    def restore(self, key, build_dir):
+        entry = os.path.join(self.cache_dir, key)
+        manifest = os.path.join(entry, "manifest.json")
+        if not os.path.exists(manifest):
+            return False
+        with open(manifest) as f:
+            outputs = json.load(f)["outputs"]
+        for output in outputs:
+            dst = os.path.join(build_dir, output)
+            os.makedirs(os.path.dirname(dst), exist_ok=True)
+            shutil.copy2(os.path.join(entry, "files", output), dst)
+        return True
+
+    def store(self, key, build_dir, outputs):
+        os.makedirs(self.cache_dir, exist_ok=True)
+        entry = os.path.join(self.cache_dir, key)
+        # populate a temporary entry then rename it, concurrent builds of the
+        # same key simply keep the first one
+        tmp = tempfile.mkdtemp(dir=self.cache_dir, prefix=".tmp-")
+        for output in outputs:
+            dst = os.path.join(tmp, "files", output)
+            os.makedirs(os.path.dirname(dst), exist_ok=True)
+            shutil.copy2(os.path.join(build_dir, output), dst)
+        with open(os.path.join(tmp, "manifest.json"), "w") as f:
+            json.dump({"outputs": outputs}, f, indent=1)
+        try:
+            os.rename(tmp, entry)
+        except OSError:
+            shutil.rmtree(tmp)
+
+    def build(self, platform, build_dir, build_name="top", toolchain_path=None):
+        """Restores or runs the generated toolchain script, returns True on a hit
+
+        The gateware files must have been generated beforehand (platform
+        build with run=False).
+        """
+        key = self.key(platform, build_dir, build_name, toolchain_path)
+        if self.restore(key, build_dir):
+            print("Build cache hit ({}), skipping toolchain".format(key[:16]))
+            return True
+
+        print("Build cache miss ({}), running toolchain".format(key[:16]))
+        since = os.path.getmtime(os.path.join(build_dir, build_name + ".v"))
+        script = _script_name(build_name)
+        if sys.platform == "win32":
+            shell = ["cmd", "/c"]
+        else:
+            shell = ["bash"]
+        if subprocess.call(shell + [script], cwd=build_dir) != 0:
+            raise OSError("Subprocess failed")
+
+        outputs = self._outputs(build_dir, since)
+        if outputs:
+            self.store(key, build_dir, outputs)
+        return False
@@ -0,0 +1,47 @@
+#!/usr/bin/env python3
+"""SPI flash boot image for the BIOS
+
+At startup (after the serial boot timeout) the BIOS reads the length and the
+CRC-32 of the image at FLASH_BOOT_ADDRESS (SPI flash at --spiflash-boot-offset,
+little-endian words), copies the image that follows to main_ram, checks the
+CRC and jumps to it.
+"""
+
+import sys
+import zlib
+import struct
+import argparse
+
+
+# limits of the BIOS flash boot
+_min_length = 32
+_max_length = 4*1024*1024
+
+
+def flash_image(data):
+    if not _min_length <= len(data) <= _max_length:
+        raise ValueError("Unsupported image length {}, must be {} to {} bytes".format(
+            len(data), _min_length, _max_length))
+    return struct.pack("<II", len(data), zlib.crc32(data)) + data
+
+
+def main():
+    parser = argparse.ArgumentParser(description="SPI flash boot image for the BIOS")
+    parser.add_argument("binary", help="firmware binary (e.g. firmware/firmware.bin)")
+    parser.add_argument("image", help="output image, to write at the boot offset of the flash")
+    args = parser.parse_args()
+
+    with open(args.binary, "rb") as f:
+        data = f.read()
+    try:
+        image = flash_image(data)
+    except ValueError as e:
+        print(e, file=sys.stderr)
+        sys.exit(1)
+    with open(args.image, "wb") as f:
+        f.write(image)
+    print("{}: {} bytes, crc {:08x}".format(args.image, len(data), zlib.crc32(data)), file=sys.stderr)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,140 @@
+#!/usr/bin/env python3
+"""Flat profile of the firmware from the PC samples of the profiler
+
+The samples are either the PROFILE lines printed by the firmware (profile,
+then profile_dump, in a console log) or the raw ring buffer read from
+main_ram (8-byte entries, PC then cycles, little-endian, unused entries are
+zero as profiler_start() clears the ring), e.g. with tools/uart_bridge.py.
+Each PC is attributed to the function of firmware.elf containing it, to the
+closest preceding symbol otherwise (assembly labels of crt0).
+"""
+
+import sys
+import struct
+import bisect
+import argparse
+from collections import Counter
+
+
+_sht_symtab = 2
+_stt_notype = 0
+_stt_func = 2
+_shn_abs = 0xfff1
+
+
+def read_symbols(filename):
+    """(address, size, name) of the named symbols of a 32-bit little-endian
+    ELF, functions first"""
+    with open(filename, "rb") as f:
+        elf = f.read()
+    if elf[:4] != b"\x7fELF" or elf[4] != 1 or elf[5] != 1:
+        raise ValueError("{}: not a 32-bit little-endian ELF".format(filename))
+    shoff, = struct.unpack_from("<I", elf, 0x20)
+    shentsize, shnum = struct.unpack_from("<HH", elf, 0x2e)
+    sections = [struct.unpack_from("<IIIIIIIIII", elf, shoff + i*shentsize) for i in range(shnum)]
+
+    functions = []
+    labels = []
+    for name, sh_type, flags, addr, offset, size, link, info, align, entsize in sections:
+        if sh_type != _sht_symtab:
+            continue
+        strtab_offset = sections[link][4]
+        for i in range(size//entsize):
+            st_name, st_value, st_size, st_info, st_other, st_shndx = \
+                struct.unpack_from("<IIIBBH", elf, offset + i*entsize)
+            if st_name == 0 or st_shndx in (0, _shn_abs):
+                continue
+            end = elf.index(b"\0", strtab_offset + st_name)
+            symbol = (st_value, st_size, elf[strtab_offset + st_name:end].decode())
+            if st_info & 0xf == _stt_func:
+                functions.append(symbol)
+            elif st_info & 0xf == _stt_notype and not symbol[2].startswith("$"):
+                labels.append(symbol)
+    return functions, labels
+
+
+class Symbolizer:
+    def __init__(self, functions, labels):
+        self.functions = sorted(functions)
+        self.function_addrs = [s[0] for s in self.functions]
+        self.labels = sorted(self.functions + labels)
+        self.label_addrs = [s[0] for s in self.labels]
+
+    def __call__(self, pc):
+        i = bisect.bisect_right(self.function_addrs, pc) - 1
+        if i >= 0:
+            addr, size, name = self.functions[i]
+            if pc < addr + size:
+                return name
+        i = bisect.bisect_right(self.label_addrs, pc) - 1
+        if i >= 0:
+            return self.labels[i][2] + "+0x{:x}".format(pc - self.labels[i][0])
+        return "0x{:08x}".format(pc)
+
+
+def read_log(f):
+    """PC samples and header (interval, sys_clk, ...) of a console log"""
+    pcs = []
+    header = {}
+    for line in f:
+        line = line.strip()
+        i = line.find("PROFILE ")
+        if i < 0:
+            continue
+        fields = line[i:].split()[1:]
+        if fields and "=" in fields[0]:
+            header = {k: int(v) for k, v in (field.split("=", 1) for field in fields)}
+        elif fields:
+            pcs.append(int(fields[0], 16))
+    return pcs, header
+
+
+def read_raw(f):
+    data = f.read()
+    data = data[:len(data) - len(data) % 8]
+    return [pc for pc, cycles in struct.iter_unpack("<II", data) if pc or cycles], {}
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Flat profile of the firmware from the PC samples")
+    parser.add_argument("elf", help="firmware.elf")
+    parser.add_argument("samples", nargs="?", default="-",
+                        help="console log with the PROFILE lines or raw ring buffer (default=stdin)")
+    parser.add_argument("--raw", action="store_true",
+                        help="samples is a binary dump of the ring buffer")
+    parser.add_argument("--addresses", default=0, type=int,
+                        help="also list the N most sampled addresses")
+    parser.add_argument("--top", default=0, type=int,
+                        help="only list the N most sampled functions")
+    args = parser.parse_args()
+
+    symbolize = Symbolizer(*read_symbols(args.elf))
+    if args.samples == "-":
+        f = sys.stdin.buffer if args.raw else sys.stdin
+    else:
+        f = open(args.samples, "rb" if args.raw else "r")
+    with f:
+        pcs, header = (read_raw if args.raw else read_log)(f)
+    if not pcs:
+        print("no samples", file=sys.stderr)
+        sys.exit(1)
+
+    if header:
+        print("{} samples every {} cycles ({:.1f} us), {} written, {} dropped".format(
+            len(pcs), header["interval"], 1e6*header["interval"]/header["sys_clk"],
+            header["samples"], header["dropped"]))
+    functions = Counter(symbolize(pc) for pc in pcs)
+    cumulative = 0
+    print("{:>8} {:>7} {:>7}  {}".format("samples", "%", "cum %", "function"))
+    for name, n in functions.most_common(args.top or None):
+        cumulative += n
+        print("{:8d} {:7.2f} {:7.2f}  {}".format(n, 100*n/len(pcs), 100*cumulative/len(pcs), name))
+    if args.addresses:
+        print()
+        print("{:>8} {:>7}  {}".format("samples", "%", "address"))
+        for pc, n in Counter(pcs).most_common(args.addresses):
+            print("{:8d} {:7.2f}  0x{:08x} {}".format(n, 100*n/len(pcs), pc, symbolize(pc)))
+
+
+if __name__ == "__main__":
+    main()
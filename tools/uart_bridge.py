@@ -0,0 +1,184 @@
+#!/usr/bin/env python3
+"""Bulk memory access over the UART Wishbone bridge (--with-uart-bridge)
+
+Transfers are split in bursts of up to 255 words, one command each (command,
+length, word address, then the data words for a write, big-endian). Read
+commands are sent ahead of the data of the previous ones, up to window in
+flight (the bridge buffers them in its receive FIFO), so the line does not
+idle for a round trip between bursts. Write bursts are sent in large batches,
+they are not acknowledged and a one word read closes each write.
+
+The port is anything pyserial opens: /dev/ttyUSBX, a pty linked to the
+simulation (see README) or socket://localhost:1234.
+"""
+
+import os
+import sys
+import time
+import array
+import argparse
+
+import serial
+
+
+_cmd_write = 0x01
+_cmd_read = 0x02
+_max_burst = 255
+_command_size = 6
+
+
+def _swap(data):
+    """Wire (big-endian words) <-> memory (little-endian) byte order"""
+    a = array.array("I", data)
+    assert a.itemsize == 4
+    a.byteswap()
+    return a.tobytes()
+
+
+class UARTBridge:
+    def __init__(self, port, baudrate=115200, window=4, fifo_depth=64, batch_size=4096, timeout=5):
+        if window < 1 or (window - 1)*_command_size > fifo_depth:
+            raise ValueError("Unsupported window {}, must be 1 to {}".format(
+                window, fifo_depth//_command_size + 1))
+        self.port = serial.serial_for_url(port, baudrate, timeout=timeout)
+        self.baudrate = baudrate
+        self.window = window
+        self.batch_size = batch_size
+
+    def close(self):
+        self.port.close()
+
+    @property
+    def line_rate(self):
+        """Payload bytes/s of the line (8N1)"""
+        return self.baudrate/10
+
+    @staticmethod
+    def _bursts(addr, words):
+        while words:
+            n = min(words, _max_burst)
+            yield addr, n
+            addr += 4*n
+            words -= n
+
+    @staticmethod
+    def _command(cmd, addr, words):
+        return bytes([cmd, words]) + (addr//4).to_bytes(4, "big")
+
+    def _recv(self, length):
+        data = self.port.read(length)
+        if len(data) != length:
+            raise IOError("UART bridge timeout ({}/{} bytes received)".format(len(data), length))
+        return data
+
+    def read(self, addr, length):
+        if addr % 4:
+            raise ValueError("Unaligned address 0x{:08x}".format(addr))
+        bursts = list(self._bursts(addr, (length + 3)//4))
+        data = bytearray()
+        sent = 0
+        for i, (burst_addr, words) in enumerate(bursts):
+            commands = bytearray()
+            while sent < len(bursts) and sent < i + self.window:
+                commands += self._command(_cmd_read, *bursts[sent])
+                sent += 1
+            if commands:
+                self.port.write(commands)
+            data += _swap(self._recv(4*words))
+        return bytes(data[:length])
+
+    def write(self, addr, data):
+        if addr % 4 or len(data) % 4:
+            raise ValueError("Unaligned address 0x{:08x} or length {}".format(addr, len(data)))
+        batch = bytearray()
+        offset = 0
+        for burst_addr, words in self._bursts(addr, len(data)//4):
+            batch += self._command(_cmd_write, burst_addr, words)
+            batch += _swap(data[offset:offset + 4*words])
+            offset += 4*words
+            if len(batch) >= self.batch_size:
+                self.port.write(batch)
+                batch = bytearray()
+        if batch:
+            self.port.write(batch)
+        # the bridge executes the commands in order: the read returns once
+        # the writes are done
+        if data:
+            self.read(addr, 4)
+
+
+def _report(bridge, operation, length, duration):
+    rate = length/duration if duration else 0
+    print("{} {} bytes in {:.2f}s: {:.0f} bytes/s ({:.1f}% of the line rate)".format(
+        operation, length, duration, rate, 100*rate/bridge.line_rate), file=sys.stderr)
+
+
+def _hexdump(addr, data):
+    for i in range(0, len(data), 16):
+        line = data[i:i + 16]
+        print("{:08x}  {:<48} {}".format(addr + i,
+            " ".join("{:02x}".format(b) for b in line),
+            "".join(chr(b) if 32 <= b < 127 else "." for b in line)))
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Bulk memory access over the UART Wishbone bridge")
+    parser.add_argument("--port", default="/dev/ttyUSB1",
+                        help="serial port or pyserial URL (default=/dev/ttyUSB1)")
+    parser.add_argument("--baudrate", default=115200, type=int,
+                        help="baudrate of the bridge (default=115200)")
+    parser.add_argument("--window", default=4, type=int,
+                        help="read commands in flight (default=4)")
+    subparsers = parser.add_subparsers(dest="command")
+
+    read_parser = subparsers.add_parser("read", help="read memory to a file (or hexdump)")
+    read_parser.add_argument("addr", type=lambda x: int(x, 0))
+    read_parser.add_argument("length", type=lambda x: int(x, 0))
+    read_parser.add_argument("file", nargs="?", default=None)
+
+    write_parser = subparsers.add_parser("write", help="write a file to memory (padded to 4 bytes)")
+    write_parser.add_argument("addr", type=lambda x: int(x, 0))
+    write_parser.add_argument("file")
+    write_parser.add_argument("--verify", action="store_true", help="read back and compare")
+
+    bench_parser = subparsers.add_parser("bench", help="write/read/compare random data")
+    bench_parser.add_argument("addr", type=lambda x: int(x, 0))
+    bench_parser.add_argument("length", type=lambda x: int(x, 0))
+
+    args = parser.parse_args()
+    if args.command is None:
+        parser.error("missing command")
+
+    bridge = UARTBridge(args.port, args.baudrate, window=args.window)
+    try:
+        if args.command == "read":
+            start = time.time()
+            data = bridge.read(args.addr, args.length)
+            _report(bridge, "read", len(data), time.time() - start)
+            if args.file is None:
+                _hexdump(args.addr, data)
+            else:
+                with open(args.file, "wb") as f:
+                    f.write(data)
+        else:
+            if args.command == "write":
+                with open(args.file, "rb") as f:
+                    data = f.read()
+                data += bytes(-len(data) % 4)
+            else:
+                data = os.urandom(args.length - args.length % 4)
+            start = time.time()
+            bridge.write(args.addr, data)
+            _report(bridge, "write", len(data), time.time() - start)
+            if args.command == "bench" or args.verify:
+                start = time.time()
+                errors = sum(a != b for a, b in zip(bridge.read(args.addr, len(data)), data))
+                _report(bridge, "read", len(data), time.time() - start)
+                print("{} errors".format(errors), file=sys.stderr)
+                if errors:
+                    sys.exit(1)
+    finally:
+        bridge.close()
+
+if __name__ == "__main__":
+    main()